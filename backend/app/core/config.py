@@ -10,9 +10,120 @@ class Settings:
     MONGODB_CLUSTER: str = os.getenv("MONGODB_CLUSTER")
     MONGODB_DATABASE: str = os.getenv("MONGODB_DATABASE", "heritage_db")
     
+    # MongoDB connection pool and timeouts
+    MONGODB_MAX_POOL_SIZE: int = int(os.getenv("MONGODB_MAX_POOL_SIZE", "50"))
+    MONGODB_MIN_POOL_SIZE: int = int(os.getenv("MONGODB_MIN_POOL_SIZE", "5"))
+    MONGODB_MAX_IDLE_TIME_MS: int = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", "60000"))
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+    MONGODB_CONNECT_TIMEOUT_MS: int = int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", "5000"))
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+    MONGODB_SOCKET_TIMEOUT_MS: int = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS", "10000"))
+    MONGODB_QUERY_TIMEOUT_MS: int = int(os.getenv("MONGODB_QUERY_TIMEOUT_MS", "2000"))
+    MONGODB_READ_PREFERENCE: str = os.getenv("MONGODB_READ_PREFERENCE", "primaryPreferred")
+    
     # AI Configuration - Using OpenRouter instead of Gemini
     OPENROUTER_API_KEY: str = os.getenv("OPENROUTER_KEY")
-    OPENROUTER_BASE_URL: str = "https://openrouter.ai/api/v1"
+    OPENROUTER_BASE_URL: str = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+    
+    # OpenRouter connection pool
+    OPENROUTER_TIMEOUT: float = float(os.getenv("OPENROUTER_TIMEOUT", "30"))
+    OPENROUTER_CONNECT_TIMEOUT: float = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "5"))
+    OPENROUTER_MAX_CONNECTIONS: int = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "100"))
+    OPENROUTER_MAX_KEEPALIVE: int = int(os.getenv("OPENROUTER_MAX_KEEPALIVE", "20"))
+    OPENROUTER_KEEPALIVE_EXPIRY: float = float(os.getenv("OPENROUTER_KEEPALIVE_EXPIRY", "60"))
+    
+    # Record/replay of OpenRouter calls: "off", "record" or "replay"
+    AI_CASSETTE_MODE: str = os.getenv("AI_CASSETTE_MODE", "off")
+    AI_CASSETTE_PATH: str = os.getenv("AI_CASSETTE_PATH", "cassettes/openrouter.jsonl")
+    AI_CASSETTE_REPLAY_LATENCY: bool = os.getenv("AI_CASSETTE_REPLAY_LATENCY", "true").lower() == "true"
+    
+    # Hedged requests across the model fallback chains
+    AI_HEDGE_ENABLED: bool = os.getenv("AI_HEDGE_ENABLED", "true").lower() == "true"
+    AI_HEDGE_DELAY: float = float(os.getenv("AI_HEDGE_DELAY", "4"))
+    AI_HEDGE_USE_P95: bool = os.getenv("AI_HEDGE_USE_P95", "true").lower() == "true"
+    AI_HEDGE_MIN_SAMPLES: int = int(os.getenv("AI_HEDGE_MIN_SAMPLES", "20"))
+    AI_HEDGE_MAX_PARALLEL: int = int(os.getenv("AI_HEDGE_MAX_PARALLEL", "2"))
+    
+    # Adaptive model routing and circuit breakers
+    MODEL_ROUTER_WINDOW: int = int(os.getenv("MODEL_ROUTER_WINDOW", "50"))
+    MODEL_ROUTER_WINDOW_SECONDS: float = float(os.getenv("MODEL_ROUTER_WINDOW_SECONDS", "300"))
+    MODEL_ROUTER_MIN_CALLS: int = int(os.getenv("MODEL_ROUTER_MIN_CALLS", "5"))
+    MODEL_ROUTER_FAILURE_THRESHOLD: float = float(os.getenv("MODEL_ROUTER_FAILURE_THRESHOLD", "0.5"))
+    MODEL_ROUTER_MAX_CONSECUTIVE_FAILURES: int = int(os.getenv("MODEL_ROUTER_MAX_CONSECUTIVE_FAILURES", "3"))
+    MODEL_ROUTER_COOLDOWN_SECONDS: float = float(os.getenv("MODEL_ROUTER_COOLDOWN_SECONDS", "30"))
+    MODEL_ROUTER_SLOW_SECONDS: float = float(os.getenv("MODEL_ROUTER_SLOW_SECONDS", "15"))
+    
+    # Batch search
+    BATCH_SEARCH_CONCURRENCY: int = int(os.getenv("BATCH_SEARCH_CONCURRENCY", "5"))
+    BATCH_SEARCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_SEARCH_MAX_CONCURRENCY", "20"))
+    BATCH_SEARCH_MAX_QUERIES: int = int(os.getenv("BATCH_SEARCH_MAX_QUERIES", "100"))
+    
+    # Search response cache (in-process LRU + MongoDB)
+    SEARCH_CACHE_MAX_ENTRIES: int = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000"))
+    SEARCH_CACHE_TTL_SECONDS: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+    
+    # Perceptual-hash image result cache
+    IMAGE_CACHE_MAX_ENTRIES: int = int(os.getenv("IMAGE_CACHE_MAX_ENTRIES", "100000"))
+    IMAGE_CACHE_MAX_DISTANCE: int = int(os.getenv("IMAGE_CACHE_MAX_DISTANCE", "4"))
+    
+    # Image preprocessing before vision upload
+    IMAGE_MAX_EDGE: int = int(os.getenv("IMAGE_MAX_EDGE", "1568"))
+    IMAGE_JPEG_QUALITY: int = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+    IMAGE_PASSTHROUGH_MAX_BYTES: int = int(os.getenv("IMAGE_PASSTHROUGH_MAX_BYTES", str(1024 * 1024)))
+    IMAGE_WORKERS: int = int(os.getenv("IMAGE_WORKERS", "4"))
+    
+    # Upload ingestion
+    UPLOAD_MAX_BYTES: int = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+    UPLOAD_CHUNK_BYTES: int = int(os.getenv("UPLOAD_CHUNK_BYTES", str(64 * 1024)))
+    UPLOAD_SPOOL_BYTES: int = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+    
+    # Admission control in front of the AI service
+    ADMISSION_MAX_CONCURRENT: int = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))
+    ADMISSION_MAX_QUEUED: int = int(os.getenv("ADMISSION_MAX_QUEUED", "32"))
+    ADMISSION_PER_USER_CONCURRENT: int = int(os.getenv("ADMISSION_PER_USER_CONCURRENT", "2"))
+    RATE_LIMIT_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "10"))
+    GLOBAL_RATE_LIMIT_PER_MINUTE: float = float(os.getenv("GLOBAL_RATE_LIMIT_PER_MINUTE", "300"))
+    GLOBAL_RATE_LIMIT_BURST: int = int(os.getenv("GLOBAL_RATE_LIMIT_BURST", "50"))
+    # Login and signup attempts, per client address and per address and username
+    AUTH_RATE_LIMIT_PER_MINUTE: float = float(os.getenv("AUTH_RATE_LIMIT_PER_MINUTE", "120"))
+    AUTH_RATE_LIMIT_BURST: int = int(os.getenv("AUTH_RATE_LIMIT_BURST", "60"))
+    AUTH_ACCOUNT_RATE_LIMIT_PER_MINUTE: float = float(os.getenv("AUTH_ACCOUNT_RATE_LIMIT_PER_MINUTE", "6"))
+    AUTH_ACCOUNT_RATE_LIMIT_BURST: int = int(os.getenv("AUTH_ACCOUNT_RATE_LIMIT_BURST", "5"))
+    
+    # Background analysis jobs
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_QUEUE_SIZE: int = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+    JOB_TTL_SECONDS: int = int(os.getenv("JOB_TTL_SECONDS", "600"))
+    
+    # Authentication and session tokens
+    AUTH_SECRET_KEY: str = os.getenv("AUTH_SECRET_KEY")
+    AUTH_TOKEN_TTL_SECONDS: int = int(os.getenv("AUTH_TOKEN_TTL_SECONDS", str(24 * 3600)))
+    AUTH_SESSION_CACHE_SIZE: int = int(os.getenv("AUTH_SESSION_CACHE_SIZE", "10000"))
+    AUTH_SESSION_CACHE_SECONDS: int = int(os.getenv("AUTH_SESSION_CACHE_SECONDS", "300"))
+    AUTH_HASH_WORKERS: int = int(os.getenv("AUTH_HASH_WORKERS", "2"))
+    AUTH_SCRYPT_N: int = int(os.getenv("AUTH_SCRYPT_N", str(2 ** 14)))
+    AUTH_MIN_PASSWORD_LENGTH: int = int(os.getenv("AUTH_MIN_PASSWORD_LENGTH", "6"))
+    
+    # Exploration history (write-behind to MongoDB)
+    HISTORY_QUEUE_SIZE: int = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))
+    HISTORY_BATCH_SIZE: int = int(os.getenv("HISTORY_BATCH_SIZE", "100"))
+    HISTORY_FLUSH_SECONDS: float = float(os.getenv("HISTORY_FLUSH_SECONDS", "2"))
+    HISTORY_RECENT_PER_USER: int = int(os.getenv("HISTORY_RECENT_PER_USER", "20"))
+    HISTORY_RECENT_USERS: int = int(os.getenv("HISTORY_RECENT_USERS", "5000"))
+    HISTORY_RECENT_SECONDS: int = int(os.getenv("HISTORY_RECENT_SECONDS", "3600"))
+    HISTORY_PAGE_SIZE: int = int(os.getenv("HISTORY_PAGE_SIZE", "10"))
+    HISTORY_MAX_PAGE_SIZE: int = int(os.getenv("HISTORY_MAX_PAGE_SIZE", "50"))
+
+    # Featured sites: answers generated in the background so Explore never waits on the AI
+    PREFETCH_ENABLED: bool = os.getenv("PREFETCH_ENABLED", "true").lower() == "true"
+    PREFETCH_REFRESH_SECONDS: int = int(os.getenv("PREFETCH_REFRESH_SECONDS", str(6 * 3600)))
+    PREFETCH_CONCURRENCY: int = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+    PREFETCH_MAX_AGE: int = int(os.getenv("PREFETCH_MAX_AGE", "3600"))
+    
+    # HTTP response caching and compression
+    RECOMMENDATIONS_MAX_AGE: int = int(os.getenv("RECOMMENDATIONS_MAX_AGE", "300"))
+    COMPRESSION_MIN_BYTES: int = int(os.getenv("COMPRESSION_MIN_BYTES", "1000"))
     
     # App Configuration
     PROJECT_NAME: str = "Heritage Virtual Guide API"
@@ -0,0 +1,73 @@
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+class UploadSizeLimitMiddleware:
+    """
+    Refuse oversized upload bodies while they are still arriving.
+
+    A declared Content-Length over the limit gets 413 before any of the body is read.
+    A body without one (chunked) is cut off as soon as the running total passes the
+    limit, so the multipart parser never spools more than max_bytes to disk.
+    """
+
+    def __init__(self, app: ASGIApp, max_bytes: int, paths, error: str = "Upload too large"):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.paths = set(paths)
+        self.error = error
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send):
+        response = JSONResponse(
+            status_code=413,
+            content={"success": False, "error": self.error}
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        declared = Headers(scope=scope).get("content-length", "")
+        if declared.isdigit() and int(declared) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Looks like a client disconnect to the form parser, which stops reading
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message: Message):
+            nonlocal response_started
+            if exceeded:
+                # Replace whatever error the app produced for the cut-off body
+                if not response_started:
+                    response_started = True
+                    await self._reject(scope, receive, send)
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            if not exceeded:
+                raise
+            if not response_started:
+                response_started = True
+                await self._reject(scope, receive, send)
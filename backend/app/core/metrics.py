@@ -0,0 +1,175 @@
+"""
+Prometheus-format metrics without a client library.
+
+Every update happens on the event loop thread, so the counters are plain dicts of
+floats: no locks, and an increment costs one dict lookup. Anything that runs on a
+worker thread reports back through the loop before touching a metric.
+"""
+
+import time
+from bisect import bisect_left
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; AI calls routinely take tens of seconds, so the tail goes well past 10
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        for label_values, value in self.values.items():
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, *label_values, value):
+        self.values[label_values] = value
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last one is +Inf), sum, count]
+        self.series = {}
+
+    def observe(self, *label_values, value):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        for label_values, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+class MetricsRegistry:
+    """Holds every metric plus collectors that snapshot other services' stats at scrape time"""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()):
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def add_collector(self, collect):
+        """collect() returns metrics (usually fresh Gauges) to include in the next scrape"""
+        self.collectors.append(collect)
+
+    def render(self):
+        lines = []
+        collected = [metric for collect in self.collectors for metric in collect()]
+        for metric in self.metrics + collected:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+http_requests = metrics.counter(
+    "heritage_http_requests_total", "HTTP requests handled", ("method", "route", "status")
+)
+http_latency = metrics.histogram(
+    "heritage_http_request_duration_seconds", "Time to fully send an HTTP response", ("method", "route")
+)
+http_in_flight = metrics.gauge("heritage_http_requests_in_flight", "HTTP requests currently being handled")
+
+upstream_requests = metrics.counter(
+    "heritage_openrouter_requests_total", "OpenRouter calls by model and outcome", ("model", "outcome")
+)
+upstream_latency = metrics.histogram(
+    "heritage_openrouter_request_duration_seconds", "OpenRouter call latency by model", ("model",)
+)
+upstream_in_flight = metrics.gauge("heritage_openrouter_requests_in_flight", "OpenRouter calls currently open")
+upstream_tokens = metrics.counter(
+    "heritage_openrouter_tokens_total", "Tokens reported in OpenRouter usage", ("model", "direction")
+)
+
+image_bytes = metrics.counter(
+    "heritage_image_bytes_total", "Image bytes received from clients and sent upstream", ("stage",)
+)
+images_processed = metrics.counter(
+    "heritage_images_processed_total", "Images preprocessed, by whether they were passed through as-is", ("path",)
+)
+
+class MetricsMiddleware:
+    """Per-route request count, latency and in-flight gauge, labelled by route template"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_in_flight.dec()
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = scope.get("route")
+            route = getattr(route, "path", None) or "unmatched"
+            http_requests.inc(scope["method"], route, str(status))
+            http_latency.observe(scope["method"], route, value=time.perf_counter() - started)
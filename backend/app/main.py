@@ -1,16 +1,54 @@
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
+from app.core.responses import CompressionMiddleware
+from app.core.limits import UploadSizeLimitMiddleware
+from app.core.metrics import metrics, Counter, Gauge, MetricsMiddleware
 from app.services.database import mongodb
-from app.routers import heritage
+from app.services.repositories import ensure_indexes
+from app.services.ai_service import ai_service
+from app.services.cassette import cassette
+from app.services.cache import search_cache
+from app.services.image_cache import image_cache
+from app.services.image_processing import shutdown_image_workers
+from app.services.auth import shutdown_auth_workers
+from app.services.knowledge_base import knowledge_base
+from app.services.site_index import site_index
+from app.services.canonicalizer import canonicalizer
+from app.services.jobs import job_manager
+from app.services.admission import admission
+from app.services.history import history_service
+from app.services.prefetch import featured_prefetcher
+from app.routers import auth, heritage, history
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     
-    mongodb.connect()
+    await mongodb.connect()
+    await ensure_indexes()
+    await knowledge_base.load()
+    catalog = (
+        [(site["name"], site["location"], ()) for site in ai_service.get_heritage_recommendations()]
+        + knowledge_base.catalog_entries()
+    )
+    site_index.add_sites(catalog)
+    canonicalizer.add_sites(catalog)
+    cassette.open()
+    ai_service.connect()
+    job_manager.start()
+    history_service.start()
+    featured_prefetcher.start()
     yield
     
+    await featured_prefetcher.stop()
+    await job_manager.stop()
+    await history_service.stop()
+    await ai_service.close()
+    cassette.close()
+    shutdown_image_workers()
+    shutdown_auth_workers()
     mongodb.close() 
 
 app = FastAPI(
@@ -27,13 +65,80 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_BYTES)
+
+# Slack on top of the image limit for the multipart boundaries and part headers
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_bytes=settings.UPLOAD_MAX_BYTES + 64 * 1024,
+    paths=[f"{settings.API_PREFIX}/heritage/upload-image", f"{settings.API_PREFIX}/heritage/jobs"],
+    error=f"Image size too large. Please upload images smaller than {settings.UPLOAD_MAX_BYTES // (1024 * 1024)}MB"
+)
+
+
+# Outermost, so latency covers compression and upload limits too
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(heritage.router, prefix=settings.API_PREFIX)
+app.include_router(auth.router, prefix=settings.API_PREFIX)
+app.include_router(history.router, prefix=settings.API_PREFIX)
+
+def collect_service_stats():
+    """Cache, prefetch, coalescing, admission, job queue and history figures, snapshotted at scrape time"""
+    search = search_cache.get_stats()
+    images = image_cache.get_stats()
+    load = admission.get_stats()
+    
+    lookups = Counter("heritage_cache_lookups_total", "Response cache lookups by result", ("cache", "result"))
+    lookups.inc("search", "memory_hit", amount=search["memory_hits"])
+    lookups.inc("search", "persistent_hit", amount=search["persistent_hits"])
+    lookups.inc("search", "miss", amount=search["misses"])
+    lookups.inc("image", "hit", amount=images["hits"])
+    lookups.inc("image", "miss", amount=images["misses"])
+    
+    entries = Gauge("heritage_cache_entries", "Entries held in memory by each cache", ("cache",))
+    entries.set("search", value=search["memory_entries"])
+    entries.set("image", value=images["entries"])
+    entries.set("knowledge_base", value=knowledge_base.get_stats()["sites"])
+    
+    coalesced = Counter("heritage_coalesced_requests_total", "Requests that joined an identical in-flight AI call")
+    coalesced.inc(amount=ai_service.get_coalescing_stats()["coalesced_requests"])
+    
+    admitted = Gauge("heritage_admission_requests", "Requests holding or waiting for an AI slot", ("state",))
+    admitted.set("running", value=load["running"])
+    admitted.set("waiting", value=load["waiting"])
+    
+    rejected = Counter("heritage_admission_rejected_total", "Requests refused with 429, by reason", ("reason",))
+    for reason, count in load["rejected"].items():
+        rejected.inc(reason, amount=count)
+    
+    queued_jobs = Gauge("heritage_jobs_queued", "Image analysis jobs waiting for a worker")
+    queued_jobs.set(value=job_manager.get_stats()["queued"])
+    
+    history = history_service.get_stats()
+    history_entries = Counter("heritage_history_entries_total", "History entries by write-behind outcome", ("outcome",))
+    history_entries.inc("written", amount=history["written"])
+    history_entries.inc("dropped", amount=history["dropped"])
+    history_queued = Gauge("heritage_history_queued", "History entries waiting to be written")
+    history_queued.set(value=history["queued"])
+    
+    prefetch = featured_prefetcher.get_stats()
+    lookups.inc("featured", "hit", amount=prefetch["hits"])
+    lookups.inc("featured", "miss", amount=prefetch["misses"])
+    entries.set("featured", value=prefetch["ready"])
+    return [lookups, entries, coalesced, admitted, rejected, queued_jobs, history_entries, history_queued]
+
+metrics.add_collector(collect_service_stats)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to Heritage Virtual Guide API"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text exposition of request, upstream, cache and queue metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     return {"status": "healthy", "database": "connected" if mongodb.client else "disconnected"}
@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import List, Optional
+from pydantic import BaseModel, Field
+
+class HeritageSite(BaseModel):
+    """A featured heritage site shown on the home page"""
+    name: str
+    location: str
+    description: str
+    image_url: Optional[str] = None
+
+class HeritageRecommendationsResponse(BaseModel):
+    sites: List[HeritageSite]
+
+class HeritageRecord(BaseModel):
+    """Structured heritage information parsed from an AI response"""
+    name: str
+    location: Optional[str] = None
+    historical_period: Optional[str] = None
+    builder: Optional[str] = None
+    significance: Optional[str] = None
+    architectural_style: Optional[str] = None
+    history: Optional[str] = None
+    current_status: Optional[str] = None
+    interesting_facts: List[str] = Field(default_factory=list)
+    visitor_information: Optional[str] = None
+    nearby_attractions: Optional[str] = None
+    best_time_to_visit: Optional[str] = None
+    travel_tips: Optional[str] = None
+
+class SiteDocument(HeritageRecord):
+    """A heritage record as stored in the site knowledge base"""
+    canonical_name: str
+    aliases: List[str] = Field(default_factory=list)
+    search_text: Optional[str] = None
+    updated_at: Optional[datetime] = None
@@ -0,0 +1,76 @@
+from pydantic import BaseModel
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+from app.services.auth import auth_service, AuthError
+from app.services.admission import admission, RateLimited
+
+class LoginRequest(BaseModel):
+    username: str
+    password: str
+
+class SignupRequest(BaseModel):
+    username: str
+    password: str
+    email: str
+
+router = APIRouter(prefix="/auth", tags=["auth"])
+
+def _error(status_code, message, headers=None):
+    return JSONResponse(status_code=status_code, content={"success": False, "error": message}, headers=headers)
+
+def _check_rate(http_request: Request, username):
+    """Password hashing is expensive on purpose; attempts are limited per client address and account"""
+    address = http_request.client.host if http_request.client else "anonymous"
+    admission.check_auth_rate(address, (username or "").strip())
+
+@router.post("/signup")
+async def signup(request: SignupRequest, http_request: Request):
+    """
+    Create an account; the password is stored as a salted scrypt hash
+    """
+    try:
+        _check_rate(http_request, request.username)
+        message = await auth_service.signup(request.username, request.password, request.email)
+        return {"success": True, "message": message}
+    except RateLimited as e:
+        return _error(429, str(e), {"Retry-After": str(e.retry_after)})
+    except AuthError as e:
+        return _error(e.status_code, str(e))
+    except Exception as e:
+        print(f"❌ Signup error: {str(e)}")
+        return _error(500, "Signup failed, please try again")
+
+@router.post("/login")
+async def login(request: LoginRequest, http_request: Request):
+    """
+    Exchange a username and password for a signed session token.
+    
+    Send it back as "Authorization: Bearer <token>" on later requests.
+    """
+    try:
+        _check_rate(http_request, request.username)
+        token = await auth_service.login(request.username, request.password)
+        return {
+            "success": True,
+            "token": token,
+            "username": request.username.strip(),
+            "expires_in": settings.AUTH_TOKEN_TTL_SECONDS
+        }
+    except RateLimited as e:
+        return _error(429, str(e), {"Retry-After": str(e.retry_after)})
+    except AuthError as e:
+        return _error(e.status_code, str(e))
+    except Exception as e:
+        print(f"❌ Login error: {str(e)}")
+        return _error(500, "Login failed, please try again")
+
+@router.get("/me")
+async def current_user(http_request: Request):
+    """
+    The user a session token belongs to
+    """
+    username = auth_service.user_from_header(http_request.headers.get("authorization"))
+    if username is None:
+        return _error(401, "Not logged in or session expired")
+    return {"success": True, "username": username}
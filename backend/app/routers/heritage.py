@@ -1,15 +1,67 @@
+import asyncio
+import json
+from typing import List, Optional
 from pydantic import BaseModel
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from app.core.config import settings
 from app.services.ai_service import ai_service
+from app.services.cache import search_cache, normalize_query
+from app.services.image_cache import image_cache
+from app.services.model_router import model_router
+from app.services.knowledge_base import knowledge_base
+from app.services.site_index import site_index
+from app.services.canonicalizer import canonicalizer
+from app.services.cassette import cassette
+from app.services.jobs import job_manager
+from app.services.admission import admission, RateLimited
+from app.services.auth import auth_service
+from app.services.history import history_service
+from app.services.prefetch import featured_prefetcher, is_answer
+from app.services.uploads import spool_image_upload, UploadError
+from app.core.metrics import image_bytes
+from app.core.responses import CachedJSONResponse
 from app.models.heritage import HeritageRecommendationsResponse
 # Request model for search
 class SearchRequest(BaseModel):
     query: str
 
+# Request model for batch search
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    concurrency: Optional[int] = None
+
 router = APIRouter(prefix="/heritage", tags=["heritage"])
 
+# Serialized once on first request; the featured list only changes with a deploy
+_recommendations_response: Optional[CachedJSONResponse] = None
+
+def _signed_in_user(http_request: Request):
+    return auth_service.user_from_header(http_request.headers.get("authorization"))
+
+def _client_id(http_request: Request):
+    """Who admission control counts a request against: the signed-in user, else the caller's address"""
+    # Only verified identities; a header the caller picks freely would let it rotate past its limits
+    user = _signed_in_user(http_request)
+    if user is not None:
+        return f"user:{user}"
+    return f"ip:{http_request.client.host if http_request.client else 'anonymous'}"
+
+def _remember(user, kind, query, result):
+    """Add a successful answer to a signed-in user's history (queued, never awaited)"""
+    if user and is_answer(result):
+        history_service.record(user, kind, query, result)
+
+def _too_many_requests(error: RateLimited):
+    print(f"🚦 Request refused, retry after {error.retry_after}s: {str(error)}")
+    return JSONResponse(
+        status_code=429,
+        content={"success": False, "error": str(error)},
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
 @router.post("/search")
-async def search_heritage(request: SearchRequest):
+async def search_heritage(request: SearchRequest, http_request: Request):
     """
     Search for heritage information
     """
@@ -18,53 +70,344 @@ async def search_heritage(request: SearchRequest):
         
         if not request.query or request.query.strip() == "":
             return {"success": False, "error": "Query cannot be empty"}
-            
-        result = ai_service.search_heritage_info(request.query)
+        
+        async with admission.admit(_client_id(http_request)):
+            result = await ai_service.search_heritage_info(request.query)
+        _remember(_signed_in_user(http_request), "search", request.query, result)
         
         print(f"✅ Search completed for: {request.query}")
         return {"success": True, "result": result}
         
+    except RateLimited as e:
+        return _too_many_requests(e)
     except Exception as e:
         print(f"❌ Search error: {str(e)}")
         return {"success": False, "error": f"Search failed: {str(e)}"}
 
+@router.post("/search/stream")
+async def search_heritage_stream(request: SearchRequest, http_request: Request):
+    """
+    Search for heritage information, streaming the answer as Server-Sent Events.
+    
+    Each event is a JSON object: {"type": "delta", "content": ...} for every chunk of
+    text, then {"type": "done"}, or {"type": "error", "error": ...} if the stream fails.
+    """
+    if not request.query or request.query.strip() == "":
+        return {"success": False, "error": "Query cannot be empty"}
+    
+    print(f"🔍 Received streaming search query: {request.query}")
+    
+    # Refuse up front so the client gets a real 429; the slot itself is held by the stream
+    user = _client_id(http_request)
+    try:
+        admission.check_rate(user)
+        admission.check_capacity(user)
+    except RateLimited as e:
+        return _too_many_requests(e)
+    
+    async def event_stream():
+        parts = []
+        try:
+            async with admission.slot(user):
+                async for chunk in ai_service.stream_heritage_info(request.query):
+                    parts.append(chunk)
+                    yield f"data: {json.dumps({'type': 'delta', 'content': chunk})}\n\n"
+            _remember(_signed_in_user(http_request), "search", request.query, "".join(parts))
+            yield f"data: {json.dumps({'type': 'done'})}\n\n"
+            print(f"✅ Streaming search completed for: {request.query}")
+        except Exception as e:
+            print(f"❌ Streaming search error: {str(e)}")
+            yield f"data: {json.dumps({'type': 'error', 'error': f'Search failed: {str(e)}'})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/search/batch")
+async def search_heritage_batch(request: BatchSearchRequest, http_request: Request):
+    """
+    Search for many heritage sites at once, streaming results as NDJSON.
+    
+    Queries run with bounded concurrency and each line is emitted as soon as its
+    query finishes: {"index", "query", "success", "result" | "error"}. A failing
+    item is reported on its own line without aborting the rest of the batch.
+    
+    Every query is admitted like a search of its own: the batch costs one rate token
+    per query, up front, and its items count against the caller's concurrency and
+    the wait queue, so a batch cannot crowd out interactive searches.
+    """
+    if not request.queries:
+        return {"success": False, "error": "Provide at least one query"}
+    max_queries = min(settings.BATCH_SEARCH_MAX_QUERIES, admission.max_cost)
+    if len(request.queries) > max_queries:
+        return {"success": False, "error": f"Batch too large. Please send at most {max_queries} queries"}
+    
+    client = _client_id(http_request)
+    try:
+        admission.check_rate(client, cost=sum(1 for query in request.queries if query and query.strip()))
+    except RateLimited as e:
+        return _too_many_requests(e)
+    
+    concurrency = request.concurrency or settings.BATCH_SEARCH_CONCURRENCY
+    concurrency = max(1, min(concurrency, settings.BATCH_SEARCH_MAX_CONCURRENCY, settings.ADMISSION_PER_USER_CONCURRENT))
+    semaphore = asyncio.Semaphore(concurrency)
+    print(f"📦 Received batch search: {len(request.queries)} queries, concurrency {concurrency}")
+    
+    async def run_item(index, query):
+        item = {"index": index, "query": query}
+        if not query or query.strip() == "":
+            return {**item, "success": False, "error": "Query cannot be empty"}
+        async with semaphore:
+            try:
+                async with admission.slot(client):
+                    result = await ai_service.search_heritage_info(query)
+                return {**item, "success": True, "result": result}
+            except RateLimited as e:
+                return {**item, "success": False, "error": str(e), "retry_after": e.retry_after}
+            except Exception as e:
+                print(f"❌ Batch item {index} error: {str(e)}")
+                return {**item, "success": False, "error": f"Search failed: {str(e)}"}
+    
+    async def ndjson_lines():
+        tasks = [asyncio.ensure_future(run_item(index, query)) for index, query in enumerate(request.queries)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+            print(f"✅ Batch search completed: {len(tasks)} queries")
+        finally:
+            # Stop outstanding work if the client goes away mid-batch
+            for task in tasks:
+                task.cancel()
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+async def _read_image_upload(file: UploadFile):
+    """Return (image_file, error) for an uploaded image; the caller closes image_file"""
+    try:
+        image_file, size, mime_type = await spool_image_upload(file)
+    except UploadError as e:
+        return None, str(e)
+    print(f"📥 Spooled {mime_type} upload: {size / 1024:.0f} KB")
+    image_bytes.inc("received", amount=size)
+    return image_file, None
+
 @router.post("/upload-image")
-async def upload_heritage_image(file: UploadFile = File(...)):
+async def upload_heritage_image(http_request: Request, file: UploadFile = File(...)):
     """
     Upload and analyze a heritage image
     """
     try:
         print(f"🖼️ Received image upload: {file.filename}")
         
-        if not file.content_type.startswith('image/'):
-            return {"success": False, "error": "Please upload a valid image file"}
+        image_file, error = await _read_image_upload(file)
+        if error:
+            return {"success": False, "error": error}
         
-        image_data = await file.read()
-        
-        if len(image_data) > 10 * 1024 * 1024:
-            return {"success": False, "error": "Image size too large. Please upload images smaller than 10MB"}
-            
-        result = ai_service.analyze_heritage_image(image_data)
+        with image_file:
+            async with admission.admit(_client_id(http_request)):
+                result = await ai_service.analyze_heritage_image(image_file)
+        _remember(_signed_in_user(http_request), "image", None, result)
         
         print(f"✅ Image analysis completed: {file.filename}")
         return {"success": True, "result": result}
         
+    except RateLimited as e:
+        return _too_many_requests(e)
     except Exception as e:
         print(f"❌ Image analysis error: {str(e)}")
         return {"success": False, "error": f"Image analysis failed: {str(e)}"}
 
+async def _run_image_job(job):
+    # Already admitted at submit time; only the shared concurrency limit applies here
+    image_file, user = job.payload
+    with image_file:
+        async with admission.slot(bounded=False):
+            result = await ai_service.analyze_heritage_image(image_file, on_progress=job.report)
+    if job.stage != "failed":
+        _remember(user, "image", None, result)
+    return result
+
+job_manager.register("image", _run_image_job)
+
+@router.post("/jobs", status_code=202)
+async def create_image_job(http_request: Request, file: UploadFile = File(...)):
+    """
+    Queue a heritage image for analysis and return its job ID immediately.
+    
+    Poll GET /jobs/{job_id} or stream GET /jobs/{job_id}/events for progress.
+    """
+    print(f"🖼️ Received image job: {file.filename}")
+    
+    image_file, error = await _read_image_upload(file)
+    if error:
+        return JSONResponse(status_code=400, content={"success": False, "error": error})
+    
+    try:
+        admission.check_rate(_client_id(http_request))
+        job = job_manager.submit("image", (image_file, _signed_in_user(http_request)))
+    except RateLimited as e:
+        image_file.close()
+        return _too_many_requests(e)
+    except asyncio.QueueFull:
+        image_file.close()
+        return _too_many_requests(RateLimited(
+            "Too many images are waiting for analysis. Please try again shortly.",
+            job_manager.estimated_wait()
+        ))
+    return {"success": True, "job": job.to_dict()}
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """
+    Current stage, progress and (once finished) result of an analysis job
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job: {job_id}")
+    return {"success": True, "job": job.to_dict()}
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job(job_id: str):
+    """
+    Stream an analysis job's progress as Server-Sent Events.
+    
+    Each event is the job as returned by GET /jobs/{job_id}; the stream ends after the
+    event whose status is "done" or "failed". A comment line is sent every 15 s of
+    silence to keep proxies from closing the connection.
+    """
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown or expired job: {job_id}")
+    
+    async def event_stream():
+        while True:
+            seen_version = job.version
+            yield f"data: {json.dumps(job.to_dict())}\n\n"
+            if job.finished:
+                return
+            while not await job.wait_for_change(seen_version, timeout=15):
+                yield ": keep-alive\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/recommendations")
-async def get_recommendations():
+async def get_recommendations(request: Request):
     """
-    Get recommended heritage sites to explore
+    Get recommended heritage sites to explore (ETag-validated, 304 if unchanged)
     """
+    global _recommendations_response
     try:
-        recommendations = ai_service.get_heritage_recommendations()
-        return HeritageRecommendationsResponse(sites=recommendations)
+        if _recommendations_response is None:
+            recommendations = ai_service.get_heritage_recommendations()
+            body = HeritageRecommendationsResponse(sites=recommendations).model_dump_json().encode()
+            _recommendations_response = CachedJSONResponse(body, max_age=settings.RECOMMENDATIONS_MAX_AGE)
+        return _recommendations_response.respond(request)
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get recommendations: {str(e)}")
 
+def _featured_site(name: str):
+    site = featured_prefetcher.sites().get(normalize_query(name))
+    if site is None:
+        raise HTTPException(status_code=404, detail=f"Not a featured heritage site: {name}")
+    return site
+
+@router.get("/featured/{name}")
+async def get_featured_site(name: str, http_request: Request):
+    """
+    Search answer for a featured site, prefetched in the background (ETag-validated).
+    
+    Only the sites listed by /recommendations are served here; anything else is a 404.
+    A site whose answer is not ready yet is searched now, like /search. Reading is free
+    of side effects; POST /featured/{name}/explore records the visit in the user's history.
+    """
+    site = _featured_site(name)
+    entry = featured_prefetcher.get(name)
+    if entry is None:
+        try:
+            async with admission.admit(_client_id(http_request)):
+                entry = await featured_prefetcher.fetch(site, hold_slot=False)
+        except RateLimited as e:
+            return _too_many_requests(e)
+        if entry is None:
+            return {"success": False, "error": f"Could not load {site['name']}. Please try again."}
+    
+    _, response = entry
+    return response.respond(http_request)
+
+@router.post("/featured/{name}/explore")
+async def explore_featured_site(name: str, http_request: Request):
+    """
+    Record that the signed-in user opened a featured site, once per Explore click
+    """
+    site = _featured_site(name)
+    user = _signed_in_user(http_request)
+    if user is None:
+        return JSONResponse(status_code=401, content={"success": False, "error": "Not logged in or session expired"})
+    entry = featured_prefetcher.ready.get(normalize_query(name))
+    if entry is None:
+        return JSONResponse(status_code=409, content={"success": False, "error": f"{site['name']} has not been loaded yet"})
+    _remember(user, "search", site["name"], entry[0])
+    return {"success": True}
+
+@router.get("/suggest")
+async def suggest_sites(q: str = "", limit: int = 8):
+    """
+    Typeahead suggestions of canonical heritage site names for a partial or misspelled query
+    """
+    limit = max(1, min(limit, 20))
+    return {"success": True, "suggestions": site_index.suggest(q, limit)}
+
+@router.get("/sites/{name}")
+async def get_site(name: str):
+    """
+    Get the structured record of a known heritage site by name or alias
+    """
+    site = knowledge_base.get(name)
+    if site is None:
+        raise HTTPException(status_code=404, detail=f"No record for heritage site: {name}")
+    return {"success": True, "site": site.model_dump(exclude={"search_text"})}
+
+@router.get("/cache-stats")
+async def get_cache_stats():
+    """
+    Hit/miss counters for the response caches, plus admission control, job queue load, record/replay, sessions, history and featured prefetch
+    """
+    return {
+        "status": "success",
+        "search_cache": search_cache.get_stats(),
+        "image_cache": image_cache.get_stats(),
+        "coalescing": ai_service.get_coalescing_stats(),
+        "knowledge_base": knowledge_base.get_stats(),
+        "canonicalization": canonicalizer.get_stats(),
+        "admission": admission.get_stats(),
+        "jobs": job_manager.get_stats(),
+        "cassette": cassette.get_stats(),
+        "auth": auth_service.get_stats(),
+        "history": history_service.get_stats(),
+        "prefetch": featured_prefetcher.get_stats()
+    }
+
+@router.get("/models/scoreboard")
+async def get_model_scoreboard():
+    """
+    Debug view of per-model health and the current order of each fallback chain
+    """
+    text_chain = model_router.order([(model, None) for model in ai_service.text_models])
+    vision_chain = model_router.order([(model, None) for model in ai_service.vision_models])
+    return {
+        "status": "success",
+        "models": model_router.scoreboard(),
+        "text_chain": [model for model, _ in text_chain],
+        "vision_chain": [model for model, _ in vision_chain]
+    }
+
 @router.get("/test")
 async def test_endpoint():
     """
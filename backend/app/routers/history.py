@@ -0,0 +1,55 @@
+from typing import Optional
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+from app.services.auth import auth_service
+from app.services.history import history_service
+
+router = APIRouter(prefix="/history", tags=["history"])
+
+def _unauthorized():
+    return JSONResponse(status_code=401, content={"success": False, "error": "Not logged in or session expired"})
+
+def _to_item(entry):
+    return {
+        "id": str(entry["_id"]),
+        "kind": entry["kind"],
+        "query": entry["query"],
+        "result": entry["result"],
+        "created_at": entry["created_at"].isoformat() + "Z"
+    }
+
+@router.get("")
+async def get_history(http_request: Request, limit: int = settings.HISTORY_PAGE_SIZE, cursor: Optional[str] = None):
+    """
+    The signed-in user's searches and image analyses, newest first.
+    
+    Pass the returned next_cursor to get the following page; it is null on the last one.
+    """
+    user = auth_service.user_from_header(http_request.headers.get("authorization"))
+    if user is None:
+        return _unauthorized()
+    limit = max(1, min(limit, settings.HISTORY_MAX_PAGE_SIZE))
+    try:
+        entries, next_cursor = await history_service.page(user, limit, cursor)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "error": str(e)})
+    except Exception as e:
+        print(f"❌ History read error: {str(e)}")
+        return {"success": False, "error": "Could not load history"}
+    return {"success": True, "items": [_to_item(entry) for entry in entries], "next_cursor": next_cursor}
+
+@router.delete("")
+async def clear_history(http_request: Request):
+    """
+    Delete the signed-in user's history
+    """
+    user = auth_service.user_from_header(http_request.headers.get("authorization"))
+    if user is None:
+        return _unauthorized()
+    try:
+        deleted = await history_service.clear(user)
+    except Exception as e:
+        print(f"❌ History delete error: {str(e)}")
+        return {"success": False, "error": "Could not clear history"}
+    return {"success": True, "deleted": deleted}
@@ -0,0 +1,200 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from app.core.config import settings
+
+class RateLimited(Exception):
+    """Request refused by admission control; retry_after is in whole seconds"""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, math.ceil(retry_after))
+
+class TokenBucket:
+    """Classic token bucket: rate tokens per second, holding at most burst"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, count=1):
+        """Take count tokens; returns 0 on success, else seconds until they are available"""
+        self._refill()
+        if self.tokens >= count:
+            self.tokens -= count
+            return 0.0
+        return (count - self.tokens) / self.rate
+
+    def give_back(self, count=1):
+        """Return tokens taken for a request that was refused at a later check"""
+        self.tokens = min(self.burst, self.tokens + count)
+
+class AdmissionController:
+    """
+    Admission control in front of the AI service.
+
+    A request must get a token from its user's bucket and from the global bucket,
+    then a slot under the global concurrency limit. When every slot is busy it waits
+    in a bounded queue; when the queue is full, or the user already has too many
+    requests running, it is refused at once with an estimated Retry-After.
+    """
+
+    def __init__(self):
+        self.max_concurrent = settings.ADMISSION_MAX_CONCURRENT
+        self.max_queued = settings.ADMISSION_MAX_QUEUED
+        self.per_user_concurrent = settings.ADMISSION_PER_USER_CONCURRENT
+        # Created on first use inside the running loop (see slots)
+        self._slots = None
+        self._slots_loop = None
+        self.global_bucket = TokenBucket(
+            settings.GLOBAL_RATE_LIMIT_PER_MINUTE / 60, settings.GLOBAL_RATE_LIMIT_BURST
+        )
+        # Most recently seen users' buckets; idle users fall off the end
+        self.user_buckets = OrderedDict()
+        self.max_tracked_users = 10000
+        # Login and signup attempts, kept apart so they never spend the AI budget
+        self.auth_address_buckets = OrderedDict()
+        self.auth_account_buckets = OrderedDict()
+        self.user_running = {}
+        self.running = 0
+        self.waiting = 0
+        # Smoothed time a request holds its slot, for Retry-After estimates
+        self.avg_hold_seconds = 5.0
+        self.rejected = {"user_rate": 0, "global_rate": 0, "user_concurrency": 0, "queue_full": 0, "auth_rate": 0}
+
+    @property
+    def slots(self):
+        """The concurrency semaphore, bound to the running loop (Python < 3.10 binds at construction)"""
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+            self._slots_loop = loop
+        return self._slots
+
+    def _bucket(self, buckets, key, per_minute, burst):
+        bucket = buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(per_minute / 60, burst)
+            buckets[key] = bucket
+            if len(buckets) > self.max_tracked_users:
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(key)
+        return bucket
+
+    def _user_bucket(self, user):
+        return self._bucket(self.user_buckets, user, settings.RATE_LIMIT_PER_MINUTE, settings.RATE_LIMIT_BURST)
+
+    def _queue_wait_estimate(self):
+        """Seconds until a newly queued request would likely get a slot"""
+        return self.avg_hold_seconds * (self.waiting + 1) / self.max_concurrent
+
+    @property
+    def max_cost(self):
+        """Most tokens one request can be charged; the buckets never hold more"""
+        return min(settings.RATE_LIMIT_BURST, settings.GLOBAL_RATE_LIMIT_BURST)
+
+    def check_rate(self, user, cost=1):
+        """Spend cost tokens (one per AI call) from the user's and the global bucket, or raise RateLimited"""
+        bucket = self._user_bucket(user)
+        wait = bucket.try_take(cost)
+        if wait:
+            self.rejected["user_rate"] += 1
+            raise RateLimited("Too many requests. Please slow down.", wait)
+        wait = self.global_bucket.try_take(cost)
+        if wait:
+            bucket.give_back(cost)
+            self.rejected["global_rate"] += 1
+            raise RateLimited("The guide is very busy right now. Please try again shortly.", wait)
+
+    def check_auth_rate(self, address, username):
+        """
+        Spend one login or signup attempt from the address's and the address+username
+        bucket, or raise RateLimited. Usernames are whatever the caller sends, so the
+        address bounds attempts spread over many of them.
+        """
+        address_bucket = self._bucket(self.auth_address_buckets, address,
+                                      settings.AUTH_RATE_LIMIT_PER_MINUTE, settings.AUTH_RATE_LIMIT_BURST)
+        wait = address_bucket.try_take()
+        if not wait:
+            account_bucket = self._bucket(self.auth_account_buckets, (address, username),
+                                          settings.AUTH_ACCOUNT_RATE_LIMIT_PER_MINUTE, settings.AUTH_ACCOUNT_RATE_LIMIT_BURST)
+            wait = account_bucket.try_take()
+            if wait:
+                address_bucket.give_back()
+        if wait:
+            self.rejected["auth_rate"] += 1
+            raise RateLimited("Too many sign-in attempts. Please wait a moment and try again.", wait)
+
+    def check_capacity(self, user=None, bounded=True):
+        """Raise RateLimited if user is at their concurrency limit or the wait queue is full"""
+        if user is not None and self.user_running.get(user, 0) >= self.per_user_concurrent:
+            self.rejected["user_concurrency"] += 1
+            raise RateLimited("You already have requests in progress. Please wait for them to finish.",
+                              self.avg_hold_seconds)
+        if bounded and self.slots.locked() and self.waiting >= self.max_queued:
+            self.rejected["queue_full"] += 1
+            raise RateLimited("The guide is very busy right now. Please try again shortly.",
+                              self._queue_wait_estimate())
+
+    @asynccontextmanager
+    async def slot(self, user=None, bounded=True):
+        """
+        Hold one of the global concurrency slots (and one of user's) for the block.
+
+        bounded=False skips the queue limit, for work that was already admitted and
+        queued elsewhere (background jobs, featured site prefetches).
+        """
+        self.check_capacity(user, bounded)
+        if user is not None:
+            self.user_running[user] = self.user_running.get(user, 0) + 1
+        try:
+            self.waiting += 1
+            try:
+                await self.slots.acquire()
+            finally:
+                self.waiting -= 1
+
+            self.running += 1
+            started = time.monotonic()
+            try:
+                yield
+            finally:
+                self.running -= 1
+                self.slots.release()
+                held = time.monotonic() - started
+                self.avg_hold_seconds += 0.2 * (held - self.avg_hold_seconds)
+        finally:
+            if user is not None:
+                self.user_running[user] -= 1
+                if not self.user_running[user]:
+                    del self.user_running[user]
+
+    @asynccontextmanager
+    async def admit(self, user):
+        """Rate check plus a bounded-queue concurrency slot"""
+        self.check_rate(user)
+        async with self.slot(user):
+            yield
+
+    def get_stats(self):
+        return {
+            "running": self.running,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "avg_hold_seconds": round(self.avg_hold_seconds, 2),
+            "tracked_users": len(self.user_buckets),
+            "rejected": dict(self.rejected),
+        }
+
+admission = AdmissionController()
@@ -1,13 +1,34 @@
-import requests
-import base64
-import io
-from PIL import Image
+import asyncio
+import httpx
+import json
+import time
+from collections import deque
 from app.core.config import settings
+from app.core.metrics import image_bytes, images_processed, upstream_in_flight, upstream_latency, upstream_requests, upstream_tokens
+from app.services.cache import normalize_query, search_cache
+from app.services.canonicalizer import canonicalizer
+from app.services.cassette import cassette
+from app.services.image_cache import image_cache
+from app.services.image_processing import prepare_image_async
+from app.services.knowledge_base import knowledge_base
+from app.services.model_router import model_router, OK, ERROR, EMPTY
+
+class StreamInterrupted(Exception):
+    """A streamed answer broke off after part of it was already sent"""
 
 class OpenRouterAIService:
     def __init__(self):
-        self.api_key = settings.OPENROUTER_API_KEY
+        # Replayed runs are offline and need no key
+        self.api_key = settings.OPENROUTER_API_KEY or ("replay" if cassette.replaying else None)
         self.base_url = settings.OPENROUTER_BASE_URL
+        self.client = None
+        
+        # Recent successful call latencies per chain, used for p95 hedge delays
+        self.chain_latencies = {"text": deque(maxlen=200), "vision": deque(maxlen=200)}
+        
+        # Upstream calls currently in flight, keyed by normalized query or image hash
+        self.pending_requests = {}
+        self.coalesced_requests = 0
         
         # Define prompts for heritage analysis
         self.image_prompt_template = """
@@ -49,20 +70,55 @@ class OpenRouterAIService:
         
         If this is not a recognized heritage site, please provide information about similar heritage sites or ask for clarification.
         """
-    
-    def _call_openrouter(self, messages, model="openai/gpt-3.5-turbo"):
-        """Make API call to OpenRouter"""
-        if not self.api_key:
-            print("❌ OPENROUTER_API_KEY is not set!")
-            return None
         
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-            "HTTP-Referer": "https://heritage-virtual-guide.com",  # Required by OpenRouter
-            "X-Title": "Heritage Virtual Guide"  # Required by OpenRouter
-        }
+        # Try different models for best results
+        self.text_models = [
+            "openai/gpt-3.5-turbo",  # Fast and cost-effective
+            "anthropic/claude-3-sonnet",  # Good for detailed responses
+            "google/gemini-pro",  # Alternative
+            "meta-llama/llama-2-13b-chat"  # Open source option
+        ]
         
+        # Use a vision model - try different models if one fails
+        # Updated to use more reliable vision models available on OpenRouter
+        self.vision_models = [
+            "openai/gpt-4o",  # GPT-4 Omni with vision support
+            "openai/gpt-4-turbo",  # GPT-4 Turbo with vision
+            "openai/gpt-4-vision-preview",  # GPT-4 Vision Preview
+            "anthropic/claude-3-opus",  # Claude 3 Opus
+            "anthropic/claude-3-sonnet",  # Claude 3 Sonnet
+            "anthropic/claude-3-haiku",  # Claude 3 Haiku (faster)
+            "google/gemini-pro-vision",  # Free vision model
+        ]
+    
+    def connect(self):
+        """Create the shared keep-alive connection pool used for all OpenRouter calls"""
+        if self.client is None:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers={
+                    "Content-Type": "application/json",
+                    "HTTP-Referer": "https://heritage-virtual-guide.com",  # Required by OpenRouter
+                    "X-Title": "Heritage Virtual Guide"  # Required by OpenRouter
+                },
+                timeout=httpx.Timeout(settings.OPENROUTER_TIMEOUT, connect=settings.OPENROUTER_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.OPENROUTER_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.OPENROUTER_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.OPENROUTER_KEEPALIVE_EXPIRY
+                )
+            )
+            print(f"✅ OpenRouter client ready (pool size: {settings.OPENROUTER_MAX_CONNECTIONS})")
+        return self.client
+    
+    async def close(self):
+        """Close the connection pool"""
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+    
+    async def _call_openrouter(self, messages, model="openai/gpt-3.5-turbo"):
+        """Make API call to OpenRouter (or answer it from the cassette in replay mode)"""
         data = {
             "model": model,
             "messages": messages,
@@ -70,15 +126,38 @@ class OpenRouterAIService:
             "temperature": 0.7
         }
         
+        if cassette.replaying:
+            return await self._replay_call(data)
+        
+        if not self.api_key:
+            print("❌ OPENROUTER_API_KEY is not set!")
+            return None
+        
+        # Fall back to a lazily created pool when used outside the app lifespan
+        client = self.client or self.connect()
+        
+        headers = {
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        # Hedged calls that lose the race are cancelled and keep this outcome
+        outcome = "cancelled"
+        content = usage = error_detail = None
+        started = time.perf_counter()
+        upstream_in_flight.inc()
         try:
             print(f"🔄 Calling OpenRouter API with model: {model}")
-            response = requests.post(f"{self.base_url}/chat/completions", headers=headers, json=data, timeout=30)
+            response = await client.post("/chat/completions", headers=headers, json=data)
             response.raise_for_status()
             result = response.json()
+            usage = result.get("usage")
+            self._record_usage(model, usage)
             content = result["choices"][0]["message"]["content"]
             print(f"✅ Successfully got response from {model}")
+            outcome = "ok" if content else "empty"
             return content
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
+            outcome = "http_error"
             error_detail = ""
             try:
                 error_response = e.response.json()
@@ -87,33 +166,327 @@ class OpenRouterAIService:
                 error_detail = e.response.text
             print(f"❌ HTTP Error for {model}: {error_detail}")
             return None
-        except requests.exceptions.RequestException as e:
-            print(f"❌ Request Error for {model}: {str(e)}")
+        except httpx.RequestError as e:
+            outcome = "transport_error"
+            error_detail = str(e)
+            print(f"❌ Request Error for {model}: {error_detail}")
             return None
         except Exception as e:
-            print(f"❌ Unexpected Error for {model}: {str(e)}")
+            outcome = "error"
+            error_detail = str(e)
+            print(f"❌ Unexpected Error for {model}: {error_detail}")
             return None
+        finally:
+            elapsed = time.perf_counter() - started
+            upstream_in_flight.dec()
+            upstream_requests.inc(model, outcome)
+            upstream_latency.observe(model, value=elapsed)
+            if cassette.recording and outcome != "cancelled":
+                cassette.record(data, outcome, content, usage, error_detail, elapsed)
     
-    def analyze_heritage_image(self, image_data):
-        """Analyze heritage site from image using OpenRouter with vision models"""
+    async def _replay_call(self, data):
+        """Answer a call from the cassette, after the recorded latency if configured"""
+        model = data["model"]
+        outcome = "cancelled"
+        started = time.perf_counter()
+        upstream_in_flight.inc()
+        try:
+            entry = cassette.lookup(data)
+            if entry is None:
+                outcome = "replay_miss"
+                print(f"📼 No recorded call for {model}, treating it as failed")
+                return None
+            if cassette.replay_latency:
+                await asyncio.sleep(entry["latency_seconds"])
+            self._record_usage(model, entry["usage"])
+            outcome = entry["outcome"]
+            return entry["content"] if outcome in ("ok", "empty") else None
+        finally:
+            upstream_in_flight.dec()
+            upstream_requests.inc(model, outcome)
+            upstream_latency.observe(model, value=time.perf_counter() - started)
+    
+    @staticmethod
+    def _record_usage(model, usage):
+        """Count the prompt and completion tokens OpenRouter reports for a call"""
+        if not usage:
+            return
+        upstream_tokens.inc(model, "prompt", amount=usage.get("prompt_tokens") or 0)
+        upstream_tokens.inc(model, "completion", amount=usage.get("completion_tokens") or 0)
+    
+    async def _stream_openrouter(self, messages, model):
+        """Stream completion tokens from OpenRouter; raises on HTTP or transport errors"""
+        data = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": 2000,
+            "temperature": 0.7,
+            "stream": True
+        }
+        if cassette.replaying:
+            async for piece in self._replay_stream(data):
+                yield piece
+            return
+        
+        client = self.client or self.connect()
+        headers = {
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        print(f"🔄 Streaming from OpenRouter with model: {model}")
+        outcome = "cancelled"
+        parts = []
+        usage = error_detail = first_token = None
+        started = time.perf_counter()
+        upstream_in_flight.inc()
+        try:
+            async with client.stream("POST", "/chat/completions", headers=headers, json=data) as response:
+                if response.is_error:
+                    outcome = "http_error"
+                    await response.aread()
+                    error_detail = response.text
+                    response.raise_for_status()
+                outcome = "error"
+                async for line in response.aiter_lines():
+                    # SSE comments (": OPENROUTER PROCESSING") and blank separators carry no data
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == "[DONE]":
+                        break
+                    chunk = json.loads(payload)
+                    if "error" in chunk:
+                        error_detail = chunk["error"].get("message", "stream error")
+                        raise RuntimeError(error_detail)
+                    # The final chunk carries the usage totals for the whole stream
+                    usage = chunk.get("usage") or usage
+                    self._record_usage(model, chunk.get("usage"))
+                    choices = chunk.get("choices") or [{}]
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        if first_token is None:
+                            first_token = time.perf_counter() - started
+                        parts.append(content)
+                        yield content
+                outcome = "ok"
+        except httpx.RequestError as e:
+            outcome = "transport_error"
+            error_detail = str(e)
+            raise
+        except (GeneratorExit, asyncio.CancelledError):
+            # The client went away mid-stream
+            outcome = "cancelled"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            upstream_in_flight.dec()
+            upstream_requests.inc(model, outcome)
+            upstream_latency.observe(model, value=elapsed)
+            if cassette.recording and outcome != "cancelled":
+                cassette.record(data, outcome, "".join(parts), usage, error_detail, elapsed, first_token)
+    
+    async def _replay_stream(self, data):
+        """Replay a recorded call as a stream, spreading the text over the recorded timings"""
+        model = data["model"]
+        outcome = "cancelled"
+        started = time.perf_counter()
+        upstream_in_flight.inc()
+        try:
+            entry = cassette.lookup(data)
+            if entry is None:
+                outcome = "replay_miss"
+                raise RuntimeError(f"No recorded call for {model}")
+            latency = entry["latency_seconds"] if cassette.replay_latency else 0.0
+            first_token = entry["first_token_seconds"]
+            first_token = latency if first_token is None or not cassette.replay_latency else first_token
+            if entry["outcome"] not in ("ok", "empty"):
+                await asyncio.sleep(latency)
+                outcome = entry["outcome"]
+                raise RuntimeError(entry["error"] or f"Recorded {outcome}")
+            
+            words = (entry["content"] or "").split(" ")
+            pieces = [" ".join(words[i:i + 4]) + (" " if i + 4 < len(words) else "") for i in range(0, len(words), 4)]
+            pieces = [piece for piece in pieces if piece]
+            await asyncio.sleep(first_token)
+            gap = max(0.0, latency - first_token) / max(1, len(pieces) - 1)
+            for number, piece in enumerate(pieces):
+                if number:
+                    await asyncio.sleep(gap)
+                yield piece
+            self._record_usage(model, entry["usage"])
+            outcome = entry["outcome"]
+        finally:
+            upstream_in_flight.dec()
+            upstream_requests.inc(model, outcome)
+            upstream_latency.observe(model, value=time.perf_counter() - started)
+    
+    @staticmethod
+    def _is_valid_text_result(result):
+        return bool(result and result.strip())
+    
+    @staticmethod
+    def _is_valid_vision_result(result):
+        return bool(result and result.strip() and not result.startswith("Error"))
+    
+    def _hedge_delay(self, chain):
+        """Seconds to wait on in-flight models before hedging with the next one"""
+        latencies = self.chain_latencies[chain]
+        if settings.AI_HEDGE_USE_P95 and len(latencies) >= settings.AI_HEDGE_MIN_SAMPLES:
+            ordered = sorted(latencies)
+            return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+        return settings.AI_HEDGE_DELAY
+    
+    async def _timed_call(self, messages, model):
+        started = time.perf_counter()
+        result = await self._call_openrouter(messages, model)
+        return result, time.perf_counter() - started
+    
+    async def _run_model_chain(self, candidates, chain, is_valid, on_attempt=None):
+        """
+        Run a model fallback chain and return (result, last_error).
+        
+        Models are tried in order. With hedging enabled, a model that has not answered
+        within the hedge delay gets raced against the next one, the first valid answer
+        wins and every other in-flight request is cancelled. on_attempt, if given, is
+        called with (attempt_number, model) each time a model is started.
+        """
+        ordered = model_router.order(candidates)
+        remaining = list(ordered)
+        in_flight = {}
+        started = {}
+        last_error = None
+        attempts = 0
+        won = False
+        
+        def launch(force=False):
+            """Start the next model whose circuit admits a request; False when none does"""
+            nonlocal attempts
+            while remaining:
+                model, messages = remaining.pop(0)
+                if force or model_router.acquire(model):
+                    print(f"🔄 Trying {chain} model: {model}")
+                    attempts += 1
+                    if on_attempt is not None:
+                        on_attempt(attempts, model)
+                    task = asyncio.ensure_future(self._timed_call(messages, model))
+                    in_flight[task] = model
+                    started[task] = time.perf_counter()
+                    return True
+                print(f"⏭️ Skipping {chain} model {model}: circuit open")
+            return False
+        
+        try:
+            if not launch():
+                # Every circuit is open: try the best-ranked model anyway rather than fail outright
+                remaining[:] = ordered
+                launch(force=True)
+            while in_flight:
+                can_hedge = (
+                    settings.AI_HEDGE_ENABLED
+                    and remaining
+                    and len(in_flight) < settings.AI_HEDGE_MAX_PARALLEL
+                )
+                delay = self._hedge_delay(chain) if can_hedge else None
+                done, _ = await asyncio.wait(in_flight, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    print(f"⏱️ No answer after {delay:.1f}s, hedging")
+                    launch()
+                    continue
+                
+                # Several can finish in the same round: record every one before picking a winner
+                winner = None
+                for task in done:
+                    model = in_flight.pop(task)
+                    try:
+                        result, elapsed = task.result()
+                    except Exception as e:
+                        last_error = str(e)
+                        model_router.record(model, ERROR, 0.0)
+                        print(f"❌ Model {model} failed with exception: {last_error}")
+                        continue
+                    if is_valid(result):
+                        model_router.record(model, OK, elapsed)
+                        if winner is None or elapsed < winner[2]:
+                            winner = (model, result, elapsed)
+                        continue
+                    model_router.record(model, ERROR if result is None else EMPTY, elapsed)
+                    print(f"⚠️ Model {model} returned empty or error result")
+                
+                if winner is not None:
+                    model, result, elapsed = winner
+                    self.chain_latencies[chain].append(elapsed)
+                    print(f"✅ {chain.capitalize()} request served by {model} in {elapsed:.2f}s")
+                    won = True
+                    return result, last_error
+                
+                if not in_flight and remaining:
+                    launch()
+            
+            return None, last_error
+        finally:
+            for task, model in in_flight.items():
+                if task.cancel() and won:
+                    # Outrun by the winner: count it, or an always-slow primary is never demoted
+                    model_router.record_hedge_loss(model, time.perf_counter() - started[task])
+                else:
+                    model_router.release(model)
+    
+    async def _coalesce(self, key, run_upstream):
+        """
+        Single-flight: concurrent callers with the same key share one upstream call.
+        
+        The shared task is shielded, so a waiter that disconnects does not cancel
+        the call for everyone else.
+        """
+        task = self.pending_requests.get(key)
+        if task is None:
+            task = asyncio.ensure_future(run_upstream())
+            self.pending_requests[key] = task
+            task.add_done_callback(lambda _: self.pending_requests.pop(key, None))
+        else:
+            self.coalesced_requests += 1
+            print(f"🔗 Joining in-flight {key[0]} request")
+        return await asyncio.shield(task)
+    
+    def get_coalescing_stats(self):
+        return {
+            "coalesced_requests": self.coalesced_requests,
+            "in_flight": len(self.pending_requests)
+        }
+    
+    async def analyze_heritage_image(self, image_data, on_progress=None):
+        """
+        Analyze heritage site from image (bytes or a seekable file) using OpenRouter vision models.
+        
+        on_progress, if given, is called with (stage, detail) as the analysis moves through
+        decode, encode, cache, model (once per attempt) and finally done or failed.
+        """
+        report = on_progress or (lambda stage, detail="": None)
         try:
             # Check API key first
             if not self.api_key:
+                report("failed", "API key not configured")
                 return "Error: OPENROUTER_API_KEY is not configured. Please set it in your environment variables."
             
-            # Convert image to base64
+            # Downscale and encode on the image worker pool
             try:
-                image = Image.open(io.BytesIO(image_data))
-                # Convert to RGB if necessary (some images might be RGBA)
-                if image.mode in ('RGBA', 'LA', 'P'):
-                    image = image.convert('RGB')
+                prepared = await prepare_image_async(image_data, on_stage=report)
             except Exception as e:
+                report("failed", "Image could not be decoded")
                 return f"Error processing image: {str(e)}. Please ensure you uploaded a valid image file."
             
-            # Convert image to base64 string
-            buffered = io.BytesIO()
-            image.save(buffered, format="JPEG", quality=85)
-            img_str = base64.b64encode(buffered.getvalue()).decode()
+            images_processed.inc("passthrough" if prepared.passthrough else "resized")
+            image_bytes.inc("upstream", amount=len(prepared.data_url))
+            
+            # Near-duplicate uploads are answered from earlier analyses
+            report("cache", f"{prepared.size[0]}x{prepared.size[1]} image")
+            image_hash = prepared.image_hash
+            cached = image_cache.get(image_hash)
+            if cached is not None:
+                print(f"⚡ Image cache hit for hash {image_hash:016x}")
+                report("done", "Matched an earlier analysis")
+                return cached
             
             # Standard OpenAI vision format (works for GPT-4 vision models)
             messages_standard = [
@@ -127,39 +500,33 @@ class OpenRouterAIService:
                         {
                             "type": "image_url",
                             "image_url": {
-                                "url": f"data:image/jpeg;base64,{img_str}"
+                                "url": prepared.data_url
                             }
                         }
                     ]
                 }
             ]
             
-            # Use a vision model - try different models if one fails
-            # Updated to use more reliable vision models available on OpenRouter
-            vision_models = [
-                ("openai/gpt-4o", messages_standard),  # GPT-4 Omni with vision support
-                ("openai/gpt-4-turbo", messages_standard),  # GPT-4 Turbo with vision
-                ("openai/gpt-4-vision-preview", messages_standard),  # GPT-4 Vision Preview
-                ("anthropic/claude-3-opus", messages_standard),  # Claude 3 Opus
-                ("anthropic/claude-3-sonnet", messages_standard),  # Claude 3 Sonnet
-                ("anthropic/claude-3-haiku", messages_standard),  # Claude 3 Haiku (faster)
-                ("google/gemini-pro-vision", messages_standard),  # Free vision model
-            ]
+            vision_models = [(model, messages_standard) for model in self.vision_models]
             
-            last_error = None
-            for model, messages in vision_models:
-                try:
-                    print(f"🔄 Trying vision model: {model}")
-                    result = self._call_openrouter(messages, model)
-                    if result and result.strip() and not result.startswith("Error"):
-                        print(f"✅ Successfully analyzed image using {model}")
-                        return result
-                    else:
-                        print(f"⚠️ Model {model} returned empty or error result")
-                except Exception as e:
-                    last_error = str(e)
-                    print(f"❌ Model {model} failed with exception: {last_error}")
-                    continue
+            def on_attempt(attempt, model):
+                report("model", f"Attempt {attempt}: {model}")
+            
+            async def run_vision_chain():
+                result, last_error = await self._run_model_chain(
+                    vision_models, "vision", self._is_valid_vision_result, on_attempt
+                )
+                if result:
+                    image_cache.set(image_hash, result)
+                    await knowledge_base.learn(result)
+                return result, last_error
+            
+            if ("image", image_hash) in self.pending_requests:
+                report("model", "Joined an identical analysis already in progress")
+            result, last_error = await self._coalesce(("image", image_hash), run_vision_chain)
+            if result:
+                report("done")
+                return result
             
             # If all models failed, return a helpful error message
             error_msg = "Sorry, I couldn't analyze this image. "
@@ -171,47 +538,70 @@ class OpenRouterAIService:
                 error_msg += "All vision models failed. Please check your API key configuration and try again with a clearer image."
             
             print(f"❌ All vision models failed. Last error: {last_error}")
+            report("failed", "All vision models failed")
             return error_msg
             
         except Exception as e:
             error_msg = f"Error analyzing image: {str(e)}"
             print(f"❌ Exception in analyze_heritage_image: {error_msg}")
+            report("failed", str(e))
             return error_msg
     
-    def search_heritage_info(self, query):
-        """Get heritage information from text query using OpenRouter"""
+    def _canonical_query(self, query):
+        """Map a query to its known site's canonical name so caches and models see one key"""
+        canonical = canonicalizer.canonicalize(query)
+        if canonical.site_id is None:
+            return query
+        if canonical.name != query:
+            print(f"🧭 Canonicalized '{query}' -> '{canonical.name}' ({canonical.method})")
+        return canonical.name
+    
+    def _build_search_messages(self, query):
+        return [
+            {
+                "role": "system",
+                "content": "You are a helpful historian and heritage guide expert."
+            },
+            {
+                "role": "user", 
+                "content": self.text_prompt_template.format(heritage_query=query)
+            }
+        ]
+    
+    async def search_heritage_info(self, query, refresh=False):
+        """
+        Get heritage information from text query using OpenRouter.
+        
+        refresh=True skips the search cache and knowledge base and asks the models again;
+        the new answer then replaces the cached one.
+        """
         try:
-            formatted_prompt = self.text_prompt_template.format(heritage_query=query)
+            query = self._canonical_query(query)
+            if not refresh:
+                cached = await search_cache.get(query)
+                if cached is not None:
+                    print(f"⚡ Search cache hit for: {query}")
+                    return cached
+                
+                known = knowledge_base.lookup_answer(query)
+                if known is not None:
+                    print(f"📚 Knowledge base hit for: {query}")
+                    return known
             
-            messages = [
-                {
-                    "role": "system",
-                    "content": "You are a helpful historian and heritage guide expert."
-                },
-                {
-                    "role": "user", 
-                    "content": formatted_prompt
-                }
-            ]
+            messages = self._build_search_messages(query)
             
-            # Try different models for best results
-            text_models = [
-                "openai/gpt-3.5-turbo",  # Fast and cost-effective
-                "anthropic/claude-3-sonnet",  # Good for detailed responses
-                "google/gemini-pro",  # Alternative
-                "meta-llama/llama-2-13b-chat"  # Open source option
-            ]
+            async def run_text_chain():
+                result, last_error = await self._run_model_chain(
+                    [(model, messages) for model in self.text_models], "text", self._is_valid_text_result
+                )
+                if result:
+                    await search_cache.set(query, result)
+                    await knowledge_base.learn(result, query)
+                return result, last_error
             
-            last_error = None
-            for model in text_models:
-                try:
-                    result = self._call_openrouter(messages, model)
-                    if result and result.strip():
-                        return result
-                except Exception as e:
-                    last_error = str(e)
-                    print(f"❌ Model {model} failed: {last_error}")
-                    continue
+            result, last_error = await self._coalesce(("text", normalize_query(query)), run_text_chain)
+            if result:
+                return result
             
             error_msg = "Sorry, I couldn't find information about this heritage site. "
             if not self.api_key:
@@ -226,6 +616,69 @@ class OpenRouterAIService:
         except Exception as e:
             return f"Error processing query: {str(e)}"
     
+    async def stream_heritage_info(self, query):
+        """
+        Yield heritage information for a text query as it is generated.
+        
+        Falls back to the next text model only while nothing has been sent yet; a
+        stream that breaks midway raises StreamInterrupted, so the caller can tell the
+        client the text it got is incomplete. Complete answers populate the search cache.
+        """
+        query = self._canonical_query(query)
+        cached = await search_cache.get(query)
+        if cached is not None:
+            print(f"⚡ Search cache hit for: {query}")
+            yield cached
+            return
+        
+        known = knowledge_base.lookup_answer(query)
+        if known is not None:
+            print(f"📚 Knowledge base hit for: {query}")
+            yield known
+            return
+        
+        if not self.api_key:
+            yield "Sorry, I couldn't find information about this heritage site. API key is not configured."
+            return
+        
+        messages = self._build_search_messages(query)
+        last_error = None
+        ordered = [model for model, _ in model_router.order([(model, messages) for model in self.text_models])]
+        # When every circuit is open, try the best-ranked model anyway rather than fail outright
+        forced = not any(model_router.available(model) for model in ordered)
+        for model in ordered[:1] if forced else ordered:
+            if not forced and not model_router.acquire(model):
+                continue
+            parts = []
+            started = time.perf_counter()
+            try:
+                async for token in self._stream_openrouter(messages, model):
+                    parts.append(token)
+                    yield token
+            except Exception as e:
+                last_error = str(e)
+                model_router.record(model, ERROR, time.perf_counter() - started)
+                print(f"❌ Streaming from {model} failed: {last_error}")
+                if parts:
+                    raise StreamInterrupted(f"The answer was cut off: {last_error}") from e
+                continue
+            finally:
+                # A client disconnect closes this generator mid-stream
+                model_router.release(model)
+            
+            result = "".join(parts)
+            if self._is_valid_text_result(result):
+                model_router.record(model, OK, time.perf_counter() - started)
+                print(f"✅ Streamed search result from {model}")
+                await search_cache.set(query, result)
+                await knowledge_base.learn(result, query)
+                return
+            model_router.record(model, EMPTY, time.perf_counter() - started)
+        
+        error_msg = "Sorry, I couldn't find information about this heritage site. "
+        error_msg += f"Error: {last_error}" if last_error else "Please try a different search term."
+        yield error_msg
+    
     def get_heritage_recommendations(self):
         """Get recommended heritage sites"""
         recommendations = [
@@ -0,0 +1,188 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
+from app.services.cache import LRUCache
+from app.services.database import mongodb
+from app.services.repositories import user_repository
+
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+# scrypt is deliberately slow; a small dedicated pool keeps it off the event loop and
+# bounds how much CPU a burst of logins can take
+_executor = ThreadPoolExecutor(max_workers=settings.AUTH_HASH_WORKERS, thread_name_prefix="auth-hash")
+
+class AuthError(Exception):
+    """A login or signup the caller should be told about (bad credentials, taken name...)"""
+
+    def __init__(self, message, status_code=400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+def hash_password(password, salt=None, n=None):
+    """Salted scrypt hash, stored as scrypt$n$r$p$salt$hash"""
+    salt = salt or os.urandom(16)
+    n = n or settings.AUTH_SCRYPT_N
+    digest = hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=SCRYPT_R, p=SCRYPT_P, maxmem=256 * n * SCRYPT_R)
+    return f"scrypt${n}${SCRYPT_R}${SCRYPT_P}${_b64encode(salt)}${_b64encode(digest)}"
+
+def verify_password(password, stored):
+    try:
+        _, n, r, p, salt, expected = stored.split("$")
+        digest = hashlib.scrypt(
+            password.encode("utf-8"), salt=_b64decode(salt), n=int(n), r=int(r), p=int(p), maxmem=256 * int(n) * int(r)
+        )
+    except (ValueError, TypeError):
+        return False
+    return hmac.compare_digest(digest, _b64decode(expected))
+
+class AuthService:
+    """
+    Accounts in the users collection and stateless HMAC-signed session tokens.
+
+    A token is base64(payload).base64(signature); any backend replica holding the same
+    AUTH_SECRET_KEY can verify it without a database round trip. Recently verified
+    tokens are kept in a small LRU so repeat requests skip even the HMAC and JSON work.
+    """
+
+    def __init__(self):
+        secret = settings.AUTH_SECRET_KEY
+        if not secret:
+            print("⚠️ AUTH_SECRET_KEY is not set; using a random key, sessions end when the server restarts")
+            secret = secrets.token_hex(32)
+        self.secret = secret.encode("utf-8")
+        self.sessions = LRUCache(settings.AUTH_SESSION_CACHE_SIZE, settings.AUTH_SESSION_CACHE_SECONDS)
+        self.session_hits = 0
+        self.session_misses = 0
+
+    @property
+    def demo_mode(self):
+        """Without a database configured any login is accepted, as the app always behaved"""
+        return not mongodb.configured
+
+    def _require_accounts(self):
+        """A configured database that is down must never fall back to accepting any login"""
+        if mongodb.db is None:
+            raise AuthError("Accounts are temporarily unavailable, please try again later", status_code=503)
+
+    async def _run(self, function, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_executor, function, *args)
+
+    def issue_token(self, username):
+        now = int(time.time())
+        payload = {"sub": username, "iat": now, "exp": now + settings.AUTH_TOKEN_TTL_SECONDS}
+        body = _b64encode(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+        signature = _b64encode(hmac.new(self.secret, body.encode("ascii"), hashlib.sha256).digest())
+        return f"{body}.{signature}"
+
+    def verify_token(self, token):
+        """Username a token was issued to, or None if it is forged, malformed or expired"""
+        if not token:
+            return None
+        cached = self.sessions.get(token)
+        if cached is not None:
+            username, expires_at = cached
+            if expires_at > time.time():
+                self.session_hits += 1
+                return username
+            return None
+
+        self.session_misses += 1
+        try:
+            # Tokens are plain base64url; anything else (e.g. non-ASCII) is simply invalid
+            body, _, signature = token.encode("ascii").partition(b".")
+        except UnicodeEncodeError:
+            return None
+        expected = _b64encode(hmac.new(self.secret, body, hashlib.sha256).digest()).encode("ascii")
+        if not signature or not hmac.compare_digest(signature, expected):
+            return None
+        try:
+            payload = json.loads(_b64decode(body.decode("ascii")))
+        except (ValueError, TypeError):
+            return None
+        if not isinstance(payload, dict) or not isinstance(payload.get("sub"), str):
+            return None
+        if not isinstance(payload.get("exp"), (int, float)) or payload["exp"] <= time.time():
+            return None
+        self.sessions.set(token, (payload["sub"], payload["exp"]))
+        return payload["sub"]
+
+    def user_from_header(self, authorization):
+        """Username from an "Authorization: Bearer <token>" header, or None"""
+        scheme, _, token = (authorization or "").partition(" ")
+        return self.verify_token(token.strip()) if scheme.lower() == "bearer" else None
+
+    async def signup(self, username, password, email):
+        username = (username or "").strip()
+        if not username or not password or not email:
+            raise AuthError("All fields are required")
+        if len(password) < settings.AUTH_MIN_PASSWORD_LENGTH:
+            raise AuthError(f"Password must be at least {settings.AUTH_MIN_PASSWORD_LENGTH} characters")
+        if self.demo_mode:
+            return "User created successfully! (Demo mode)"
+        self._require_accounts()
+
+        password_hash = await self._run(hash_password, password)
+        created = await user_repository.create({"username": username, "password_hash": password_hash, "email": email})
+        if not created:
+            raise AuthError("Username already exists", status_code=409)
+        print(f"👤 New user signed up: {username}")
+        return "User created successfully!"
+
+    async def login(self, username, password):
+        """Check credentials and return a session token"""
+        username = (username or "").strip()
+        if not username or not password:
+            raise AuthError("Invalid username or password", status_code=401)
+        if self.demo_mode:
+            return self.issue_token(username)
+        self._require_accounts()
+
+        user = await user_repository.find_by_username(username)
+        if user is None:
+            # Hash anyway, so unknown usernames cost as much as wrong passwords
+            await self._run(hash_password, password)
+            raise AuthError("Invalid username or password", status_code=401)
+
+        if "password_hash" in user:
+            valid = await self._run(verify_password, password, user["password_hash"])
+        else:
+            # Accounts created before hashing store the password itself; upgrade on login
+            valid = hmac.compare_digest(str(user.get("password", "")).encode("utf-8"), password.encode("utf-8"))
+            if valid:
+                password_hash = await self._run(hash_password, password)
+                await user_repository.set_password_hash(username, password_hash)
+                print(f"🔐 Upgraded stored password for {username}")
+        if not valid:
+            raise AuthError("Invalid username or password", status_code=401)
+        return self.issue_token(username)
+
+    def get_stats(self):
+        lookups = self.session_hits + self.session_misses
+        return {
+            "demo_mode": self.demo_mode,
+            "cached_sessions": len(self.sessions),
+            "session_cache_hits": self.session_hits,
+            "session_cache_misses": self.session_misses,
+            "session_cache_hit_rate": round(self.session_hits / lookups, 4) if lookups else 0.0
+        }
+
+def shutdown_auth_workers():
+    _executor.shutdown(wait=False)
+
+# Global auth service instance
+auth_service = AuthService()
@@ -0,0 +1,103 @@
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.services.repositories import search_cache_repository
+
+def normalize_query(query):
+    """Normalize a search query into a cache key (case, whitespace and punctuation insensitive)"""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    # Punctuation, symbols and separators become spaces; combining marks (e.g. Devanagari
+    # vowel signs) are kept with their letters
+    text = "".join(" " if unicodedata.category(char)[0] in "PSZC" else char for char in text)
+    return " ".join(text.split())
+
+class LRUCache:
+    """Size-bounded in-process LRU with per-entry expiry"""
+    
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self.evictions = 0
+        
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+    
+    def set(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+            
+    def __len__(self):
+        return len(self._entries)
+
+class SearchCache:
+    """Two-tier cache for heritage search results: in-process LRU backed by MongoDB"""
+    
+    def __init__(self):
+        self.ttl_seconds = settings.SEARCH_CACHE_TTL_SECONDS
+        self.memory = LRUCache(settings.SEARCH_CACHE_MAX_ENTRIES, self.ttl_seconds)
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+        
+    async def get(self, query):
+        key = normalize_query(query)
+        result = self.memory.get(key)
+        if result is not None:
+            self.memory_hits += 1
+            return result
+        
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        try:
+            document = await search_cache_repository.find_fresh(key, cutoff)
+        except Exception as e:
+            print(f"⚠️ Search cache lookup failed: {str(e)}")
+            document = None
+            
+        result = document["result"] if document else None
+        if result is not None:
+            self.persistent_hits += 1
+            self.memory.set(key, result)
+            return result
+        
+        self.misses += 1
+        return None
+    
+    async def set(self, query, result):
+        key = normalize_query(query)
+        self.memory.set(key, result)
+        try:
+            await search_cache_repository.upsert(
+                key, {"query": query, "result": result, "created_at": datetime.utcnow()}
+            )
+        except Exception as e:
+            print(f"⚠️ Search cache write failed: {str(e)}")
+            
+    def get_stats(self):
+        lookups = self.memory_hits + self.persistent_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "persistent_hits": self.persistent_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.persistent_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self.memory),
+            "memory_max_entries": self.memory.max_entries,
+            "memory_evictions": self.memory.evictions,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+# Global search cache instance
+search_cache = SearchCache()
@@ -0,0 +1,178 @@
+import unicodedata
+from collections import Counter, namedtuple
+from app.services.cache import normalize_query
+from app.services.site_index import trigrams
+
+Canonical = namedtuple("Canonical", ["site_id", "name", "method"])
+
+# Filler words that never distinguish one site from another
+STOP_WORDS = {
+    "the", "a", "an", "of", "at", "in", "on", "and", "about", "tell", "me", "what", "is",
+    "are", "was", "where", "who", "show", "info", "information", "history", "please",
+}
+
+# Well-known alternative, native-script and shorthand names of the featured sites
+KNOWN_ALIASES = {
+    "Taj Mahal": ["taj", "tajmahal", "ताज महल", "ताजमहल", "তাজমহল", "تاج محل"],
+    "Great Pyramid of Giza": [
+        "great pyramid", "pyramids of giza", "giza pyramids", "pyramid of khufu",
+        "pyramid of cheops", "الهرم الأكبر", "أهرامات الجيزة",
+    ],
+    "Colosseum": ["coliseum", "colloseum", "colosseo", "flavian amphitheatre", "flavian amphitheater", "amphitheatrum flavium"],
+    "Machu Picchu": ["machupicchu", "machu pikchu"],
+    "Great Wall of China": ["great wall", "长城", "長城", "万里长城", "萬里長城"],
+    "Petra": ["rose city", "البتراء", "بترا"],
+}
+
+def _fold(text):
+    """normalize_query plus accent stripping for Latin letters ("Colosséo" -> "colosseo")"""
+    decomposed = unicodedata.normalize("NFD", normalize_query(text))
+    kept = []
+    for char in decomposed:
+        # Only drop marks attached to Latin letters; marks in Indic scripts carry vowels
+        if unicodedata.category(char) == "Mn" and kept and kept[-1] < "ɐ":
+            continue
+        kept.append(char)
+    return unicodedata.normalize("NFC", "".join(kept))
+
+def site_key(text):
+    """Folded query without stop words, the form aliases are matched in"""
+    return " ".join(word for word in _fold(text).split() if word not in STOP_WORDS)
+
+def _edit_distance(a, b, limit):
+    """Edit distance counting adjacent transpositions as one edit, or limit + 1 once it exceeds limit"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if i > 1 and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                cost = min(cost, before_previous[j - 2] + 1)
+            current.append(cost)
+        # A transposition can reach the next row from either of the last two
+        if min(current) > limit and min(previous) > limit:
+            return limit + 1
+        before_previous, previous = previous, current
+    return previous[-1]
+
+class QueryCanonicalizer:
+    """
+    Maps free-text queries to canonical heritage site IDs before caching and model routing.
+    
+    Queries are Unicode-normalized, lowercased, stripped of Latin accents and stop words,
+    then matched against an alias table: exactly, after dropping trailing words of the
+    matched site's own location ("Taj Mahal, Agra"), and finally by edit distance over
+    trigram candidates. Fuzzy matching only forgives small typos inside longer words; a
+    word that is itself known ("great hall", "great wall") is never taken for a typo.
+    """
+    
+    def __init__(self):
+        self._aliases = {}
+        self._names = {}
+        # site_id -> words of its location, only ever trimmed from queries about that site
+        self._location_words = {}
+        # Every word of every alias and location, i.e. words that are not typos
+        self._vocabulary = set(STOP_WORDS)
+        self._trigram_keys = {}
+        self.counts = Counter()
+        
+    def add_site(self, name, location=None, aliases=()):
+        site_id = normalize_query(name)
+        if not site_id:
+            return
+        self._names[site_id] = name
+        for alias in [name, *aliases, *KNOWN_ALIASES.get(name, ())]:
+            key = site_key(alias)
+            if key and key not in self._aliases:
+                self._aliases[key] = site_id
+                self._vocabulary.update(key.split())
+                for gram in trigrams(key):
+                    self._trigram_keys.setdefault(gram, set()).add(key)
+        if location:
+            words = set(site_key(location).split())
+            self._location_words.setdefault(site_id, set()).update(words)
+            self._vocabulary.update(words)
+            
+    def add_sites(self, sites):
+        for name, location, aliases in sites:
+            self.add_site(name, location, aliases)
+            
+    def _is_location_of(self, words, site_id):
+        return bool(words) and all(word in self._location_words.get(site_id, ()) for word in words)
+    
+    def _trim_location(self, key):
+        """Site for an alias followed only by words of that site's own location"""
+        words = key.split()
+        for length in range(len(words) - 1, 0, -1):
+            site_id = self._aliases.get(" ".join(words[:length]))
+            if site_id is not None and self._is_location_of(words[length:], site_id):
+                return site_id
+        return None
+    
+    def _typo_distance(self, words, candidate_words):
+        """Total edits if each differing word is a plausible typo of its counterpart, else None"""
+        total = 0
+        for word, candidate_word in zip(words, candidate_words):
+            if word == candidate_word:
+                continue
+            # One letter turns many short words into other real words (hall/wall, tai/taj)
+            if len(candidate_word) <= 4 or word in self._vocabulary:
+                return None
+            limit = 1 if len(candidate_word) < 8 else 2
+            distance = _edit_distance(word, candidate_word, limit)
+            if distance > limit:
+                return None
+            total += distance
+        return total
+    
+    def _fuzzy(self, key):
+        if len(key) < 4:
+            return None
+        words = key.split()
+        shared = Counter()
+        for gram in trigrams(key):
+            shared.update(self._trigram_keys.get(gram, ()))
+        best = None
+        for candidate, _ in shared.most_common(20):
+            candidate_words = candidate.split()
+            if len(words) < len(candidate_words):
+                continue
+            extra = words[len(candidate_words):]
+            if extra and not self._is_location_of(extra, self._aliases[candidate]):
+                continue
+            compared = words[:len(candidate_words)]
+            max_edits = 1 if len(" ".join(compared)) < 12 else 2
+            distance = self._typo_distance(compared, candidate_words)
+            if distance is not None and distance <= max_edits and (best is None or distance < best[1]):
+                best = (candidate, distance)
+        return best[0] if best else None
+    
+    def _match(self, key):
+        if key in self._aliases:
+            return self._aliases[key], "alias"
+        
+        site_id = self._trim_location(key)
+        if site_id is not None:
+            return site_id, "location"
+        
+        candidate = self._fuzzy(key)
+        if candidate is not None:
+            return self._aliases[candidate], "fuzzy"
+        return None, "none"
+    
+    def canonicalize(self, query):
+        """Return Canonical(site_id, name, method); site_id is None when nothing matched"""
+        site_id, method = self._match(site_key(query))
+        self.counts[method] += 1
+        if site_id is None:
+            return Canonical(None, query, method)
+        return Canonical(site_id, self._names[site_id], method)
+    
+    def get_stats(self):
+        return {"sites": len(self._names), "aliases": len(self._aliases), "matches": dict(self.counts)}
+
+# Global query canonicalizer instance
+canonicalizer = QueryCanonicalizer()
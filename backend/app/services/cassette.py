@@ -0,0 +1,158 @@
+"""
+Record/replay store for OpenRouter calls.
+
+In record mode every upstream call is appended to a JSON Lines cassette: its
+fingerprint, outcome, content, usage and timings. In replay mode the same calls are
+answered from the cassette, optionally after the recorded latency, so the whole app
+runs offline and deterministically against real traffic shapes.
+
+Only a fingerprint of each request is stored (model, sampling parameters and a hash of
+the messages), never the prompts or image data themselves.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from app.core.config import settings
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+def fingerprint(request):
+    """Stable key for a chat completion request; streaming and plain calls share it"""
+    messages = json.dumps(request["messages"], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    params = {key: value for key, value in request.items() if key not in ("messages", "stream")}
+    key = {
+        "params": params,
+        "messages_sha256": hashlib.sha256(messages.encode("utf-8")).hexdigest(),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+class CassetteStore:
+    """
+    Append-only JSON Lines file with an in-memory index of byte offsets.
+
+    Opening scans the file once; after that a lookup is one dict access, a seek and
+    a single-line read. A fingerprint recorded several times keeps every take, and
+    replay cycles through them in recording order.
+    """
+
+    def __init__(self, mode=OFF, path=None, replay_latency=True):
+        self.mode = mode
+        self.path = path
+        self.replay_latency = replay_latency
+        self.index = {}
+        self.replayed = {}
+        self._reader = None
+        self._writer = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+
+    @property
+    def recording(self):
+        return self.mode == RECORD
+
+    @property
+    def replaying(self):
+        return self.mode == REPLAY
+
+    def open(self):
+        if self.mode == OFF or self._reader is not None:
+            return
+        if self.mode not in (RECORD, REPLAY):
+            print(f"⚠️ Unknown AI_CASSETTE_MODE '{self.mode}', record/replay disabled")
+            self.mode = OFF
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if self.recording:
+            self._writer = open(self.path, "ab")
+        elif not os.path.exists(self.path):
+            print(f"⚠️ Cassette {self.path} does not exist, every call will be a replay miss")
+            return
+        self._reader = open(self.path, "rb")
+        self._load_index()
+        print(f"📼 Cassette {self.mode} mode: {self.path} ({len(self.index)} requests, {self.entries()} takes)")
+
+    def _load_index(self):
+        offset = 0
+        for line in self._reader:
+            try:
+                self.index.setdefault(json.loads(line)["fingerprint"], []).append(offset)
+            except (ValueError, KeyError):
+                # A torn last line from an interrupted recording is skipped
+                pass
+            offset += len(line)
+
+    def close(self):
+        for handle in (self._reader, self._writer):
+            if handle is not None:
+                handle.close()
+        self._reader = self._writer = None
+
+    def entries(self):
+        return sum(len(offsets) for offsets in self.index.values())
+
+    def lookup(self, request):
+        """Next recorded take for this request, or None on a miss"""
+        self.open()
+        key = fingerprint(request)
+        offsets = self.index.get(key)
+        if not offsets or self._reader is None:
+            self.misses += 1
+            return None
+        take = self.replayed.get(key, 0)
+        self.replayed[key] = take + 1
+        with self._lock:
+            self._reader.seek(offsets[take % len(offsets)])
+            line = self._reader.readline()
+        self.hits += 1
+        return json.loads(line)
+
+    def record(self, request, outcome, content=None, usage=None, error=None, latency=0.0, first_token=None):
+        """Append one call; a single buffered write, cheap enough for the event loop"""
+        self.open()
+        if self._writer is None:
+            return
+        entry = {
+            "fingerprint": fingerprint(request),
+            "model": request["model"],
+            "stream": bool(request.get("stream")),
+            "outcome": outcome,
+            "content": content,
+            "usage": usage,
+            "error": error,
+            "latency_seconds": round(latency, 4),
+            "first_token_seconds": None if first_token is None else round(first_token, 4),
+            "recorded_at": time.time(),
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            offset = self._writer.tell()
+            self._writer.write(line)
+            self._writer.flush()
+        self.index.setdefault(entry["fingerprint"], []).append(offset)
+        self.recorded += 1
+
+    def get_stats(self):
+        return {
+            "mode": self.mode,
+            "path": self.path,
+            "requests": len(self.index),
+            "takes": self.entries(),
+            "recorded": self.recorded,
+            "replay_hits": self.hits,
+            "replay_misses": self.misses,
+            "replay_latency": self.replay_latency
+        }
+
+# Global cassette store
+cassette = CassetteStore(
+    settings.AI_CASSETTE_MODE.lower(), settings.AI_CASSETTE_PATH, settings.AI_CASSETTE_REPLAY_LATENCY
+)
@@ -1,38 +1,64 @@
 import certifi
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
 from app.core.config import settings
 
 class MongoDB:
+    """
+    Shared async MongoDB client.
+
+    The pool size, wait-queue and server-selection timeouts are explicit, so a slow
+    or unreachable cluster turns into a quick error instead of a request stuck
+    behind thirty-second socket timeouts.
+    """
+
     def __init__(self):
         self.client = None
         self.db = None
-        
-    def connect(self):
+
+    @property
+    def configured(self):
+        """Credentials are set, whether or not the cluster is reachable right now"""
+        return bool(settings.MONGODB_USERNAME and settings.MONGODB_PASSWORD and settings.MONGODB_CLUSTER)
+
+    async def connect(self):
+        if not self.configured:
+            print("⚠️ MongoDB is not configured, running without persistence")
+            return False
         try:
-            self.client = MongoClient(
+            self.client = AsyncIOMotorClient(
                 settings.MONGODB_URI,
                 tlsCAFile=certifi.where(),
                 tls=True,
-                connectTimeoutMS=30000,
-                socketTimeoutMS=30000
+                maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+                minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+                maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+                waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+                connectTimeoutMS=settings.MONGODB_CONNECT_TIMEOUT_MS,
+                serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS,
+                socketTimeoutMS=settings.MONGODB_SOCKET_TIMEOUT_MS,
+                readPreference=settings.MONGODB_READ_PREFERENCE
             )
             self.db = self.client[settings.MONGODB_DATABASE]
             # Test connection
-            self.client.admin.command('ping')
-            print("✅ Connected to MongoDB successfully!")
+            await self.client.admin.command('ping')
+            print(f"✅ Connected to MongoDB successfully! (pool size: {settings.MONGODB_MAX_POOL_SIZE})")
             return True
         except Exception as e:
             print(f"❌ MongoDB connection failed: {str(e)}")
+            # Run without persistence rather than time out on every query
+            self.close()
             return False
-            
+
     def close(self):
         if self.client:
             self.client.close()
-            
-    def get_collection(self, collection_name):
-        if self.db:
-            return self.db[collection_name]
+        self.client = None
+        self.db = None
+
+    def get_collection(self, collection_name, read_preference=None):
+        if self.db is not None:
+            return self.db.get_collection(collection_name, read_preference=read_preference)
         return None
 
 # Global database instance
-mongodb = MongoDB()
\ No newline at end of file
+mongodb = MongoDB()
@@ -0,0 +1,69 @@
+import re
+from app.models.heritage import HeritageRecord
+
+# Field labels used by both prompt templates, mapped to HeritageRecord attributes
+FIELD_LABELS = {
+    "name": "name",
+    "location": "location",
+    "historical period": "historical_period",
+    "builder/creator": "builder",
+    "builder": "builder",
+    "creator": "builder",
+    "significance": "significance",
+    "architectural style": "architectural_style",
+    "history": "history",
+    "current status": "current_status",
+    "interesting facts": "interesting_facts",
+    "visitor information": "visitor_information",
+    "nearby attractions": "nearby_attractions",
+    "best time to visit": "best_time_to_visit",
+    "travel tips": "travel_tips",
+}
+
+# "Name: ...", "**Name:** ...", "1. Name: ...", "### Name: ..." at the start of a line
+_LABEL_PATTERN = re.compile(
+    r"^[ \t]*(?:#+[ \t]*)?(?:\d+[.)][ \t]*)?[-*•]?[ \t]*\**[ \t]*("
+    + "|".join(re.escape(label) for label in sorted(FIELD_LABELS, key=len, reverse=True))
+    + r")[ \t]*\**[ \t]*:[ \t]*\**[ \t]*(.*)$",
+    re.IGNORECASE | re.MULTILINE,
+)
+_BULLET_PATTERN = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+_PLACEHOLDER_PATTERN = re.compile(r"^\[.*\]$")
+
+def _clean(value):
+    value = value.strip().strip("*").strip()
+    return value or None
+
+def _split_facts(value):
+    facts = []
+    for line in value.splitlines():
+        line = _BULLET_PATTERN.sub("", line).strip().strip("*").strip()
+        if line:
+            facts.append(line)
+    return facts
+
+def parse_heritage_record(text):
+    """
+    Parse an AI response written in the prompt's field layout into a HeritageRecord.
+    
+    Returns None when the response does not describe a recognizable site (no name,
+    a template placeholder, or no other field besides the name).
+    """
+    if not text:
+        return None
+    
+    matches = list(_LABEL_PATTERN.finditer(text))
+    fields = {}
+    for index, match in enumerate(matches):
+        attribute = FIELD_LABELS[match.group(1).lower()]
+        if attribute in fields:
+            continue
+        # A field runs until the next label
+        end = matches[index + 1].start() if index + 1 < len(matches) else len(text)
+        value = match.group(2) + text[match.end():end]
+        fields[attribute] = _split_facts(value) if attribute == "interesting_facts" else _clean(value)
+        
+    name = fields.get("name")
+    if not name or _PLACEHOLDER_PATTERN.match(name) or len(fields) < 2:
+        return None
+    return HeritageRecord(**{key: value for key, value in fields.items() if value})
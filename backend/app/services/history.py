@@ -0,0 +1,147 @@
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from bson import ObjectId
+from app.core.config import settings
+from app.services.cache import LRUCache
+from app.services.repositories import history_repository
+
+EPOCH = datetime(1970, 1, 1)
+
+def encode_cursor(entry):
+    """Opaque position after an entry: its creation time (ms since the epoch, UTC) and id"""
+    millis = (entry["created_at"] - EPOCH) // timedelta(milliseconds=1)
+    return f"{millis}-{entry['_id']}"
+
+def decode_cursor(cursor):
+    try:
+        millis, _, entry_id = cursor.partition("-")
+        return EPOCH + timedelta(milliseconds=int(millis)), ObjectId(entry_id)
+    except Exception:
+        raise ValueError("Invalid history cursor")
+
+def _sort_key(entry):
+    return entry["created_at"], entry["_id"]
+
+class HistoryService:
+    """
+    Per-user exploration history with write-behind persistence.
+
+    record() only appends to an in-process queue, so requests never wait on MongoDB.
+    A background task drains the queue with insert_many, up to HISTORY_BATCH_SIZE
+    entries per round trip, at least every HISTORY_FLUSH_SECONDS. Each user's latest
+    entries are also kept in memory and merged into reads, so a search shows up in
+    the history at once, before its batch is written (and without a database at all).
+    """
+
+    def __init__(self):
+        # Created in start(), inside the server's event loop (see JobManager)
+        self.queue = None
+        self.recent = LRUCache(settings.HISTORY_RECENT_USERS, settings.HISTORY_RECENT_SECONDS)
+        self.flusher = None
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=settings.HISTORY_QUEUE_SIZE)
+        self.flusher = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the flusher and write whatever is still queued"""
+        if self.flusher is not None:
+            self.flusher.cancel()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None
+        batch = []
+        while self.queue is not None and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if batch:
+            await self._write(batch)
+
+    def record(self, user_id, kind, query, result):
+        """Remember one search or image analysis for a user; never blocks"""
+        # Millisecond precision, as MongoDB stores it, so cursors match what was written
+        now = datetime.utcnow()
+        entry = {
+            "_id": ObjectId(),
+            "user_id": user_id,
+            "kind": kind,
+            "query": query,
+            "result": result,
+            "created_at": now.replace(microsecond=now.microsecond // 1000 * 1000)
+        }
+        recent = self.recent.get(user_id) or deque(maxlen=settings.HISTORY_RECENT_PER_USER)
+        recent.append(entry)
+        self.recent.set(user_id, recent)
+        if self.queue is None:
+            return
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print(f"⚠️ History queue full, not persisting entry for {user_id}")
+
+    async def _flush_loop(self):
+        while True:
+            batch = [await self.queue.get()]
+            deadline = time.monotonic() + settings.HISTORY_FLUSH_SECONDS
+            while len(batch) < settings.HISTORY_BATCH_SIZE:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._write(batch)
+
+    async def _write(self, batch):
+        try:
+            written = await history_repository.insert_many(batch)
+            if written:
+                self.written += written
+                self.batches += 1
+        except Exception as e:
+            self.dropped += len(batch)
+            print(f"⚠️ Could not save {len(batch)} history entries: {str(e)}")
+
+    async def page(self, user_id, limit, cursor=None):
+        """Newest-first entries older than cursor; returns (entries, next_cursor)"""
+        before = decode_cursor(cursor) if cursor else None
+        stored = await history_repository.find_page(user_id, limit + 1, before)
+        pending = [
+            entry for entry in self.recent.get(user_id) or ()
+            if before is None or _sort_key(entry) < before
+        ]
+        merged = {entry["_id"]: entry for entry in stored + pending}
+        entries = sorted(merged.values(), key=_sort_key, reverse=True)
+        next_cursor = encode_cursor(entries[limit - 1]) if len(entries) > limit else None
+        return entries[:limit], next_cursor
+
+    async def clear(self, user_id):
+        """Forget a user's history, including entries still waiting to be written"""
+        self.recent.set(user_id, deque(maxlen=settings.HISTORY_RECENT_PER_USER))
+        deleted = await history_repository.delete_user(user_id)
+        # Entries queued before the delete would otherwise reappear once flushed
+        remaining = []
+        while self.queue is not None and not self.queue.empty():
+            entry = self.queue.get_nowait()
+            if entry["user_id"] != user_id:
+                remaining.append(entry)
+        for entry in remaining:
+            self.queue.put_nowait(entry)
+        return deleted
+
+    def get_stats(self):
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "avg_batch_size": round(self.written / self.batches, 1) if self.batches else 0.0
+        }
+
+# Global history service instance
+history_service = HistoryService()
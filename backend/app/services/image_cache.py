@@ -0,0 +1,110 @@
+import numpy as np
+from collections import OrderedDict
+from PIL import Image
+from app.core.config import settings
+
+HASH_SIZE = 8
+HASH_BITS = HASH_SIZE * HASH_SIZE
+
+def dhash(image):
+    """64-bit difference hash: one bit per horizontally adjacent pixel pair of a 9x8 thumbnail"""
+    thumbnail = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    pixels = np.asarray(thumbnail, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+class MultiIndexHashIndex:
+    """
+    Multi-index hashing over 64-bit perceptual hashes.
+    
+    Each hash is split into max_distance + 1 disjoint bit ranges. Any hash within
+    max_distance of a query must match it exactly on at least one range (pigeonhole),
+    so a lookup only verifies the few candidates sharing a bucket with the query.
+    """
+    
+    def __init__(self, max_distance):
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        self.ranges = [(i * HASH_BITS // chunks, (i + 1) * HASH_BITS // chunks) for i in range(chunks)]
+        self.tables = [{} for _ in self.ranges]
+        
+    def _chunks(self, image_hash):
+        for start, end in self.ranges:
+            yield (image_hash >> start) & ((1 << (end - start)) - 1)
+            
+    def add(self, image_hash):
+        for table, chunk in zip(self.tables, self._chunks(image_hash)):
+            table.setdefault(chunk, set()).add(image_hash)
+            
+    def remove(self, image_hash):
+        for table, chunk in zip(self.tables, self._chunks(image_hash)):
+            bucket = table.get(chunk)
+            if bucket is None:
+                continue
+            bucket.discard(image_hash)
+            if not bucket:
+                del table[chunk]
+                
+    def nearest(self, image_hash):
+        """Return (hash, distance) of the closest stored hash within max_distance, or None"""
+        best = None
+        seen = set()
+        for table, chunk in zip(self.tables, self._chunks(image_hash)):
+            for candidate in table.get(chunk, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = hamming_distance(image_hash, candidate)
+                if distance <= self.max_distance and (best is None or distance < best[1]):
+                    best = (candidate, distance)
+                    if distance == 0:
+                        return best
+        return best
+
+class ImageResultCache:
+    """LRU cache of image analyses keyed by perceptual hash, answering near-duplicate uploads"""
+    
+    def __init__(self):
+        self.max_entries = settings.IMAGE_CACHE_MAX_ENTRIES
+        self.index = MultiIndexHashIndex(settings.IMAGE_CACHE_MAX_DISTANCE)
+        self._results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        
+    def get(self, image_hash):
+        match = self.index.nearest(image_hash)
+        if match is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._results.move_to_end(match[0])
+        return self._results[match[0]]
+    
+    def set(self, image_hash, result):
+        if image_hash not in self._results:
+            self.index.add(image_hash)
+        self._results[image_hash] = result
+        self._results.move_to_end(image_hash)
+        while len(self._results) > self.max_entries:
+            evicted, _ = self._results.popitem(last=False)
+            self.index.remove(evicted)
+            self.evictions += 1
+            
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._results),
+            "max_entries": self.max_entries,
+            "evictions": self.evictions,
+            "max_distance": self.index.max_distance
+        }
+
+# Global image result cache instance
+image_cache = ImageResultCache()
@@ -0,0 +1,100 @@
+import asyncio
+import base64
+import io
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from app.core.config import settings
+from app.services.image_cache import dhash
+
+EXIF_ORIENTATION = 0x0112
+
+# Transpose needed to display an image upright, per EXIF orientation value
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90,
+}
+
+PreparedImage = namedtuple("PreparedImage", ["data_url", "image_hash", "size", "passthrough"])
+
+# Pillow releases the GIL while decoding, resizing and encoding, so threads are enough
+# to keep this work off the event loop without pickling uploads into other processes
+_executor = ThreadPoolExecutor(max_workers=settings.IMAGE_WORKERS, thread_name_prefix="image-prep")
+
+def _data_url(jpeg_bytes):
+    return "data:image/jpeg;base64," + base64.b64encode(jpeg_bytes).decode("ascii")
+
+def _open_source(image_data):
+    """(file object, size in bytes) for raw bytes or an already spooled upload file"""
+    if isinstance(image_data, (bytes, bytearray, memoryview)):
+        return io.BytesIO(image_data), len(image_data)
+    image_data.seek(0, io.SEEK_END)
+    size = image_data.tell()
+    image_data.seek(0)
+    return image_data, size
+
+def _target_size(size, max_edge):
+    width, height = size
+    scale = min(1.0, max_edge / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def prepare_image(image_data, max_edge=None, quality=None, on_stage=None):
+    """
+    Turn an uploaded image into a bounded-size JPEG data URL for the vision models.
+    
+    image_data is bytes or a seekable file (a spooled upload is decoded straight from
+    disk). Small upright JPEGs are sent as-is. Everything else is decoded at reduced scale
+    (JPEG draft mode), downscaled to max_edge, rotated according to EXIF and re-encoded.
+    on_stage, if given, is called with "decode" and "encode" as each step begins.
+    """
+    max_edge = max_edge or settings.IMAGE_MAX_EDGE
+    quality = quality or settings.IMAGE_JPEG_QUALITY
+    on_stage = on_stage or (lambda stage: None)
+    
+    on_stage("decode")
+    source, byte_size = _open_source(image_data)
+    image = Image.open(source)
+    orientation = image.getexif().get(EXIF_ORIENTATION, 1)
+    
+    if (image.format == "JPEG" and orientation == 1 and max(image.size) <= max_edge
+            and byte_size <= settings.IMAGE_PASSTHROUGH_MAX_BYTES):
+        size = image.size
+        # A 1/8 scale decode is plenty for the 9x8 hash thumbnail
+        image.draft("L", (size[0] // 8 or 1, size[1] // 8 or 1))
+        image_hash = dhash(image)
+        source.seek(0)
+        return PreparedImage(_data_url(source.read()), image_hash, size, True)
+    
+    target = _target_size(image.size, max_edge)
+    if image.format == "JPEG":
+        # Let libjpeg skip detail during decode (1/2, 1/4 or 1/8 scale) instead of
+        # materialising the full-resolution bitmap first
+        image.draft("RGB", target)
+        
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_edge, max_edge), Image.BICUBIC)
+    # Rotating after the downscale touches far fewer pixels
+    if orientation in ORIENTATION_TRANSPOSE:
+        image = image.transpose(ORIENTATION_TRANSPOSE[orientation])
+    
+    on_stage("encode")
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=quality)
+    return PreparedImage(_data_url(buffered.getbuffer()), dhash(image), image.size, False)
+
+async def prepare_image_async(image_data, on_stage=None):
+    """Run prepare_image on the image worker pool, relaying stage callbacks to the event loop"""
+    loop = asyncio.get_running_loop()
+    relay = None
+    if on_stage is not None:
+        relay = lambda stage: loop.call_soon_threadsafe(on_stage, stage)
+    return await loop.run_in_executor(_executor, prepare_image, image_data, None, None, relay)
+
+def shutdown_image_workers():
+    _executor.shutdown(wait=False)
@@ -0,0 +1,209 @@
+import asyncio
+import math
+import time
+import uuid
+from collections import OrderedDict
+from app.core.config import settings
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Rough share of the work finished when each stage begins, for progress bars
+STAGE_PROGRESS = {
+    "queued": 0,
+    "decode": 10,
+    "encode": 25,
+    "cache": 35,
+    "model": 50,
+    "done": 100,
+    "failed": 100,
+}
+
+STAGE_LABELS = {
+    "queued": "Waiting for a free worker",
+    "decode": "Decoding image",
+    "encode": "Compressing image for the AI",
+    "cache": "Checking earlier analyses",
+    "model": "Asking vision model",
+    "done": "Analysis complete",
+    "failed": "Analysis failed",
+}
+
+class Job:
+    """One background analysis and its latest progress"""
+
+    def __init__(self, kind, payload):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.status = QUEUED
+        self.stage = "queued"
+        self.detail = ""
+        self.progress = 0
+        self.attempts = 0
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        # Bumped on every change so watchers can tell whether they missed one
+        self.version = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def report(self, stage, detail=""):
+        """Record that the job entered a stage; wakes anyone streaming its progress"""
+        self.stage = stage
+        self.detail = detail or STAGE_LABELS.get(stage, stage)
+        progress = STAGE_PROGRESS.get(stage, self.progress)
+        if stage == "model":
+            # Each fallback attempt moves the bar a little further without reaching the end
+            self.attempts += 1
+            progress = min(90, progress + 10 * (self.attempts - 1))
+        if stage != "failed":
+            self.progress = max(self.progress, progress)
+        self._touch()
+
+    def start(self):
+        self.status = RUNNING
+        self._touch()
+
+    def finish(self, result):
+        self.status = DONE
+        self.result = result
+        self.progress = 100
+        self._touch()
+
+    def fail(self, error):
+        self.status = FAILED
+        self.error = error
+        self._touch()
+
+    def _touch(self):
+        self.version += 1
+        self.updated_at = time.time()
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait_for_change(self, seen_version, timeout):
+        """Wait until the job has moved past seen_version; False on timeout"""
+        if self.version != seen_version:
+            return True
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "detail": self.detail,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
+
+class JobManager:
+    """
+    In-process job queue drained by a fixed pool of worker tasks.
+
+    Finished jobs are kept for JOB_TTL_SECONDS so clients can collect the result,
+    then dropped. The queue is bounded: submit raises QueueFull when it is full.
+    """
+
+    def __init__(self, workers=None, max_queued=None, ttl=None):
+        self.worker_count = workers or settings.JOB_WORKERS
+        self.ttl = ttl or settings.JOB_TTL_SECONDS
+        self.max_queued = max_queued or settings.JOB_QUEUE_SIZE
+        # Created in start(): on Python < 3.10 asyncio primitives bind to the loop current
+        # at construction, which at import time is not the one the server runs on
+        self.queue = None
+        self.jobs = OrderedDict()
+        self.handlers = {}
+        self.workers = []
+        # Smoothed run time of a job, for Retry-After estimates when the queue is full
+        self.avg_run_seconds = 10.0
+
+    def register(self, kind, handler):
+        """handler(job) is awaited by a worker and returns the result or raises"""
+        self.handlers[kind] = handler
+
+    def start(self):
+        self.queue = asyncio.Queue(maxsize=self.max_queued)
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+        print(f"✅ Job workers started ({self.worker_count})")
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    def submit(self, kind, payload):
+        """Queue a job and return it immediately"""
+        self._prune()
+        job = Job(kind, payload)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def estimated_wait(self):
+        """Seconds until a job submitted now would likely start"""
+        return math.ceil(self.avg_run_seconds * (self.queued() + 1) / self.worker_count)
+
+    def queued(self):
+        return self.queue.qsize() if self.queue is not None else 0
+
+    def _prune(self):
+        """Forget finished jobs older than the TTL (oldest first)"""
+        cutoff = time.time() - self.ttl
+        for job_id in list(self.jobs):
+            job = self.jobs[job_id]
+            if job.created_at >= cutoff:
+                break
+            if job.finished and job.updated_at < cutoff:
+                del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            started = time.monotonic()
+            try:
+                job.start()
+                result = await self.handlers[job.kind](job)
+                if job.stage == "failed":
+                    job.fail(result)
+                else:
+                    job.finish(result)
+            except asyncio.CancelledError:
+                job.fail("Server shutting down")
+                raise
+            except Exception as e:
+                print(f"❌ Job {job.id} failed: {str(e)}")
+                job.fail(str(e))
+            finally:
+                # Uploads can be large; drop the reference as soon as the job is done with it
+                job.payload = None
+                self.queue.task_done()
+                self.avg_run_seconds += 0.2 * (time.monotonic() - started - self.avg_run_seconds)
+
+    def get_stats(self):
+        statuses = {}
+        for job in self.jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {"workers": len(self.workers), "queued": self.queued(), "jobs": statuses}
+
+job_manager = JobManager()
@@ -0,0 +1,122 @@
+from datetime import datetime, timedelta
+from app.core.config import settings
+from app.models.heritage import SiteDocument
+from app.services.cache import normalize_query
+from app.services.canonicalizer import canonicalizer, site_key
+from app.services.repositories import site_repository
+from app.services.heritage_parser import parse_heritage_record
+from app.services.site_index import site_index
+
+def names_site(query, name, location=None):
+    """
+    Whether a query plainly refers to the named site: every word of it belongs to the
+    site's name or location, and it covers at least half of the name ("taj" for Taj
+    Mahal, "taj mahal agra"). A model answering about some other, similar site does
+    not make the query an alias of that site.
+    """
+    query_words = set(site_key(query).split())
+    name_words = set(site_key(name).split())
+    known_words = name_words | set(site_key(location or "").split())
+    return bool(query_words) and query_words <= known_words and 2 * len(query_words & name_words) >= len(name_words)
+
+class SiteKnowledgeBase:
+    """
+    Structured heritage records persisted in the MongoDB "sites" collection.
+    
+    Records are keyed by canonical (normalized) site name and remember the queries
+    that plainly name them as aliases. An in-process index over names and aliases lets
+    known sites be answered without an LLM call, for as long as the search cache would
+    have kept the same answer (SEARCH_CACHE_TTL_SECONDS).
+    """
+    
+    def __init__(self):
+        self._sites = {}
+        self._aliases = {}
+        self.hits = 0
+        
+    def _index(self, site):
+        self._sites[site.canonical_name] = site
+        self._aliases[site.canonical_name] = site.canonical_name
+        for alias in site.aliases:
+            self._aliases[alias] = site.canonical_name
+            
+    async def load(self):
+        """Warm the in-process index from MongoDB"""
+        try:
+            async for document in site_repository.find_all():
+                document.pop("_id", None)
+                site = SiteDocument(**document)
+                # Records saved before aliases were checked may carry queries about other sites
+                site.aliases = [alias for alias in site.aliases if names_site(alias, site.name, site.location)]
+                self._index(site)
+            if self._sites:
+                print(f"✅ Loaded {len(self._sites)} heritage sites into the knowledge base")
+        except Exception as e:
+            print(f"⚠️ Could not load heritage sites: {str(e)}")
+            
+    def get(self, name):
+        """Look up a site record by name or alias"""
+        canonical_name = self._aliases.get(normalize_query(name))
+        return self._sites.get(canonical_name) if canonical_name else None
+    
+    def lookup_answer(self, query):
+        """Return a stored search answer for a known site, or None if there is none or it is stale"""
+        site = self.get(query)
+        if site is None or not site.search_text:
+            return None
+        # Visitor information and the like change; answers age out like search cache entries
+        cutoff = datetime.utcnow() - timedelta(seconds=settings.SEARCH_CACHE_TTL_SECONDS)
+        if site.updated_at is None or site.updated_at < cutoff:
+            return None
+        self.hits += 1
+        return site.search_text
+    
+    async def learn(self, text, query=None):
+        """
+        Parse an AI response and upsert the resulting record.
+        
+        Answers to a query naming the site become servable answers. Image analyses,
+        and answers to queries about something else ("Great Wall of India" answered
+        with the Great Wall of China), only contribute structured fields.
+        """
+        record = parse_heritage_record(text)
+        if record is None:
+            return None
+        
+        canonical_name = normalize_query(record.name)
+        existing = self._sites.get(canonical_name)
+        answers_site = bool(query) and (
+            normalize_query(query) == canonical_name or names_site(query, record.name, record.location)
+        )
+        if existing is not None and not answers_site:
+            # Keep the record built from an answer about this very site
+            return existing
+        aliases = set(existing.aliases) if existing else set()
+        if answers_site and normalize_query(query) != canonical_name:
+            aliases.add(normalize_query(query))
+            
+        site = SiteDocument(
+            **record.model_dump(),
+            canonical_name=canonical_name,
+            aliases=sorted(aliases),
+            search_text=text if answers_site else None,
+            updated_at=datetime.utcnow()
+        )
+        self._index(site)
+        site_index.add_site(site.name, site.location, site.aliases)
+        canonicalizer.add_site(site.name, site.location, site.aliases)
+        try:
+            await site_repository.upsert(site.canonical_name, site.model_dump())
+        except Exception as e:
+            print(f"⚠️ Could not save heritage site {record.name}: {str(e)}")
+        return site
+    
+    def catalog_entries(self):
+        """(name, location, aliases) of every known site, for the suggestion and alias indexes"""
+        return [(site.name, site.location, site.aliases) for site in self._sites.values()]
+    
+    def get_stats(self):
+        return {"sites": len(self._sites), "aliases": len(self._aliases), "hits": self.hits}
+
+# Global knowledge base instance
+knowledge_base = SiteKnowledgeBase()
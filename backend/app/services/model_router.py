@@ -0,0 +1,184 @@
+import time
+from collections import deque
+from app.core.config import settings
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+OK = "ok"
+ERROR = "error"
+EMPTY = "empty"
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+class ModelHealth:
+    """Rolling outcome/latency window and circuit breaker state for one model"""
+    
+    def __init__(self, window):
+        # (timestamp, value) pairs, bounded by count and pruned by age
+        self.outcomes = deque(maxlen=window)
+        self.latencies = deque(maxlen=window)
+        # Hedged races this model was still running when another model answered
+        self.hedge_losses = deque(maxlen=window)
+        self.state = CLOSED
+        self.opened_at = None
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        self.total_calls = 0
+        
+    def prune(self, max_age):
+        cutoff = time.monotonic() - max_age
+        for window in (self.outcomes, self.latencies, self.hedge_losses):
+            while window and window[0][0] < cutoff:
+                window.popleft()
+                
+    def rate(self, outcome):
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for _, o in self.outcomes if o == outcome) / len(self.outcomes)
+    
+    def failure_rate(self):
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for _, o in self.outcomes if o != OK) / len(self.outcomes)
+    
+    def latency_percentile(self, fraction):
+        return _percentile([latency for _, latency in self.latencies], fraction)
+    
+    def mostly_losing_hedges(self):
+        """Beaten by a hedge at least twice, and more often than it answered itself"""
+        wins = sum(1 for _, o in self.outcomes if o == OK)
+        return len(self.hedge_losses) >= 2 and len(self.hedge_losses) >= wins
+
+class ModelRouter:
+    """
+    Orders model fallback chains by observed health.
+    
+    Every call outcome (ok, error, empty response) and its latency is recorded per model,
+    and evidence older than the configured window ages out. A model whose recent failure
+    rate or consecutive failures cross the configured thresholds has its circuit opened
+    and is skipped; after a cooldown it becomes half-open and a single probe request
+    decides whether it closes again. A model that keeps losing hedged races ranks as
+    slow, so a primary that never fails but is always outrun stops going first.
+    """
+    
+    def __init__(self):
+        self.models = {}
+        
+    def _health(self, model):
+        health = self.models.get(model)
+        if health is None:
+            health = self.models[model] = ModelHealth(settings.MODEL_ROUTER_WINDOW)
+        return health
+    
+    def _refresh_state(self, health):
+        # Old evidence ages out so a demoted model gets another chance
+        health.prune(settings.MODEL_ROUTER_WINDOW_SECONDS)
+        if health.state == OPEN and time.monotonic() - health.opened_at >= settings.MODEL_ROUTER_COOLDOWN_SECONDS:
+            # The probe starts from a clean slate so it is tried at the model's usual position
+            health.state = HALF_OPEN
+            health.outcomes.clear()
+            
+    def _rank(self, model, index):
+        health = self._health(model)
+        self._refresh_state(health)
+        state_rank = 1 if health.state == OPEN else 0
+        # Coarse buckets keep the configured preference order unless health clearly differs
+        failure_bucket = 0
+        if len(health.outcomes) >= settings.MODEL_ROUTER_MIN_CALLS:
+            failure_bucket = round(health.failure_rate() * 10)
+        p50 = health.latency_percentile(0.5)
+        slow = 1 if (p50 is not None and p50 > settings.MODEL_ROUTER_SLOW_SECONDS) or health.mostly_losing_hedges() else 0
+        return (state_rank, failure_bucket, slow, index)
+    
+    def order(self, candidates):
+        """Sort (model, payload) candidates healthiest first, open circuits last"""
+        ranked = sorted(enumerate(candidates), key=lambda item: self._rank(item[1][0], item[0]))
+        return [candidate for _, candidate in ranked]
+    
+    def available(self, model):
+        """Whether acquire(model) would currently admit a request"""
+        health = self._health(model)
+        self._refresh_state(health)
+        return health.state == CLOSED or (health.state == HALF_OPEN and not health.probe_in_flight)
+    
+    def acquire(self, model):
+        """Whether a request may be sent to model now; half-open models admit one probe at a time"""
+        if not self.available(model):
+            return False
+        health = self._health(model)
+        if health.state == HALF_OPEN:
+            health.probe_in_flight = True
+            print(f"🩺 Probing half-open model: {model}")
+        return True
+    
+    def release(self, model):
+        """Give up a probe slot without recording an outcome (e.g. a cancelled hedge)"""
+        self._health(model).probe_in_flight = False
+        
+    def record_hedge_loss(self, model, elapsed):
+        """A request cancelled because another model answered first; elapsed is a lower bound on its latency"""
+        health = self._health(model)
+        now = time.monotonic()
+        health.hedge_losses.append((now, elapsed))
+        health.latencies.append((now, elapsed))
+        health.probe_in_flight = False
+        
+    def record(self, model, outcome, latency):
+        health = self._health(model)
+        now = time.monotonic()
+        health.total_calls += 1
+        health.outcomes.append((now, outcome))
+        health.probe_in_flight = False
+        
+        if outcome == OK:
+            health.latencies.append((now, latency))
+            health.consecutive_failures = 0
+            if health.state != CLOSED:
+                print(f"✅ Circuit closed for model: {model}")
+                health.state = CLOSED
+                health.outcomes.clear()
+                health.outcomes.append((now, OK))
+            return
+        
+        health.consecutive_failures += 1
+        tripped = health.state == HALF_OPEN or health.consecutive_failures >= settings.MODEL_ROUTER_MAX_CONSECUTIVE_FAILURES or (
+            len(health.outcomes) >= settings.MODEL_ROUTER_MIN_CALLS
+            and health.failure_rate() >= settings.MODEL_ROUTER_FAILURE_THRESHOLD
+        )
+        if tripped:
+            if health.state != OPEN:
+                print(f"🚫 Circuit opened for model: {model} ({health.consecutive_failures} consecutive failures)")
+            health.state = OPEN
+            health.opened_at = time.monotonic()
+            
+    def scoreboard(self):
+        board = {}
+        for model, health in self.models.items():
+            self._refresh_state(health)
+            p50 = health.latency_percentile(0.5)
+            p95 = health.latency_percentile(0.95)
+            retry_in = None
+            if health.state == OPEN:
+                retry_in = round(max(0.0, settings.MODEL_ROUTER_COOLDOWN_SECONDS - (time.monotonic() - health.opened_at)), 1)
+            board[model] = {
+                "state": health.state,
+                "total_calls": health.total_calls,
+                "window_calls": len(health.outcomes),
+                "error_rate": round(health.rate(ERROR), 3),
+                "empty_rate": round(health.rate(EMPTY), 3),
+                "latency_p50": round(p50, 3) if p50 is not None else None,
+                "latency_p95": round(p95, 3) if p95 is not None else None,
+                "hedge_losses": len(health.hedge_losses),
+                "consecutive_failures": health.consecutive_failures,
+                "retry_in_seconds": retry_in
+            }
+        return board
+
+# Global model router instance
+model_router = ModelRouter()
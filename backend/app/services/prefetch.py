@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+from app.core.config import settings
+from app.core.responses import CachedJSONResponse
+from app.services.ai_service import ai_service
+from app.services.admission import admission
+from app.services.cache import normalize_query
+
+def is_answer(result):
+    """A real answer rather than one of the search fallbacks ("Sorry...", "Error...")"""
+    return bool(result) and not result.startswith(("Sorry", "Error"))
+
+class FeaturedPrefetcher:
+    """
+    Search answers for the featured sites, generated before anyone asks.
+
+    The featured cards are the most clicked items on the home page, so their answers
+    are fetched in the background at startup, through the normal search path (search
+    cache, knowledge base, coalescing). Every PREFETCH_REFRESH_SECONDS they are generated
+    again past the caches, so answers stay fresh and the search cache is renewed too.
+    Fetches share the global AI concurrency limit, queueing behind user requests rather
+    than refusing them. Each answer is kept serialized and compressed, ready to serve.
+    """
+
+    def __init__(self):
+        self.ready = {}
+        self.task = None
+        self.rounds = 0
+        self.fetched = 0
+        self.failures = 0
+        self.hits = 0
+        self.misses = 0
+        self.last_refresh = None
+
+    def sites(self):
+        return {normalize_query(site["name"]): site for site in ai_service.get_heritage_recommendations()}
+
+    def start(self):
+        if not settings.PREFETCH_ENABLED:
+            return
+        self.task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    async def _refresh_loop(self):
+        await self.refresh()
+        while True:
+            await asyncio.sleep(settings.PREFETCH_REFRESH_SECONDS)
+            await self.refresh(regenerate=True)
+
+    async def refresh(self, regenerate=False):
+        """Fetch every featured site's answer; a failed fetch keeps the previous one"""
+        if not ai_service.api_key:
+            print("⚠️ Skipping featured site prefetch: API key is not configured")
+            return
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(max(1, settings.PREFETCH_CONCURRENCY))
+
+        async def fetch_one(site):
+            async with semaphore:
+                await self.fetch(site, regenerate)
+
+        await asyncio.gather(*(fetch_one(site) for site in self.sites().values()))
+        self.rounds += 1
+        self.last_refresh = time.time()
+        print(f"🌟 Prefetched {len(self.ready)} featured sites in {time.perf_counter() - started:.1f}s")
+
+    async def fetch(self, site, regenerate=False, hold_slot=True):
+        """
+        Search one featured site and store (answer, ready response) for get(); None if the search failed.
+        
+        hold_slot=False is for callers that already hold an admission slot: waiting for a
+        second one could leave every slot held by a request waiting for another.
+        """
+        try:
+            if hold_slot:
+                async with admission.slot(bounded=False):
+                    result = await ai_service.search_heritage_info(site["name"], refresh=regenerate)
+            else:
+                result = await ai_service.search_heritage_info(site["name"], refresh=regenerate)
+        except Exception as e:
+            result = f"Error: {str(e)}"
+        if not is_answer(result):
+            self.failures += 1
+            print(f"⚠️ Could not prefetch {site['name']}: {result[:120]}")
+            return None
+
+        body = json.dumps({"success": True, "name": site["name"], "result": result}).encode()
+        entry = (result, CachedJSONResponse(body, max_age=settings.PREFETCH_MAX_AGE))
+        self.ready[normalize_query(site["name"])] = entry
+        self.fetched += 1
+        return entry
+
+    def get(self, name):
+        """(answer, ready response) for a featured site, or None if it has not been fetched yet"""
+        entry = self.ready.get(normalize_query(name))
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "enabled": settings.PREFETCH_ENABLED,
+            "sites": len(self.sites()),
+            "ready": len(self.ready),
+            "rounds": self.rounds,
+            "fetched": self.fetched,
+            "failures": self.failures,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "last_refresh": self.last_refresh,
+            "refresh_seconds": settings.PREFETCH_REFRESH_SECONDS
+        }
+
+# Global featured site prefetcher instance
+featured_prefetcher = FeaturedPrefetcher()
@@ -0,0 +1,171 @@
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReadPreference
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.services.database import mongodb
+
+class Repository:
+    """
+    Async access to one MongoDB collection.
+
+    Subclasses declare the indexes their queries rely on; they are created once at
+    startup, so every lookup is an index walk rather than a collection scan. Each
+    method returns None (or does nothing) while the app runs without a database.
+    """
+
+    collection_name = None
+    indexes = ()
+    # None inherits the client's MONGODB_READ_PREFERENCE
+    read_preference = None
+
+    @property
+    def collection(self):
+        return mongodb.get_collection(self.collection_name, self.read_preference)
+
+    def index_models(self):
+        return list(self.indexes)
+
+    async def ensure_indexes(self):
+        collection = self.collection
+        models = self.index_models()
+        if collection is None or not models:
+            return
+        try:
+            await collection.create_indexes(models)
+        except Exception as e:
+            print(f"⚠️ Could not create {self.collection_name} indexes: {str(e)}")
+
+class UserRepository(Repository):
+    """Accounts, looked up by username on every login"""
+
+    collection_name = "users"
+    indexes = (IndexModel([("username", ASCENDING)], unique=True, name="username_unique"),)
+
+    async def find_by_username(self, username):
+        collection = self.collection
+        if collection is None:
+            return None
+        return await collection.find_one({"username": username}, max_time_ms=settings.MONGODB_QUERY_TIMEOUT_MS)
+
+    async def create(self, document):
+        """Insert a new user; False when the username is already taken"""
+        collection = self.collection
+        if collection is None:
+            return False
+        try:
+            await collection.insert_one(document)
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def set_password_hash(self, username, password_hash):
+        """Replace a legacy plaintext password with its hash"""
+        collection = self.collection
+        if collection is None:
+            return
+        await collection.update_one(
+            {"username": username}, {"$set": {"password_hash": password_hash}, "$unset": {"password": ""}}
+        )
+
+class SearchCacheRepository(Repository):
+    """Persistent tier of the search cache; MongoDB expires entries through a TTL index"""
+
+    collection_name = "search_cache"
+    # A slightly stale cache read is harmless and takes load off the primary
+    read_preference = ReadPreference.SECONDARY_PREFERRED
+
+    def index_models(self):
+        return [IndexModel(
+            [("created_at", ASCENDING)],
+            expireAfterSeconds=settings.SEARCH_CACHE_TTL_SECONDS,
+            name="created_at_ttl"
+        )]
+
+    async def find_fresh(self, key, cutoff):
+        collection = self.collection
+        if collection is None:
+            return None
+        return await collection.find_one(
+            {"_id": key, "created_at": {"$gt": cutoff}}, max_time_ms=settings.MONGODB_QUERY_TIMEOUT_MS
+        )
+
+    async def upsert(self, key, document):
+        collection = self.collection
+        if collection is None:
+            return
+        await collection.replace_one({"_id": key}, {"_id": key, **document}, upsert=True)
+
+class SiteRepository(Repository):
+    """Structured heritage records behind the knowledge base"""
+
+    collection_name = "sites"
+    indexes = (IndexModel([("aliases", ASCENDING)], name="aliases"),)
+    read_preference = ReadPreference.SECONDARY_PREFERRED
+
+    async def find_all(self):
+        """Every stored site, streamed in batches"""
+        collection = self.collection
+        if collection is None:
+            return
+        async for document in collection.find({}, batch_size=1000):
+            yield document
+
+    async def upsert(self, site_id, document):
+        collection = self.collection
+        if collection is None:
+            return
+        await collection.update_one({"_id": site_id}, {"$set": document}, upsert=True)
+
+class HistoryRepository(Repository):
+    """Per-user search and analysis history, read newest first"""
+
+    collection_name = "history"
+    indexes = (
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)], name="user_recent"),
+    )
+
+    async def insert_many(self, entries):
+        """Write a batch in one round trip; returns how many were stored"""
+        collection = self.collection
+        if collection is None:
+            return 0
+        # Unordered: one bad document does not stop the rest of the batch
+        result = await collection.insert_many(entries, ordered=False)
+        return len(result.inserted_ids)
+
+    async def find_page(self, user_id, limit, before=None):
+        """Up to limit entries newest first, strictly older than before=(created_at, _id)"""
+        collection = self.collection
+        if collection is None:
+            return []
+        query = {"user_id": user_id}
+        if before is not None:
+            created_at, entry_id = before
+            query["$or"] = [
+                {"created_at": {"$lt": created_at}},
+                {"created_at": created_at, "_id": {"$lt": entry_id}}
+            ]
+        cursor = collection.find(query, max_time_ms=settings.MONGODB_QUERY_TIMEOUT_MS)
+        cursor = cursor.sort([("created_at", DESCENDING), ("_id", DESCENDING)]).limit(limit)
+        return await cursor.to_list(length=limit)
+
+    async def delete_user(self, user_id):
+        collection = self.collection
+        if collection is None:
+            return 0
+        result = await collection.delete_many({"user_id": user_id})
+        return result.deleted_count
+
+user_repository = UserRepository()
+search_cache_repository = SearchCacheRepository()
+site_repository = SiteRepository()
+history_repository = HistoryRepository()
+
+REPOSITORIES = (user_repository, search_cache_repository, site_repository, history_repository)
+
+async def ensure_indexes():
+    """Create every repository's indexes; existing ones are left as they are"""
+    if mongodb.db is None:
+        return
+    for repository in REPOSITORIES:
+        await repository.ensure_indexes()
+    print(f"✅ MongoDB indexes ready for {len(REPOSITORIES)} collections")
@@ -0,0 +1,129 @@
+import bisect
+import heapq
+from collections import Counter
+from operator import itemgetter
+from app.services.cache import normalize_query
+
+def trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class SiteSuggestionIndex:
+    """
+    In-process typeahead index over heritage site names, aliases and locations.
+    
+    Prefix matches come from a sorted term list searched with bisect, which acts as a
+    compact prefix trie: every name is also indexed from each word boundary, so
+    "mahal" finds "Taj Mahal". Queries with no prefix match fall back to a trigram
+    index ranked by Jaccard similarity; only the query's rarest trigrams pick the
+    candidates, so a lookup touches at most max_fuzzy_postings terms however large the
+    index grows. Sites can be added one at a time as they are learned.
+    """
+    
+    max_fuzzy_postings = 1000
+    
+    def __init__(self):
+        self._sites = {}
+        self._terms = []
+        self._term_sites = {}
+        self._term_trigrams = {}
+        self._trigram_terms = {}
+        
+    def _add_term(self, term, site_key, keep_sorted):
+        if not term:
+            return
+        sites = self._term_sites.get(term)
+        if sites is None:
+            sites = self._term_sites[term] = set()
+            if keep_sorted:
+                bisect.insort(self._terms, term)
+            else:
+                self._terms.append(term)
+            grams = trigrams(term)
+            self._term_trigrams[term] = len(grams)
+            for gram in grams:
+                self._trigram_terms.setdefault(gram, set()).add(term)
+        sites.add(site_key)
+        
+    def add_site(self, name, location=None, aliases=(), keep_sorted=True):
+        """Index a site (or merge new aliases into an already indexed one)"""
+        site_key = normalize_query(name)
+        if not site_key:
+            return
+        self._sites[site_key] = {"name": name, "location": location}
+        
+        words = site_key.split()
+        for start in range(len(words)):
+            self._add_term(" ".join(words[start:]), site_key, keep_sorted)
+        for alias in aliases:
+            self._add_term(normalize_query(alias), site_key, keep_sorted)
+        if location:
+            self._add_term(normalize_query(location), site_key, keep_sorted)
+            
+    def add_sites(self, sites):
+        """Bulk-index (name, location, aliases) tuples, sorting the term list once at the end"""
+        for name, location, aliases in sites:
+            self.add_site(name, location, aliases, keep_sorted=False)
+        self._terms.sort()
+        
+    def _prefix_matches(self, prefix, limit):
+        matches = []
+        index = bisect.bisect_left(self._terms, prefix)
+        while index < len(self._terms) and len(matches) < limit:
+            term = self._terms[index]
+            if not term.startswith(prefix):
+                break
+            for site_key in self._term_sites[term]:
+                if site_key not in matches:
+                    matches.append(site_key)
+            index += 1
+        return matches[:limit]
+    
+    def _fuzzy_matches(self, text, limit, min_similarity):
+        query_grams = trigrams(text)
+        # Count shared trigrams from the rarest ones only, up to a fixed number of postings:
+        # they tell terms apart best, and common ones (" of", "the") would touch most terms
+        shared = Counter()
+        budget = self.max_fuzzy_postings
+        for terms in sorted((self._trigram_terms.get(gram, ()) for gram in query_grams), key=len):
+            if len(terms) > budget:
+                break
+            shared.update(terms)
+            budget -= len(terms)
+        
+        # Score the best candidates on all trigrams (Jaccard similarity)
+        scored = []
+        for term, _ in heapq.nlargest(max(4 * limit, 32), shared.items(), key=itemgetter(1)):
+            common = len(query_grams & trigrams(term))
+            similarity = common / (len(query_grams) + self._term_trigrams[term] - common)
+            if similarity >= min_similarity:
+                scored.append((similarity, term))
+        scored.sort(reverse=True)
+        
+        matches = []
+        for _, term in scored:
+            for site_key in self._term_sites[term]:
+                if site_key not in matches:
+                    matches.append(site_key)
+            if len(matches) >= limit:
+                break
+        return matches[:limit]
+    
+    def suggest(self, query, limit=8, min_similarity=0.3):
+        """Suggest sites for a partial or misspelled query, prefix matches first"""
+        text = normalize_query(query)
+        if not text:
+            return []
+        
+        results = [(key, "prefix") for key in self._prefix_matches(text, limit)]
+        if not results:
+            # Only a query that matches nothing as typed is treated as a misspelling
+            results = [(key, "fuzzy") for key in self._fuzzy_matches(text, limit, min_similarity)]
+            
+        return [{**self._sites[key], "match": match} for key, match in results]
+    
+    def __len__(self):
+        return len(self._sites)
+
+# Global site suggestion index
+site_index = SiteSuggestionIndex()
@@ -0,0 +1,56 @@
+from tempfile import SpooledTemporaryFile
+from app.core.config import settings
+
+# Leading bytes of the image formats Pillow decodes for us
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+class UploadError(Exception):
+    """An upload that is not an acceptable image"""
+
+def sniff_image_type(head):
+    """MIME type of an image judged by its first bytes, or None if it is not one we accept"""
+    for signature, mime_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+async def spool_image_upload(file, max_bytes=None, chunk_size=None, spool_bytes=None):
+    """
+    Copy an uploaded image into a spooled temporary file, one chunk at a time.
+
+    The type is sniffed from the first chunk rather than trusted from the client's
+    Content-Type, and the copy stops as soon as max_bytes is passed. Files up to
+    spool_bytes stay in memory; larger ones roll over to disk, so peak memory per
+    upload is about spool_bytes + chunk_size however big the image is.
+    Returns (spooled_file, size, mime_type); the caller closes the file.
+    """
+    max_bytes = max_bytes or settings.UPLOAD_MAX_BYTES
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_BYTES
+    spooled = SpooledTemporaryFile(max_size=spool_bytes or settings.UPLOAD_SPOOL_BYTES)
+    try:
+        chunk = await file.read(chunk_size)
+        mime_type = sniff_image_type(chunk)
+        if mime_type is None:
+            raise UploadError("Please upload a valid image file (JPEG, PNG, WebP, GIF or BMP)")
+
+        size = 0
+        while chunk:
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadError(f"Image size too large. Please upload images smaller than {max_bytes // (1024 * 1024)}MB")
+            spooled.write(chunk)
+            chunk = await file.read(chunk_size)
+
+        spooled.seek(0)
+        return spooled, size, mime_type
+    except BaseException:
+        spooled.close()
+        raise
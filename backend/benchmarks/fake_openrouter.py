@@ -0,0 +1,168 @@
+"""
+Local stand-in for the OpenRouter chat completions API, for load tests without API credits.
+
+Latency follows a log-normal distribution around a median (sigma 0 makes it fixed),
+a share of calls fail with HTTP 500 or return empty content, and streaming requests
+are answered as SSE at a fixed token rate with a final usage chunk. Every knob can be
+overridden per model, so fallback chains, hedging and circuit breakers can be exercised.
+
+Usage (from backend/):
+    python -m benchmarks.fake_openrouter --port 9000 --latency-ms 800 --error-rate 0.02 \\
+        --model openai/gpt-3.5-turbo=latency_ms:400,error_rate:0.1
+
+then start the backend with OPENROUTER_BASE_URL=http://127.0.0.1:9000/api/v1
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+SITES = ["Taj Mahal", "Colosseum", "Machu Picchu", "Great Wall of China", "Petra", "Angkor Wat"]
+
+class ModelProfile:
+    """How one model (or the default) behaves"""
+
+    FIELDS = {"latency_ms": float, "sigma": float, "error_rate": float, "empty_rate": float, "tokens_per_second": float}
+
+    def __init__(self, latency_ms=800.0, sigma=0.5, error_rate=0.0, empty_rate=0.0, tokens_per_second=200.0):
+        self.latency_ms = latency_ms
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.empty_rate = empty_rate
+        self.tokens_per_second = tokens_per_second
+
+    def with_overrides(self, spec):
+        """Copy with 'key:value,key:value' overrides applied"""
+        values = {name: getattr(self, name) for name in self.FIELDS}
+        for pair in filter(None, spec.split(",")):
+            name, _, value = pair.partition(":")
+            if name not in self.FIELDS:
+                raise ValueError(f"Unknown model setting '{name}', expected one of {sorted(self.FIELDS)}")
+            values[name] = self.FIELDS[name](value)
+        return ModelProfile(**values)
+
+    def sample_latency(self):
+        """Seconds before the first byte of the answer"""
+        median = self.latency_ms / 1000
+        if self.sigma <= 0:
+            return median
+        return random.lognormvariate(math.log(median), self.sigma)
+
+def answer_for(messages):
+    """A heritage answer in the format the app's prompts ask for"""
+    prompt = messages[-1]["content"]
+    if isinstance(prompt, list):
+        # Vision request: text part plus image; the image size picks a stable site
+        site = SITES[len(json.dumps(prompt)) % len(SITES)]
+    else:
+        match = re.search(r"heritage site:\s*(.+)", prompt)
+        site = match.group(1).strip() if match else random.choice(SITES)
+    return (
+        f"Name: {site}\n"
+        "Location: Somewhere, Earth\n"
+        "Historical Period: 12th century\n"
+        "Builder/Creator: Unknown master builders\n"
+        "Significance: A benchmark fixture standing in for a real heritage site.\n"
+        "Architectural Style: Load-tested Revival\n"
+        "History: " + "Generations of visitors have come and gone. " * 20 + "\n"
+        "Current Status: UNESCO World Heritage Site\n"
+        "Interesting Facts:\n- It answers instantly\n- It never runs out of credits\n- It is not real\n"
+        "Visitor Information: Open daily\n"
+        "Best Time to Visit: Any time\n"
+    )
+
+def usage_for(messages, text):
+    prompt_chars = len(json.dumps(messages))
+    return {"prompt_tokens": prompt_chars // 4, "completion_tokens": len(text) // 4,
+            "total_tokens": (prompt_chars + len(text)) // 4}
+
+def create_app(default, overrides):
+    app = FastAPI(title="Fake OpenRouter")
+    stats = {"requests": 0, "errors": 0, "empty": 0, "streams": 0}
+
+    def profile_for(model):
+        return overrides.get(model, default)
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "unknown")
+        profile = profile_for(model)
+        stats["requests"] += 1
+        await asyncio.sleep(profile.sample_latency())
+
+        if random.random() < profile.error_rate:
+            stats["errors"] += 1
+            return JSONResponse(status_code=500, content={"error": {"message": f"Simulated failure of {model}"}})
+
+        text = "" if random.random() < profile.empty_rate else answer_for(body["messages"])
+        if not text:
+            stats["empty"] += 1
+        usage = usage_for(body["messages"], text)
+
+        if not body.get("stream"):
+            return {
+                "id": f"fake-{stats['requests']}",
+                "model": model,
+                "created": int(time.time()),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+
+        stats["streams"] += 1
+
+        async def events():
+            yield ": OPENROUTER PROCESSING\n\n"
+            words = re.findall(r"\S+\s*", text)
+            # Roughly one token per word; send a few words per chunk like real providers
+            for start in range(0, len(words), 4):
+                await asyncio.sleep(4 / profile.tokens_per_second)
+                delta = {"choices": [{"index": 0, "delta": {"content": "".join(words[start:start + 4])}}]}
+                yield f"data: {json.dumps(delta)}\n\n"
+            yield f"data: {json.dumps({'choices': [{'index': 0, 'delta': {}, 'finish_reason': 'stop'}], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    # Accept both a bare base URL and one ending in /api/v1, like the real service
+    app.add_api_route("/chat/completions", chat_completions, methods=["POST"])
+    app.add_api_route("/api/v1/chat/completions", chat_completions, methods=["POST"])
+
+    @app.get("/stats")
+    async def get_stats():
+        return stats
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency-ms", type=float, default=800.0, help="Median latency before the answer starts")
+    parser.add_argument("--sigma", type=float, default=0.5, help="Log-normal spread of latency; 0 for fixed")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with HTTP 500")
+    parser.add_argument("--empty-rate", type=float, default=0.0, help="Share of calls answered with empty content")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0, help="Streaming speed")
+    parser.add_argument("--model", action="append", default=[], metavar="NAME=key:value,...",
+                        help="Per-model overrides, e.g. openai/gpt-4o=latency_ms:2000,error_rate:0.2")
+    parser.add_argument("--seed", type=int, help="Seed the random generator for repeatable runs")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    default = ModelProfile(args.latency_ms, args.sigma, args.error_rate, args.empty_rate, args.tokens_per_second)
+    overrides = {}
+    for spec in args.model:
+        name, _, settings_spec = spec.partition("=")
+        overrides[name] = default.with_overrides(settings_spec)
+
+    import uvicorn
+    uvicorn.run(create_app(default, overrides), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Per-request memory and latency of the image preprocessing step before vision upload.
+
+Compares the original pipeline (full decode, JPEG q85 re-encode, base64) with
+app.services.image_processing.prepare_image. Each variant runs in a fresh child
+process so its peak RSS is not polluted by the other one. Peak memory is the
+RSS high-water mark above the pre-request RSS; on Linux the watermark is reset
+before every request, elsewhere only the first request is measured accurately.
+
+Usage (from backend/):
+    python -m benchmarks.image_preprocess [--image photo.jpg] [--runs 10]
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from PIL import Image, ImageFilter
+
+def legacy_pipeline(image_data):
+    """The preprocessing analyze_heritage_image used to do inline"""
+    image = Image.open(io.BytesIO(image_data))
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGB')
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=85)
+    img_str = base64.b64encode(buffered.getvalue()).decode()
+    return f"data:image/jpeg;base64,{img_str}"
+
+def optimized_pipeline(image_data):
+    from app.services.image_processing import prepare_image
+    return prepare_image(image_data).data_url
+
+VARIANTS = {"before": legacy_pipeline, "after": optimized_pipeline}
+
+def _proc_status_mb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+def reset_peak_rss():
+    """Reset the kernel's peak-RSS watermark (Linux only); returns False when unsupported"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def peak_rss_mb():
+    if os.path.exists("/proc/self/status"):
+        return _proc_status_mb("VmHWM")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def current_rss_mb():
+    if os.path.exists("/proc/self/status"):
+        return _proc_status_mb("VmRSS")
+    return peak_rss_mb()
+
+def make_sample_photo(path, size=(4032, 3024)):
+    """A phone-sized JPEG with EXIF orientation, similar to what users upload"""
+    base = Image.linear_gradient("L").resize(size)
+    texture = Image.effect_noise(size, 60).filter(ImageFilter.GaussianBlur(2))
+    image = Image.merge("RGB", (base, texture, Image.blend(base, texture, 0.5)))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    image.save(path, format="JPEG", quality=95, exif=exif)
+
+def run_child(variant, image_path, runs):
+    with open(image_path, "rb") as f:
+        image_data = f.read()
+    pipeline = VARIANTS[variant]
+    if variant == "after":
+        # Import outside the measured region so both variants start from the same footprint
+        import app.services.image_processing  # noqa: F401
+        
+    timings = []
+    peaks = []
+    payload = None
+    for _ in range(runs):
+        # Drop the previous payload so it does not count towards this request's baseline
+        payload = None
+        reset_peak_rss()
+        baseline = current_rss_mb()
+        started = time.perf_counter()
+        payload = pipeline(image_data)
+        timings.append((time.perf_counter() - started) * 1000)
+        peaks.append(peak_rss_mb() - baseline)
+        
+    print(json.dumps({
+        "variant": variant,
+        "median_ms": statistics.median(timings),
+        "peak_extra_mb": max(peaks),
+        "payload_kb": len(payload) / 1024
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--image", help="JPEG/PNG to benchmark (defaults to a synthetic 12 MP photo)")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--child", choices=VARIANTS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        run_child(args.child, args.image, args.runs)
+        return
+    
+    image_path = args.image
+    if image_path is None:
+        image_path = os.path.join(tempfile.mkdtemp(), "sample.jpg")
+        make_sample_photo(image_path)
+    size_mb = os.path.getsize(image_path) / (1024 * 1024)
+    print(f"Image: {image_path} ({size_mb:.1f} MB), {args.runs} runs per variant\n")
+    print(f"{'variant':<8} {'median latency':>15} {'peak extra RSS':>15} {'upload payload':>15}")
+    
+    for variant in VARIANTS:
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.image_preprocess", "--child", variant,
+             "--image", image_path, "--runs", str(args.runs)],
+            check=True, capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{variant:<8} {result['median_ms']:>12.1f} ms {result['peak_extra_mb']:>12.1f} MB "
+              f"{result['payload_kb']:>12.0f} KB")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Open-loop load test of the backend against the local OpenRouter stand-in.
+
+By default both servers are started here: benchmarks.fake_openrouter, and the backend
+with OPENROUTER_BASE_URL pointed at it and rate limits lifted. A weighted mix of
+/search, /upload-image and /recommendations is then sent at --rps for --duration
+seconds, and per-endpoint p50/p95/p99 latency, achieved throughput, errors and the
+backend's RSS are reported. Requests go out on schedule whether or not earlier ones
+have finished, so queueing inside the server shows up as latency instead of quietly
+lowering the offered load. The spawned backend still uses MongoDB if .env configures it.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --rps 20 --duration 30 --mix search=8,upload=1,recommendations=1
+    python -m benchmarks.load_test --fake-args "--latency-ms 1500 --error-rate 0.1"
+    python -m benchmarks.load_test --target http://127.0.0.1:8000 --server-pid 1234
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shlex
+import string
+import subprocess
+import sys
+import time
+
+import httpx
+from PIL import Image, ImageDraw
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = ("search", "upload", "recommendations")
+
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def query_for(run_tag, number):
+    """A made-up site name; distinct ones are too far apart for the canonicalizer to merge"""
+    rng = random.Random(f"{run_tag}-{number}")
+    words = ("".join(rng.choice(string.ascii_lowercase) for _ in range(6)) for _ in range(2))
+    return " ".join(word.capitalize() for word in words) + " Temple"
+
+def parse_mix(spec):
+    weights = {}
+    for pair in spec.split(","):
+        name, _, weight = pair.partition("=")
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}' in --mix, expected {', '.join(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+def make_images(count, size):
+    """Distinct JPEGs (different perceptual hashes), so uploads do not all hit the image cache"""
+    rng = random.Random(42)
+    images = []
+    for _ in range(count):
+        image = Image.new("RGB", size, tuple(rng.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(image)
+        for _ in range(12):
+            x0, y0 = rng.randrange(size[0]), rng.randrange(size[1])
+            box = (x0, y0, x0 + rng.randrange(size[0] // 2), y0 + rng.randrange(size[1] // 2))
+            draw.rectangle(box, fill=tuple(rng.randrange(256) for _ in range(3)))
+        buffered = io.BytesIO()
+        image.save(buffered, format="JPEG", quality=90)
+        images.append(buffered.getvalue())
+    return images
+
+def rss_mb(pid):
+    """(current, peak) resident memory of a process in MB, from /proc (Linux)"""
+    values = {}
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    values[line.split(":")[0]] = int(line.split()[1]) / 1024
+    except OSError:
+        return None, None
+    return values.get("VmRSS"), values.get("VmHWM")
+
+def wait_until_up(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"Server at {url} did not come up within {timeout}s")
+
+def start_servers(args):
+    """Launch the fake OpenRouter and the backend; returns (processes, backend_url, backend_pid)"""
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_openrouter", "--port", str(args.fake_port),
+         *shlex.split(args.fake_args)],
+        cwd=BACKEND_DIR
+    )
+    env = {
+        **os.environ,
+        "OPENROUTER_BASE_URL": f"http://127.0.0.1:{args.fake_port}/api/v1",
+        "OPENROUTER_KEY": os.environ.get("OPENROUTER_KEY") or "benchmark",
+        # Measure the service rather than the rate limiter; concurrency limits stay as configured
+        "RATE_LIMIT_PER_MINUTE": "1000000",
+        "RATE_LIMIT_BURST": "1000000",
+        "GLOBAL_RATE_LIMIT_PER_MINUTE": "1000000",
+        "GLOBAL_RATE_LIMIT_BURST": "1000000",
+    }
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL
+    )
+    wait_until_up(f"http://127.0.0.1:{args.fake_port}/stats")
+    backend_url = f"http://127.0.0.1:{args.port}"
+    wait_until_up(f"{backend_url}/health")
+    return [backend, fake], backend_url, backend.pid
+
+async def post_auth(client, path, payload):
+    """POST to an auth endpoint, waiting out its per-address attempt limit"""
+    while True:
+        response = await client.post(path, json=payload)
+        if response.status_code != 429:
+            return response
+        await asyncio.sleep(int(response.headers.get("Retry-After", "1")))
+
+async def sign_in(client, count):
+    """Session headers for count simulated users, creating their accounts if needed"""
+    headers = []
+    for number in range(count):
+        credentials = {"username": f"bench-{number}", "password": "benchmark-password"}
+        # Already exists (409) on later runs against a database, which is fine
+        await post_auth(client, "/api/auth/signup", {**credentials, "email": f"bench-{number}@example.com"})
+        response = await post_auth(client, "/api/auth/login", credentials)
+        body = response.json()
+        if not body.get("success"):
+            raise SystemExit(f"Could not sign in {credentials['username']}: {body.get('error')}")
+        headers.append({"Authorization": f"Bearer {body['token']}"})
+    return headers
+
+async def send(client, endpoint, args, images, request_number, users):
+    """Issue one request; returns (endpoint, latency_seconds, outcome)"""
+    # Spread load over signed-in users so the per-user concurrency cap applies as in production
+    headers = users[request_number % len(users)]
+    started = time.perf_counter()
+    try:
+        if endpoint == "search":
+            query = query_for(args.run_tag, random.randrange(args.unique_queries))
+            response = await client.post("/api/heritage/search", json={"query": query}, headers=headers)
+        elif endpoint == "upload":
+            image = images[request_number % len(images)]
+            response = await client.post("/api/heritage/upload-image",
+                                         files={"file": ("bench.jpg", image, "image/jpeg")}, headers=headers)
+        else:
+            response = await client.get("/api/heritage/recommendations", headers=headers)
+        latency = time.perf_counter() - started
+        if response.status_code == 429:
+            return endpoint, latency, "rejected"
+        if response.status_code >= 400:
+            return endpoint, latency, "error"
+        body = response.json()
+        ok = body.get("success", True) and not str(body.get("result", "")).startswith(("Sorry", "Error"))
+        return endpoint, latency, "ok" if ok else "error"
+    except httpx.HTTPError:
+        return endpoint, time.perf_counter() - started, "error"
+
+async def sample_rss(pid, samples, stop):
+    while not stop.is_set():
+        current, _ = rss_mb(pid)
+        if current is not None:
+            samples.append(current)
+        try:
+            await asyncio.wait_for(stop.wait(), 0.5)
+        except asyncio.TimeoutError:
+            pass
+
+async def run_load(args, base_url, server_pid):
+    weights = parse_mix(args.mix)
+    images = make_images(args.images, (args.image_width, args.image_height))
+    endpoints, endpoint_weights = zip(*weights.items())
+    total = int(args.rps * args.duration)
+
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        users = await sign_in(client, args.users)
+        rss_samples = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_rss(server_pid, rss_samples, stop)) if server_pid else None
+
+        tasks = []
+        started = time.perf_counter()
+        for number in range(total):
+            # Fixed-interval arrivals keep the offered load exact and the run repeatable
+            delay = started + number / args.rps - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            endpoint = random.choices(endpoints, endpoint_weights)[0]
+            tasks.append(asyncio.create_task(send(client, endpoint, args, images, number, users)))
+        results = await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+
+        stop.set()
+        if sampler:
+            await sampler
+    return results, elapsed, rss_samples
+
+def report(args, results, elapsed, rss_samples, server_pid):
+    print(f"\nOffered {args.rps:g} req/s for {args.duration:g}s; finished in {elapsed:.1f}s\n")
+    print(f"{'endpoint':<16} {'requests':>8} {'ok':>6} {'errors':>6} {'429':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7}")
+    summary = {}
+    for endpoint in ENDPOINTS + ("all",):
+        rows = [r for r in results if endpoint == "all" or r[0] == endpoint]
+        if not rows:
+            continue
+        latencies = sorted(latency * 1000 for _, latency, _ in rows)
+        counts = {outcome: sum(1 for r in rows if r[2] == outcome) for outcome in ("ok", "error", "rejected")}
+        stats = {
+            "requests": len(rows), **counts,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+            "throughput_rps": counts["ok"] / elapsed,
+        }
+        summary[endpoint] = stats
+        print(f"{endpoint:<16} {stats['requests']:>8} {counts['ok']:>6} {counts['error']:>6} {counts['rejected']:>6} "
+              f"{stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['throughput_rps']:>7.1f}")
+
+    if server_pid:
+        _, peak = rss_mb(server_pid)
+        if rss_samples:
+            summary["rss_mb"] = {"start": rss_samples[0], "end": rss_samples[-1], "peak": peak or max(rss_samples)}
+            print(f"\nBackend RSS: {rss_samples[0]:.0f} MB at start, {rss_samples[-1]:.0f} MB at end, "
+                  f"{summary['rss_mb']['peak']:.0f} MB peak")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": summary}, f, indent=2)
+        print(f"Wrote {args.json}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rps", type=float, default=10.0, help="Offered load in requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds of load")
+    parser.add_argument("--mix", default="search=8,upload=1,recommendations=1", help="Endpoint weights")
+    parser.add_argument("--unique-queries", type=int, default=200,
+                        help="Distinct search queries; fewer means more cache hits")
+    parser.add_argument("--run-tag", default=str(int(time.time())),
+                        help="Mixed into queries so earlier runs' cached answers are not reused")
+    parser.add_argument("--users", type=int, default=50, help="Simulated users, each signed in with its own session")
+    parser.add_argument("--images", type=int, default=20, help="Distinct images to upload")
+    parser.add_argument("--image-width", type=int, default=1600)
+    parser.add_argument("--image-height", type=int, default=1200)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--max-connections", type=int, default=200)
+    parser.add_argument("--target", help="Backend URL to test instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="With --target: backend PID to sample RSS from")
+    parser.add_argument("--port", type=int, default=8001, help="Port for the spawned backend")
+    parser.add_argument("--fake-port", type=int, default=9001, help="Port for the spawned fake OpenRouter")
+    parser.add_argument("--fake-args", default="--latency-ms 800 --sigma 0.5 --seed 1",
+                        help="Extra arguments for benchmarks.fake_openrouter")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the summary to this file")
+    args = parser.parse_args()
+    random.seed(args.seed)
+
+    processes = []
+    if args.target:
+        base_url, server_pid = args.target.rstrip("/"), args.server_pid
+    else:
+        processes, base_url, server_pid = start_servers(args)
+    try:
+        results, elapsed, rss_samples = asyncio.run(run_load(args, base_url, server_pid))
+        report(args, results, elapsed, rss_samples, server_pid)
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(timeout=10)
+
+if __name__ == "__main__":
+    main()
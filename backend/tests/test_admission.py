@@ -0,0 +1,56 @@
+import pytest
+from app.core.config import settings
+from app.services.admission import AdmissionController, RateLimited
+
+@pytest.fixture
+def admission(monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_PER_MINUTE", 1)
+    monkeypatch.setattr(settings, "AUTH_RATE_LIMIT_BURST", 10)
+    monkeypatch.setattr(settings, "AUTH_ACCOUNT_RATE_LIMIT_PER_MINUTE", 1)
+    monkeypatch.setattr(settings, "AUTH_ACCOUNT_RATE_LIMIT_BURST", 3)
+    return AdmissionController()
+
+def test_auth_attempts_on_one_account_are_limited(admission):
+    for _ in range(3):
+        admission.check_auth_rate("10.0.0.1", "ann")
+    with pytest.raises(RateLimited):
+        admission.check_auth_rate("10.0.0.1", "ann")
+    # Other accounts and other addresses still have their budget
+    admission.check_auth_rate("10.0.0.1", "bob")
+    admission.check_auth_rate("10.0.0.2", "ann")
+
+def test_rotating_usernames_does_not_reset_the_address_limit(admission):
+    for number in range(10):
+        admission.check_auth_rate("10.0.0.1", f"user{number}")
+    with pytest.raises(RateLimited) as error:
+        admission.check_auth_rate("10.0.0.1", "one-more")
+    assert error.value.retry_after >= 1
+    assert admission.get_stats()["rejected"]["auth_rate"] == 1
+
+def test_refused_account_attempt_keeps_the_address_budget(admission):
+    for _ in range(3):
+        admission.check_auth_rate("10.0.0.1", "ann")
+    for _ in range(5):
+        with pytest.raises(RateLimited):
+            admission.check_auth_rate("10.0.0.1", "ann")
+    for number in range(7):
+        admission.check_auth_rate("10.0.0.1", f"user{number}")
+
+def test_auth_attempts_leave_the_ai_budget_alone(admission):
+    tokens = admission.global_bucket.tokens
+    for number in range(20):
+        try:
+            admission.check_auth_rate("10.0.0.1", f"user{number}")
+        except RateLimited:
+            pass
+    assert admission.global_bucket.tokens >= tokens
+    assert not admission.user_buckets
+
+def test_cost_is_charged_all_at_once(admission, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 10)
+    admission.check_rate("user:ann", cost=8)
+    with pytest.raises(RateLimited):
+        admission.check_rate("user:ann", cost=3)
+    # The refused request took nothing
+    admission.check_rate("user:ann", cost=2)
+    assert admission.global_bucket.tokens == pytest.approx(settings.GLOBAL_RATE_LIMIT_BURST - 10, abs=0.1)
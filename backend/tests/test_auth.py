@@ -0,0 +1,110 @@
+import asyncio
+import pytest
+from app.core.config import settings
+from app.services import auth
+from app.services.auth import AuthError, AuthService, hash_password, verify_password
+from app.services.database import mongodb
+
+@pytest.fixture
+def service():
+    return AuthService()
+
+@pytest.fixture
+def mongo_configured(monkeypatch):
+    monkeypatch.setattr(settings, "MONGODB_USERNAME", "user")
+    monkeypatch.setattr(settings, "MONGODB_PASSWORD", "secret")
+    monkeypatch.setattr(settings, "MONGODB_CLUSTER", "cluster.example.net")
+
+class FakeUsers:
+    """Stands in for user_repository, holding users in a dict"""
+
+    def __init__(self, users):
+        self.users = users
+
+    async def find_by_username(self, username):
+        user = self.users.get(username)
+        return dict(user) if user else None
+
+    async def set_password_hash(self, username, password_hash):
+        self.users[username].pop("password", None)
+        self.users[username]["password_hash"] = password_hash
+
+@pytest.fixture
+def users(monkeypatch, mongo_configured):
+    """A reachable database holding the given users"""
+    fake = FakeUsers({})
+    monkeypatch.setattr(auth, "user_repository", fake)
+    monkeypatch.setattr(mongodb, "db", object())
+    monkeypatch.setattr(settings, "AUTH_SCRYPT_N", 2 ** 10)
+    return fake.users
+
+def test_token_round_trip(service):
+    token = service.issue_token("ann")
+    assert service.verify_token(token) == "ann"
+    assert service.user_from_header(f"Bearer {token}") == "ann"
+    assert service.user_from_header(f"Basic {token}") is None
+
+def test_tampered_token_is_rejected(service, monkeypatch):
+    body, _, signature = service.issue_token("ann").partition(".")
+    forged_body = service.issue_token("root").partition(".")[0]
+    assert service.verify_token(f"{forged_body}.{signature}") is None
+    assert service.verify_token(f"{body}.{signature[:-2]}xx") is None
+    # Signed with another replica's key
+    monkeypatch.setattr(settings, "AUTH_SECRET_KEY", "some-other-key")
+    assert AuthService().verify_token(f"{body}.{signature}") is None
+
+def test_expired_token_is_rejected(service, monkeypatch):
+    monkeypatch.setattr(settings, "AUTH_TOKEN_TTL_SECONDS", -1)
+    assert service.verify_token(service.issue_token("ann")) is None
+
+def test_cached_token_expires(service, monkeypatch):
+    token = service.issue_token("ann")
+    assert service.verify_token(token) == "ann"
+    real_time = auth.time.time
+    monkeypatch.setattr(auth.time, "time", lambda: real_time() + settings.AUTH_TOKEN_TTL_SECONDS + 1)
+    assert service.verify_token(token) is None
+
+@pytest.mark.parametrize("token", ["", "abc", "abc.éé", "é", "e30.", "W10.x"])
+def test_malformed_token_is_invalid(service, token):
+    assert service.verify_token(token) is None
+
+def test_password_hash_round_trip():
+    stored = hash_password("secret123", n=2 ** 10)
+    assert stored.startswith("scrypt$")
+    assert verify_password("secret123", stored)
+    assert not verify_password("secret124", stored)
+    assert not verify_password("secret123", "not a hash")
+
+def test_demo_mode_accepts_any_login_when_unconfigured(service, monkeypatch):
+    monkeypatch.setattr(settings, "MONGODB_USERNAME", None)
+    monkeypatch.setattr(mongodb, "db", None)
+    assert service.demo_mode
+    assert service.verify_token(asyncio.run(service.login("anyone", "anything"))) == "anyone"
+
+def test_unreachable_database_refuses_logins(service, monkeypatch, mongo_configured):
+    monkeypatch.setattr(mongodb, "db", None)
+    assert not service.demo_mode
+    for attempt in (service.login("anyone", "anything"), service.signup("anyone", "anything", "a@example.com")):
+        with pytest.raises(AuthError) as error:
+            asyncio.run(attempt)
+        assert error.value.status_code == 503
+
+def test_login_checks_the_stored_hash(service, users):
+    users["ann"] = {"username": "ann", "password_hash": hash_password("secret123", n=2 ** 10)}
+    assert service.verify_token(asyncio.run(service.login("ann", "secret123"))) == "ann"
+    for username, password in (("ann", "wrong-password"), ("bob", "secret123")):
+        with pytest.raises(AuthError) as error:
+            asyncio.run(service.login(username, password))
+        assert error.value.status_code == 401
+
+def test_legacy_plaintext_password_is_upgraded(service, users):
+    users["ann"] = {"username": "ann", "password": "secret123"}
+    with pytest.raises(AuthError):
+        asyncio.run(service.login("ann", "wrong-password"))
+    assert users["ann"] == {"username": "ann", "password": "secret123"}
+
+    assert service.verify_token(asyncio.run(service.login("ann", "secret123"))) == "ann"
+    assert "password" not in users["ann"]
+    assert verify_password("secret123", users["ann"]["password_hash"])
+    # Later logins go through the hash
+    assert asyncio.run(service.login("ann", "secret123"))
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import pytest
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.main import app
+from app.routers import heritage
+from app.services.admission import AdmissionController
+
+@pytest.fixture
+def admission(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_PER_MINUTE", 1)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BURST", 10)
+    monkeypatch.setattr(settings, "ADMISSION_PER_USER_CONCURRENT", 2)
+    controller = AdmissionController()
+    monkeypatch.setattr(heritage, "admission", controller)
+    return controller
+
+@pytest.fixture
+def client(admission, monkeypatch):
+    running = {"now": 0, "most": 0}
+
+    async def search_heritage_info(query, refresh=False):
+        running["now"] += 1
+        running["most"] = max(running["most"], running["now"])
+        await asyncio.sleep(0.01)
+        running["now"] -= 1
+        return f"An answer about {query}"
+
+    monkeypatch.setattr(heritage.ai_service, "search_heritage_info", search_heritage_info)
+    test_client = TestClient(app)
+    test_client.running = running
+    return test_client
+
+def batch(client, queries, concurrency=10):
+    return client.post("/api/heritage/search/batch", json={"queries": queries, "concurrency": concurrency})
+
+def test_batch_is_charged_per_query(client, admission):
+    response = batch(client, ["Petra", "Taj Mahal", "", "Colosseum"])
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert sum(line["success"] for line in lines) == 3
+    # Three queries, not one request, came out of the bucket
+    assert admission.user_buckets["ip:testclient"].tokens == pytest.approx(7, abs=0.1)
+
+def test_batch_over_the_remaining_budget_is_refused(client):
+    assert batch(client, [f"site {n}" for n in range(8)]).status_code == 200
+    response = batch(client, [f"site {n}" for n in range(3)])
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+def test_batch_larger_than_the_burst_is_refused(client):
+    body = batch(client, [f"site {n}" for n in range(11)]).json()
+    assert not body["success"] and "at most 10" in body["error"]
+
+def test_batch_items_count_against_the_callers_concurrency(client):
+    response = batch(client, [f"site {n}" for n in range(6)], concurrency=10)
+    assert all(json.loads(line)["success"] for line in response.text.splitlines())
+    assert client.running["most"] <= settings.ADMISSION_PER_USER_CONCURRENT
@@ -0,0 +1,97 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from bson import ObjectId
+from app.services import history
+from app.services.history import HistoryService, decode_cursor, encode_cursor
+
+class FakeHistoryRepository:
+    """Stands in for history_repository, with the same (created_at, _id) keyset semantics"""
+
+    def __init__(self):
+        self.entries = []
+
+    async def insert_many(self, entries):
+        self.entries.extend(entries)
+        return len(entries)
+
+    async def find_page(self, user_id, limit, before=None):
+        found = [
+            entry for entry in self.entries
+            if entry["user_id"] == user_id and (before is None or (entry["created_at"], entry["_id"]) < before)
+        ]
+        found.sort(key=lambda entry: (entry["created_at"], entry["_id"]), reverse=True)
+        return found[:limit]
+
+    async def delete_user(self, user_id):
+        kept = [entry for entry in self.entries if entry["user_id"] != user_id]
+        deleted = len(self.entries) - len(kept)
+        self.entries = kept
+        return deleted
+
+@pytest.fixture
+def repository(monkeypatch):
+    fake = FakeHistoryRepository()
+    monkeypatch.setattr(history, "history_repository", fake)
+    return fake
+
+def stored_entry(user_id, created_at, query):
+    return {"_id": ObjectId(), "user_id": user_id, "kind": "search", "query": query, "result": "...", "created_at": created_at}
+
+def all_pages(service, user_id, limit):
+    pages, cursor = [], None
+    while True:
+        entries, cursor = asyncio.run(service.page(user_id, limit, cursor))
+        pages.append([entry["query"] for entry in entries])
+        if cursor is None:
+            return pages
+
+def test_cursor_round_trip():
+    entry = stored_entry("ann", datetime(2024, 1, 2, 3, 4, 5, 678000), "Petra")
+    assert decode_cursor(encode_cursor(entry)) == (entry["created_at"], entry["_id"])
+
+@pytest.mark.parametrize("cursor", ["", "abc", "123", "123-nothex", "x-65a1b2c3d4e5f60718293a4b"])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+def test_pages_walk_stored_entries_newest_first(repository):
+    start = datetime(2024, 1, 1)
+    repository.entries = [stored_entry("ann", start + timedelta(minutes=n), f"q{n}") for n in range(7)]
+    repository.entries.append(stored_entry("bob", start, "not ann's"))
+    assert all_pages(HistoryService(), "ann", 3) == [["q6", "q5", "q4"], ["q3", "q2", "q1"], ["q0"]]
+
+def test_entries_sharing_a_timestamp_are_neither_skipped_nor_repeated(repository):
+    same_time = datetime(2024, 1, 1)
+    repository.entries = [stored_entry("ann", same_time, f"q{n}") for n in range(5)]
+    pages = all_pages(HistoryService(), "ann", 2)
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sorted(query for page in pages for query in page) == [f"q{n}" for n in range(5)]
+
+def test_unwritten_entries_are_merged_without_duplicates(repository):
+    service = HistoryService()
+    for n in range(4):
+        service.record("ann", "search", f"q{n}", "...")
+    # Half of them already flushed: stored and still in the recent list
+    repository.entries = list(service.recent.get("ann"))[:2]
+    assert all_pages(service, "ann", 3) == [["q3", "q2", "q1"], ["q0"]]
+
+def test_clear_forgets_stored_and_unwritten_entries(repository):
+    service = HistoryService()
+    service.record("ann", "search", "q0", "...")
+    repository.entries = [stored_entry("ann", datetime(2024, 1, 1), "old")]
+    assert asyncio.run(service.clear("ann")) == 1
+    assert asyncio.run(service.page("ann", 10)) == ([], None)
+
+def test_queued_entries_are_written_in_one_batch(repository):
+    async def run():
+        service = HistoryService()
+        service.start()
+        for n in range(7):
+            service.record("ann", "search", f"q{n}", "...")
+        await service.stop()
+        return service.get_stats()
+
+    stats = asyncio.run(run())
+    assert len(repository.entries) == 7
+    assert stats["batches"] == 1 and stats["written"] == 7 and stats["queued"] == 0
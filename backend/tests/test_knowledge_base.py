@@ -0,0 +1,52 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from app.services import knowledge_base
+from app.services.canonicalizer import QueryCanonicalizer
+from app.services.knowledge_base import SiteKnowledgeBase, names_site
+from app.services.site_index import SiteSuggestionIndex
+
+ANSWER = """Name: Great Wall of China
+Location: Northern China
+Historical Period: 7th century BC to 17th century AD
+Significance: The longest structure ever built."""
+
+OFF_TOPIC_ANSWER = """There is no Great Wall of India; you may mean the Great Wall of China.
+Name: Great Wall of China
+Location: Northern China"""
+
+@pytest.fixture
+def kb(monkeypatch):
+    # Keep the process-wide indexes out of it; the database is not configured
+    monkeypatch.setattr(knowledge_base, "site_index", SiteSuggestionIndex())
+    monkeypatch.setattr(knowledge_base, "canonicalizer", QueryCanonicalizer())
+    return SiteKnowledgeBase()
+
+def test_names_site():
+    assert names_site("taj", "Taj Mahal", "Agra, India")
+    assert names_site("taj mahal agra", "Taj Mahal", "Agra, India")
+    assert not names_site("great wall of india", "Great Wall of China", "Northern China")
+    assert not names_site("agra", "Taj Mahal", "Agra, India")
+
+def test_answer_to_a_query_naming_the_site_is_served(kb):
+    asyncio.run(kb.learn(ANSWER, "great wall"))
+    assert kb.lookup_answer("Great Wall of China") == ANSWER
+    assert kb.lookup_answer("great wall") == ANSWER
+
+def test_answer_to_another_question_does_not_replace_the_site_answer(kb):
+    asyncio.run(kb.learn(ANSWER, "Great Wall of China"))
+    asyncio.run(kb.learn(OFF_TOPIC_ANSWER, "Great Wall of India"))
+    assert kb.lookup_answer("Great Wall of China") == ANSWER
+    assert kb.lookup_answer("Great Wall of India") is None
+    assert kb.get("Great Wall of China").significance == "The longest structure ever built."
+
+def test_answer_to_another_question_is_never_served(kb):
+    asyncio.run(kb.learn(OFF_TOPIC_ANSWER, "Great Wall of India"))
+    assert kb.get("Great Wall of China") is not None
+    assert kb.lookup_answer("Great Wall of China") is None
+
+def test_stale_answer_is_not_served(kb):
+    asyncio.run(kb.learn(ANSWER, "Great Wall of China"))
+    site = kb.get("Great Wall of China")
+    site.updated_at = datetime.utcnow() - timedelta(seconds=knowledge_base.settings.SEARCH_CACHE_TTL_SECONDS + 1)
+    assert kb.lookup_answer("Great Wall of China") is None
@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+from app.core.config import settings
+from app.services.model_router import ModelRouter, CLOSED, OPEN, HALF_OPEN, OK, ERROR, EMPTY
+
+MODELS = [("primary", None), ("backup", None)]
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_ROUTER_MAX_CONSECUTIVE_FAILURES", 3)
+    monkeypatch.setattr(settings, "MODEL_ROUTER_MIN_CALLS", 5)
+    monkeypatch.setattr(settings, "MODEL_ROUTER_FAILURE_THRESHOLD", 0.5)
+    monkeypatch.setattr(settings, "MODEL_ROUTER_COOLDOWN_SECONDS", 30)
+    monkeypatch.setattr(settings, "MODEL_ROUTER_SLOW_SECONDS", 15)
+    return ModelRouter()
+
+def order(router):
+    return [model for model, _ in router.order(MODELS)]
+
+def state(router, model):
+    return router.scoreboard()[model]["state"]
+
+def open_circuit(router, model):
+    for _ in range(settings.MODEL_ROUTER_MAX_CONSECUTIVE_FAILURES):
+        router.record(model, ERROR, 0.1)
+
+def test_consecutive_failures_open_the_circuit(router):
+    router.record("primary", ERROR, 0.1)
+    router.record("primary", EMPTY, 0.1)
+    assert state(router, "primary") == CLOSED
+    router.record("primary", ERROR, 0.1)
+    assert state(router, "primary") == OPEN
+    assert not router.acquire("primary")
+    assert order(router) == ["backup", "primary"]
+
+def test_success_resets_the_failure_streak(router, monkeypatch):
+    # Keep the failure-rate rule out of it
+    monkeypatch.setattr(settings, "MODEL_ROUTER_MIN_CALLS", 10)
+    for outcome in (ERROR, ERROR, OK, ERROR, ERROR):
+        router.record("primary", outcome, 0.1)
+    assert state(router, "primary") == CLOSED
+
+def test_failure_rate_opens_the_circuit(router):
+    for outcome in (ERROR, OK, ERROR, OK, ERROR):
+        router.record("primary", outcome, 0.1)
+    assert state(router, "primary") == OPEN
+
+def test_half_open_admits_one_probe_that_closes_on_success(router, monkeypatch):
+    open_circuit(router, "primary")
+    monkeypatch.setattr(settings, "MODEL_ROUTER_COOLDOWN_SECONDS", 0)
+    assert state(router, "primary") == HALF_OPEN
+    assert router.acquire("primary")
+    assert not router.acquire("primary")
+    router.record("primary", OK, 0.1)
+    assert state(router, "primary") == CLOSED
+    assert router.acquire("primary")
+
+def test_failed_probe_reopens_the_circuit(router, monkeypatch):
+    open_circuit(router, "primary")
+    monkeypatch.setattr(settings, "MODEL_ROUTER_COOLDOWN_SECONDS", 0)
+    assert router.acquire("primary")
+    monkeypatch.setattr(settings, "MODEL_ROUTER_COOLDOWN_SECONDS", 30)
+    router.record("primary", ERROR, 0.1)
+    assert state(router, "primary") == OPEN
+    assert not router.acquire("primary")
+
+def test_released_probe_can_be_retried(router, monkeypatch):
+    open_circuit(router, "primary")
+    monkeypatch.setattr(settings, "MODEL_ROUTER_COOLDOWN_SECONDS", 0)
+    assert router.acquire("primary")
+    router.release("primary")
+    assert router.acquire("primary")
+
+def test_slow_model_ranks_after_a_fast_one(router):
+    router.record("primary", OK, 20.0)
+    router.record("backup", OK, 1.0)
+    assert order(router) == ["backup", "primary"]
+
+def test_model_that_keeps_losing_hedges_is_demoted(router):
+    router.record("primary", OK, 2.0)
+    router.record_hedge_loss("primary", 4.5)
+    router.record("backup", OK, 0.5)
+    assert order(router) == ["primary", "backup"]
+    router.record_hedge_loss("primary", 4.5)
+    router.record("backup", OK, 0.5)
+    assert order(router) == ["backup", "primary"]
+    # Losing is not failing: the circuit stays closed
+    assert state(router, "primary") == CLOSED
+
+@pytest.fixture
+def hedged_chain(router, monkeypatch):
+    """Run ai_service's model chain against router, with hedging after 10 ms"""
+    from app.services import ai_service as ai_module
+    monkeypatch.setattr(ai_module, "model_router", router)
+    monkeypatch.setattr(settings, "AI_HEDGE_ENABLED", True)
+    monkeypatch.setattr(settings, "AI_HEDGE_USE_P95", False)
+    monkeypatch.setattr(settings, "AI_HEDGE_DELAY", 0.01)
+    monkeypatch.setattr(settings, "AI_HEDGE_MAX_PARALLEL", 2)
+
+    def run(timed_call):
+        monkeypatch.setattr(ai_module.ai_service, "_timed_call", timed_call)
+        return asyncio.run(ai_module.ai_service._run_model_chain(MODELS, "text", bool))
+    return run
+
+def test_cancelled_hedge_is_a_loss(router, hedged_chain):
+    async def timed_call(messages, model):
+        if model == "primary":
+            await asyncio.sleep(10)
+        return f"answer from {model}", 0.5
+
+    assert hedged_chain(timed_call) == ("answer from backup", None)
+    assert router.scoreboard()["primary"]["hedge_losses"] == 1
+    assert router.scoreboard()["backup"]["hedge_losses"] == 0
+
+def test_models_finishing_together_are_not_losers(router, hedged_chain):
+    launched, both_running = [], []
+
+    async def timed_call(messages, model):
+        if not both_running:
+            # Made inside the running loop: Python 3.9 binds it at construction
+            both_running.append(asyncio.Event())
+        launched.append(model)
+        if len(launched) == 2:
+            both_running[0].set()
+        # Both answers land in the same wait round
+        await both_running[0].wait()
+        return f"answer from {model}", {"primary": 2.0, "backup": 1.0}[model]
+
+    assert hedged_chain(timed_call) == ("answer from backup", None)
+    board = router.scoreboard()
+    assert board["primary"]["hedge_losses"] == 0 and board["backup"]["hedge_losses"] == 0
+    assert board["primary"]["total_calls"] == 1 and board["backup"]["total_calls"] == 1
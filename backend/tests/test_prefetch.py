@@ -0,0 +1,41 @@
+import asyncio
+import pytest
+from app.services import prefetch
+from app.services.admission import AdmissionController
+from app.services.prefetch import FeaturedPrefetcher
+
+@pytest.fixture
+def admission(monkeypatch):
+    controller = AdmissionController()
+    controller.max_concurrent = 2
+    monkeypatch.setattr(prefetch, "admission", controller)
+    return controller
+
+@pytest.fixture
+def search(monkeypatch):
+    async def search_heritage_info(query, refresh=False):
+        await asyncio.sleep(0.05)
+        return f"An answer about {query}"
+    monkeypatch.setattr(prefetch.ai_service, "search_heritage_info", search_heritage_info)
+
+def test_admitted_miss_does_not_wait_for_a_second_slot(admission, search):
+    prefetcher = FeaturedPrefetcher()
+
+    async def busy_search(client):
+        async with admission.admit(client):
+            await asyncio.sleep(0.1)
+
+    async def featured_miss(client):
+        # Arrives while both slots are held by searches, as the GET handler would
+        await asyncio.sleep(0.01)
+        async with admission.admit(client):
+            return await prefetcher.fetch({"name": "Petra"}, hold_slot=False)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(
+            busy_search("ip:a"), busy_search("ip:b"), featured_miss("ip:c"), featured_miss("ip:d")
+        ), timeout=2)
+
+    results = asyncio.run(run())
+    assert [entry[0] for entry in results[2:]] == ["An answer about Petra"] * 2
+    assert prefetcher.ready["petra"][0] == "An answer about Petra"
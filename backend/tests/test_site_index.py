@@ -0,0 +1,32 @@
+from app.services.site_index import SiteSuggestionIndex
+
+SITES = [
+    ("Taj Mahal", "Agra, India", ["taj"]),
+    ("Colosseum", "Rome, Italy", []),
+    ("Temple of the Sun", "Cusco, Peru", []),
+    ("Petra", "Ma'an, Jordan", []),
+]
+
+def names(suggestions):
+    return [suggestion["name"] for suggestion in suggestions]
+
+def test_prefix_matches_from_any_word():
+    index = SiteSuggestionIndex()
+    index.add_sites(SITES)
+    assert names(index.suggest("mah")) == ["Taj Mahal"]
+    assert names(index.suggest("ro")) == ["Colosseum"]
+    assert index.suggest("taj")[0]["match"] == "prefix"
+
+def test_misspelled_query_falls_back_to_trigrams():
+    index = SiteSuggestionIndex()
+    index.add_sites(SITES)
+    suggestions = index.suggest("coloseum")
+    assert names(suggestions) == ["Colosseum"] and suggestions[0]["match"] == "fuzzy"
+    assert index.suggest("xqzvw") == []
+
+def test_common_trigrams_do_not_widen_the_search():
+    index = SiteSuggestionIndex()
+    index.max_fuzzy_postings = 50
+    index.add_sites(SITES + [(f"Temple of the {n}", None, []) for n in range(500)])
+    # " of", "the" and "tem" are shared by hundreds of terms; "sun" picks the site out
+    assert names(index.suggest("templ of the sunn"))[0] == "Temple of the Sun"
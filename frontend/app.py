@@ -2,14 +2,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 import streamlit as st
-import pymongo
-from urllib.parse import quote_plus
-import certifi
-import os
 
 # Import our utilities and components
 from utils.api_client import api_client
-from utils.session_state import init_session_state, clear_analysis
+from utils.session_state import init_session_state, clear_analysis, reset_history_pages
 from components.featured_cards import display_featured_cards
 from components.image_upload import handle_image_upload
 from components.search_component import handle_search
@@ -129,37 +125,6 @@ st.markdown(dark_css, unsafe_allow_html=True)
 # ===================== INITIALIZE SESSION STATE =====================
 init_session_state()
 
-# ===================== DATABASE CONFIG =====================
-MONGODB_USERNAME = os.getenv("MONGODB_USERNAME", "indranilsamanta2003")
-MONGODB_PASSWORD = os.getenv("MONGODB_PASSWORD")
-MONGODB_CLUSTER = os.getenv("MONGODB_CLUSTER")
-MONGODB_DATABASE = os.getenv("MONGODB_DATABASE")
-
-@st.cache_resource
-def init_connection():
-    try:
-        username = quote_plus(MONGODB_USERNAME)
-        password = quote_plus(MONGODB_PASSWORD)
-        connection_string = f"mongodb+srv://{username}:{password}@{MONGODB_CLUSTER}/{MONGODB_DATABASE}?retryWrites=true&w=majority&appName=ClusterHeritage"
-        client = pymongo.MongoClient(connection_string, tlsCAFile=certifi.where())
-        client.admin.command('ping')
-        st.sidebar.success("✅ Connected to MongoDB successfully!")
-        return client
-    except Exception as e:
-        st.sidebar.error(f"❌ MongoDB connection failed: {str(e)}")
-        return None
-
-client = init_connection()
-if client:
-    db = client[MONGODB_DATABASE]
-    users_collection = db.users
-else:
-    class DummyCollection:
-        def find_one(self, *args, **kwargs): return None
-        def insert_one(self, *args, **kwargs): return {"inserted_id": "demo_id"}
-    users_collection = DummyCollection()
-    st.sidebar.warning("⚠️ Running in demo mode without database connection.")
-
 # ===================== BACKEND STATUS =====================
 if api_client.health_check():
     st.sidebar.success("✅ Backend API Connected")
@@ -167,21 +132,15 @@ else:
     st.sidebar.error("🚫 Backend API Not Connected")
 
 # ===================== AUTH FUNCTIONS =====================
+# Accounts live behind the backend's /api/auth endpoints; the frontend holds no database connection
 def login_user(username, password):
-    if not client:
-        return bool(username and password)
-    user = users_collection.find_one({"username": username, "password": password})
-    return user is not None
+    token, message = api_client.login(username, password)
+    if token:
+        st.session_state.auth_token = token
+    return token is not None, message
 
 def signup_user(username, password, email):
-    if not client:
-        if not username or not password or not email:
-            return False, "All fields are required"
-        return True, "User created successfully! (Demo mode)"
-    if users_collection.find_one({"username": username}):
-        return False, "Username already exists"
-    users_collection.insert_one({"username": username, "password": password, "email": email})
-    return True, "User created successfully!"
+    return api_client.signup(username, password, email)
 
 # ===================== MAIN UI =====================
 if not st.session_state.authenticated:
@@ -194,13 +153,14 @@ if not st.session_state.authenticated:
             login_password = st.text_input("Password", type="password")
             login_submitted = st.form_submit_button("Login")
             if login_submitted:
-                if login_user(login_username, login_password):
+                success, message = login_user(login_username, login_password)
+                if success:
                     st.session_state.authenticated = True
-                    st.session_state.username = login_username
+                    st.session_state.username = login_username.strip()
                     st.success("✅ Login successful!")
                     st.rerun()
                 else:
-                    st.error("❌ Invalid username or password.")
+                    st.error(f"❌ {message}")
 
     with tab2:
         st.subheader("Create an Account")
@@ -223,13 +183,19 @@ else:
     # Sidebar controls
     if st.sidebar.button("🔄 Clear History", use_container_width=True):
         clear_analysis()
-        st.session_state.chat_history = []
-        st.success("History cleared!")
+        st.session_state.chat_history.clear()
+        reset_history_pages()
+        if api_client.clear_history():
+            st.success("History cleared!")
+        else:
+            st.warning("Cleared this session, but saved history could not be deleted. Please try again.")
         
     if st.sidebar.button("🚪 Logout", use_container_width=True):
         st.session_state.authenticated = False
         st.session_state.username = None
-        st.session_state.chat_history = []
+        st.session_state.auth_token = None
+        st.session_state.chat_history.clear()
+        reset_history_pages()
         st.session_state.uploaded_image = None
         st.session_state.analysis_result = None
         st.rerun()
@@ -1,11 +1,22 @@
 import streamlit as st
+from utils.api_client import api_client
+from utils.session_state import add_to_chat_history, reset_history_pages
+from components.search_component import render_result
+
+def explore_site(name: str):
+    """Open a featured site's details below the cards"""
+    st.session_state.explored_site = name
+    st.session_state.explored_site_new = True
+
+def close_explored_site():
+    st.session_state.explored_site = None
 
 def display_featured_cards(recommendations):
     """Display featured heritage sites in cards"""
     if not recommendations:
         st.info("🌟 No recommendations available at the moment.")
         return
-    
+
     cols = st.columns(3)
     for idx, site in enumerate(recommendations):
         with cols[idx % 3]:
@@ -17,7 +28,28 @@ def display_featured_cards(recommendations):
                     <p>{site.get('description', 'No description available.')}</p>
                 </div>
                 """, unsafe_allow_html=True)
-                
-                if st.button("Explore", key=f"explore_{idx}"):
-                    st.session_state.current_search = site['name']
-                    st.rerun()
\ No newline at end of file
+
+                st.button("Explore", key=f"explore_{idx}", on_click=explore_site, args=(site['name'],))
+
+    show_explored_site()
+
+def show_explored_site():
+    """Details of the featured site picked with Explore; the backend has them ready in advance"""
+    name = st.session_state.get("explored_site")
+    if not name:
+        return
+
+    result = api_client.get_featured(name)
+    if not result:
+        st.error(f"❌ Could not load {name}. Please try again or use the Search tab.")
+        return
+
+    if st.session_state.get("explored_site_new"):
+        st.session_state.explored_site_new = False
+        add_to_chat_history("User", f"Search: {name}")
+        add_to_chat_history("AI", f"Search Results: {result}")
+        if api_client.record_featured_visit(name):
+            reset_history_pages()
+
+    render_result(st.empty(), result)
+    st.button("✖️ Close", key="close_explored_site", on_click=close_explored_site)
@@ -1,7 +1,7 @@
 import streamlit as st
 from utils.api_client import api_client
-from utils.session_state import add_to_chat_history
-import time
+from utils.session_state import add_to_chat_history, reset_history_pages
+from utils.image_utils import shrink_image, format_bytes
 
 def handle_image_upload():
     """Handle image upload and analysis with enhanced UX"""
@@ -18,49 +18,54 @@ def handle_image_upload():
     uploaded_file = st.file_uploader(
         "Choose an image of a heritage site", 
         type=["jpg", "jpeg", "png"],
-        help="Maximum file size: 10MB"
+        help="Large photos are resized before upload; the resized image must be under 10MB"
     )
     
     if uploaded_file is not None:
+        # Resize to what the AI actually uses before anything goes over the wire
+        try:
+            shrunk = shrink_image(uploaded_file.getvalue())
+        except Exception:
+            st.error("❌ This file could not be read as an image. Please try a different one.")
+            return
+        
         # Display image preview with enhanced styling
         st.markdown("### 📷 Image Preview")
         col1, col2 = st.columns([2, 1])
         
         with col1:
-            st.image(uploaded_file, caption="Your Uploaded Image", use_column_width=True)
+            st.image(shrunk.data, caption="Your Uploaded Image", use_column_width=True)
             
             # File info
-            file_size = len(uploaded_file.getvalue()) / 1024  # KB
-            st.caption(f"📁 File: {uploaded_file.name} | 📏 Size: {file_size:.1f} KB")
+            st.caption(f"📁 File: {uploaded_file.name} | 📏 Size: {format_bytes(shrunk.original_bytes)}")
+            if shrunk.size != shrunk.original_size or len(shrunk.data) < shrunk.original_bytes:
+                saved = 100 * (1 - len(shrunk.data) / shrunk.original_bytes)
+                st.caption(
+                    f"📉 Optimized for upload: {format_bytes(len(shrunk.data))} "
+                    f"({shrunk.size[0]}×{shrunk.size[1]}, {saved:.0f}% smaller than "
+                    f"{shrunk.original_size[0]}×{shrunk.original_size[1]})"
+                )
         
         with col2:
             st.markdown("### 🎯 Ready to Analyze?")
             st.write("Click the button below to discover the history behind this image!")
             
             if st.button("🔍 Analyze Heritage", type="primary", use_container_width=True):
-                # Enhanced progress tracking for image analysis
+                # Real progress reported by the backend job as it moves through each stage
                 progress_bar = st.progress(0)
                 status_text = st.empty()
+                status_text.text("📤 Uploading image...")
                 
-                steps = [
-                    "📤 Uploading image...",
-                    "🔄 Processing with AI...", 
-                    "🔍 Analyzing architectural features...",
-                    "📚 Gathering historical context...",
-                    "✨ Finalizing analysis..."
-                ]
-                
-                for i, step in enumerate(steps):
-                    progress = (i + 1) * 20
-                    progress_bar.progress(progress)
-                    status_text.text(step)
-                    time.sleep(0.5)  # Simulate processing time
-                
-                # Perform actual analysis
-                result = api_client.analyze_image(
-                    uploaded_file.getvalue(), 
-                    st.session_state.username
-                )
+                result = None
+                job = api_client.submit_image_job(shrunk.data)
+                if job:
+                    for job in api_client.stream_job(job["job_id"]):
+                        progress_bar.progress(job["progress"])
+                        status_text.text(f"🔄 {job['detail']}...")
+                        if job["status"] == "done":
+                            result = job["result"]
+                        elif job["status"] == "failed":
+                            st.error(f"❌ {job['error']}")
                 
                 # Clear progress indicators
                 progress_bar.empty()
@@ -69,6 +74,7 @@ def handle_image_upload():
                 if result:
                     st.session_state.analysis_result = result
                     add_to_chat_history("AI", f"Image Analysis: {result}")
+                    reset_history_pages()
                     st.balloons()
                     st.success("🎉 Image analysis completed successfully!")
                 else:
@@ -1,7 +1,47 @@
+import html
 import streamlit as st
-import time
-from utils.api_client import api_client
-from utils.session_state import add_to_chat_history
+from utils.api_client import api_client, StreamFailed
+from utils.session_state import add_to_chat_history, reset_history_pages
+
+def render_result(placeholder, result: str):
+    """Render heritage information into a placeholder with the result card styling"""
+    with placeholder.container():
+        st.markdown("### 📖 Heritage Information")
+        st.markdown(f"""
+        <div style='
+            background: linear-gradient(135deg, #1c1c1c, #2d2d2d);
+            border: 2px solid #f0c674;
+            border-radius: 15px;
+            padding: 25px;
+            color: #e0d5c0;
+            white-space: pre-line;
+            line-height: 1.6;
+            font-size: 16px;
+            box-shadow: 0 8px 25px rgba(240, 198, 116, 0.2);
+        '>
+            {html.escape(result)}
+        </div>
+        """, unsafe_allow_html=True)
+
+def use_suggestion(name: str):
+    """Replace the search text with a suggested canonical site name"""
+    st.session_state.search_input = name
+
+def show_suggestions(search_query: str):
+    """Offer canonical site names for what the user has typed so far"""
+    typed = search_query.strip().lower()
+    suggestions = [s for s in api_client.suggest(search_query) if s["name"].lower() != typed]
+    if not suggestions:
+        return
+    
+    st.caption("💡 Did you mean:")
+    cols = st.columns(len(suggestions))
+    for col, suggestion in zip(cols, suggestions):
+        with col:
+            label = suggestion["name"]
+            if suggestion.get("location"):
+                label += f" · {suggestion['location']}"
+            st.button(label, key=f"suggest_{suggestion['name']}", on_click=use_suggestion, args=(suggestion["name"],))
 
 def handle_search():
     """Handle heritage site search with enhanced UX"""
@@ -24,57 +64,38 @@ def handle_search():
         else:
             st.error("🚫 Disconnected")
     
+    if search_query:
+        show_suggestions(search_query)
+    
     if st.button("🚀 Search Heritage", use_container_width=True, type="primary") and search_query:
-        # Create a progress bar
-        progress_bar = st.progress(0)
         status_text = st.empty()
+        status_text.text("🔄 Connecting to AI service...")
+        result_placeholder = st.empty()
         
-        for i in range(100):
-            # Update progress bar
-            progress_bar.progress(i + 1)
-            
-            # Update status text
-            if i < 25:
-                status_text.text("🔄 Connecting to AI service...")
-            elif i < 50:
-                status_text.text("🔍 Searching historical database...")
-            elif i < 75:
-                status_text.text("📚 Gathering heritage information...")
-            else:
-                status_text.text("✨ Finalizing results...")
-            
-            time.sleep(0.02)  # Simulate progress
-        
-        # Perform actual search
-        result = api_client.analyze_text(search_query, st.session_state.username)
+        # Render the answer incrementally as tokens arrive
+        result = ""
+        failed = False
+        try:
+            for chunk in api_client.stream_text(search_query):
+                if not result:
+                    status_text.text("📚 Gathering heritage information...")
+                result += chunk
+                render_result(result_placeholder, result)
+        except StreamFailed as e:
+            failed = True
+            st.error(f"❌ {str(e)}")
         
-        # Clear progress indicators
-        progress_bar.empty()
         status_text.empty()
         
-        if result:
+        if failed:
+            if result:
+                st.warning("⚠️ The answer above is incomplete. Please search again.")
+        elif result:
             st.balloons()  # Celebration effect
-            st.markdown("### 📖 Heritage Information")
-            
-            # Enhanced result display with better formatting
-            st.markdown(f"""
-            <div style='
-                background: linear-gradient(135deg, #1c1c1c, #2d2d2d);
-                border: 2px solid #f0c674;
-                border-radius: 15px;
-                padding: 25px;
-                color: #e0d5c0;
-                white-space: pre-line;
-                line-height: 1.6;
-                font-size: 16px;
-                box-shadow: 0 8px 25px rgba(240, 198, 116, 0.2);
-            '>
-                {result}
-            </div>
-            """, unsafe_allow_html=True)
             
             add_to_chat_history("User", f"Search: {search_query}")
             add_to_chat_history("AI", f"Search Results: {result}")
+            reset_history_pages()
             
             # Success message with emoji
             st.success("🎉 Heritage information retrieved successfully!")
@@ -89,31 +110,66 @@ def handle_search():
             Please try again in a moment.
             """)
     
-    # Enhanced chat history display
-    if st.session_state.chat_history:
-        st.markdown("---")
-        st.subheader("📜 Recent Explorations")
+    show_recent_explorations()
+
+def show_older(next_cursor: str):
+    st.session_state.history_pages.append(st.session_state.history_cursor)
+    st.session_state.history_cursor = next_cursor
+
+def show_newer():
+    st.session_state.history_cursor = st.session_state.history_pages.pop()
+
+def show_recent_explorations():
+    """Saved searches and image analyses, a page at a time from the backend"""
+    # Every tab renders on each rerun; fetch a page once, until reset_history_pages()
+    cursor = st.session_state.history_cursor
+    page = st.session_state.history_page_cache.get(cursor)
+    if page is None:
+        page = api_client.get_history(cursor)
+        if page is None:
+            # Not cached, so the next rerun tries again
+            page = ([], None)
+        else:
+            st.session_state.history_page_cache[cursor] = page
+    items, next_cursor = page
+    if not items and not st.session_state.history_pages:
+        return
+    
+    st.markdown("---")
+    st.subheader("📜 Recent Explorations")
+    
+    for item in items:
+        if item["kind"] == "search":
+            title = f"Search: {item['query']}"
+        else:
+            title = "Image Analysis"
         
-        for chat in reversed(st.session_state.chat_history[-5:]):
-            role_icon = "🏛️" if chat["role"] == "AI" else "👤"
-            bg_color = "linear-gradient(135deg, #2d5016, #3a6620)" if chat["role"] == "AI" else "linear-gradient(135deg, #1c1c1c, #2d2d2d)"
-            border_color = "#4CAF50" if chat["role"] == "AI" else "#f0c674"
-            
-            st.markdown(f"""
-            <div style='
-                background: {bg_color};
-                border: 2px solid {border_color};
-                border-radius: 12px;
-                padding: 18px;
-                margin: 12px 0;
-                color: #e0d5c0;
-                white-space: pre-line;
-                line-height: 1.5;
-            '>
-                <div style="display: flex; align-items: center; margin-bottom: 8px;">
-                    <span style="font-size: 20px; margin-right: 10px;">{role_icon}</span>
-                    <strong style="color: #f0c674;">{chat['role']}</strong>
-                </div>
-                {chat['message']}
+        st.markdown(f"""
+        <div style='
+            background: linear-gradient(135deg, #2d5016, #3a6620);
+            border: 2px solid #4CAF50;
+            border-radius: 12px;
+            padding: 18px;
+            margin: 12px 0;
+            color: #e0d5c0;
+            white-space: pre-line;
+            line-height: 1.5;
+            max-height: 300px;
+            overflow-y: auto;
+        '>
+            <div style="display: flex; align-items: center; margin-bottom: 8px;">
+                <span style="font-size: 20px; margin-right: 10px;">🏛️</span>
+                <strong style="color: #f0c674;">{html.escape(title)}</strong>
+                <span style="margin-left: auto; font-size: 12px;">{item['created_at'][:16].replace('T', ' ')} UTC</span>
             </div>
-            """, unsafe_allow_html=True)
\ No newline at end of file
+            {html.escape(item['result'])}
+        </div>
+        """, unsafe_allow_html=True)
+    
+    col_newer, col_older = st.columns(2)
+    with col_newer:
+        if st.session_state.history_pages:
+            st.button("⬅️ Newer", key="history_newer", on_click=show_newer, use_container_width=True)
+    with col_older:
+        if next_cursor:
+            st.button("Older ➡️", key="history_older", on_click=show_older, args=(next_cursor,), use_container_width=True)
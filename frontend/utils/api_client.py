@@ -1,74 +1,212 @@
 import requests
 import json
-from typing import Optional
+import threading
+import time
+from urllib.parse import quote
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from requests.adapters import HTTPAdapter
 import streamlit as st
 
+# Seconds an idempotent GET result is reused before it is refreshed in the background
+HEALTH_TTL = 10
+TEST_TTL = 30
+RECOMMENDATIONS_TTL = 300  # Replaced by the backend's Cache-Control max-age when sent
+FAILURE_TTL = 5
+
+# A 429 asking to wait at most this many seconds is retried once automatically
+MAX_AUTO_RETRY_WAIT = 5
+
+@st.cache_resource
+def get_http_session() -> requests.Session:
+    """Keep-alive connection pool shared by every Streamlit session in this process"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+class StreamFailed(Exception):
+    """A streamed answer broke off partway: the backend reported an error or the connection dropped"""
+
 class HeritageAPIClient:
     def __init__(self, base_url: str = "http://localhost:8000"):
         self.base_url = base_url
         self.api_prefix = "/api"
+        self.session = get_http_session()
+        # key -> (expires_at, value) for health, test and recommendations
+        self._cache: Dict[str, Tuple[float, Any]] = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        # ETag of the cached recommendations, revalidated instead of re-downloaded
+        self._recommendations_etag: Optional[str] = None
+        # Featured site name -> ETag of its cached answer
+        self._featured_etags: Dict[str, str] = {}
         
     def _make_request(self, endpoint: str, method: str = "GET", data: Optional[dict] = None, files: Optional[dict] = None) -> Optional[dict]:
         """Generic method to make API requests with enhanced error handling"""
         url = f"{self.base_url}{self.api_prefix}{endpoint}"
         
         try:
-            headers = {"Content-Type": "application/json"}
-            
-            if method == "GET":
-                response = requests.get(url, headers=headers, timeout=30)
-            elif method == "POST":
-                if files:
-                    # For file uploads, don't use JSON headers
-                    headers = {}  # Remove JSON headers for file uploads
-                    response = requests.post(url, files=files, data=data, timeout=30)
+            for attempt in range(2):
+                headers = {"Content-Type": "application/json", **self._user_headers()}
+                
+                if method == "GET":
+                    response = self.session.get(url, headers=headers, timeout=30)
+                elif method == "POST":
+                    if files:
+                        # For file uploads, don't use JSON headers
+                        headers = self._user_headers()
+                        response = self.session.post(url, files=files, data=data, headers=headers, timeout=30)
+                    else:
+                        # For JSON data, use json parameter
+                        response = self.session.post(url, json=data, headers=headers, timeout=30)
                 else:
-                    # For JSON data, use json parameter
-                    response = requests.post(url, json=data, headers=headers, timeout=30)
-            else:
-                raise ValueError(f"Unsupported HTTP method: {method}")
+                    raise ValueError(f"Unsupported HTTP method: {method}")
+                
+                # The backend says exactly when capacity frees up; a short wait is worth it
+                retry_after = self._retry_after(response)
+                if response.status_code == 429 and attempt == 0 and retry_after is not None and retry_after <= MAX_AUTO_RETRY_WAIT:
+                    time.sleep(retry_after)
+                    continue
+                break
                 
             response.raise_for_status()
             return response.json()
             
-        except requests.exceptions.ConnectionError:
+        except Exception as e:
+            self._report_error(e)
+            return None
+    
+    @staticmethod
+    def _retry_after(response: requests.Response) -> Optional[int]:
+        """Seconds from a Retry-After header, if the response has one"""
+        value = response.headers.get("Retry-After", "")
+        return int(value) if value.isdigit() else None
+    
+    def _user_headers(self) -> dict:
+        """Identify the logged-in user so the backend rate-limits per user, not per frontend"""
+        headers = {}
+        token = st.session_state.get("auth_token")
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        return headers
+    
+    def _cached(self, key: str, fetch: Callable[[Optional[Any]], Tuple[Any, float]]) -> Any:
+        """
+        Serve an idempotent GET from memory. A stale entry is still returned at once while
+        a background thread refreshes it, so reruns never wait on the backend.
+        fetch(previous) returns (value, ttl) and must not touch Streamlit elements.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                if entry[0] > now or key in self._refreshing:
+                    return entry[1]
+                self._refreshing.add(key)
+        
+        if entry is None:
+            value, ttl = fetch(None)
+            with self._lock:
+                self._cache[key] = (time.monotonic() + ttl, value)
+            return value
+        
+        threading.Thread(target=self._refresh, args=(key, fetch, entry[1]), daemon=True).start()
+        return entry[1]
+    
+    def _refresh(self, key: str, fetch: Callable[[Optional[Any]], Tuple[Any, float]], previous: Any):
+        """Background refresh of one cached GET"""
+        try:
+            value, ttl = fetch(previous)
+        except Exception:
+            value, ttl = previous, FAILURE_TTL
+        with self._lock:
+            self._cache[key] = (time.monotonic() + ttl, value)
+            self._refreshing.discard(key)
+    
+    def _report_error(self, error: Exception):
+        """Show a user-facing message for a failed API request"""
+        if isinstance(error, requests.exceptions.ConnectionError):
             st.error("🚫 Cannot connect to backend server. Please make sure:")
             st.info("1. Backend server is running on http://localhost:8000")
             st.info("2. No firewall is blocking the connection")
             st.info("3. Both servers are in the same network")
-            return None
             
-        except requests.exceptions.Timeout:
+        elif isinstance(error, requests.exceptions.Timeout):
             st.error("⏰ Request timed out. The AI service might be slow. Please try again.")
-            return None
             
-        except requests.exceptions.HTTPError as e:
+        elif isinstance(error, requests.exceptions.HTTPError):
             error_detail = ""
             try:
-                error_response = e.response.json()
-                error_detail = error_response.get('detail', e.response.text)
+                error_response = error.response.json()
+                error_detail = error_response.get('detail', error.response.text)
                 if 'error' in error_response:
                     error_detail = error_response['error']
             except:
-                error_detail = e.response.text
+                error_detail = error.response.text
                 
-            if e.response.status_code == 422:
+            if error.response.status_code == 422:
                 st.error("❌ Invalid request format. Please check your input.")
-            elif e.response.status_code == 429:
-                st.error("🚦 Too many requests. Please wait a moment and try again.")
-            elif e.response.status_code == 500:
+            elif error.response.status_code == 429:
+                retry_after = self._retry_after(error.response)
+                if retry_after is not None:
+                    st.error(f"🚦 {error_detail} Please try again in {retry_after} seconds.")
+                else:
+                    st.error("🚦 Too many requests. Please wait a moment and try again.")
+            elif error.response.status_code == 500:
                 st.error("🔧 Server error. Our team has been notified.")
             else:
-                st.error(f"❌ HTTP Error {e.response.status_code}: {error_detail}")
-            return None
+                st.error(f"❌ HTTP Error {error.response.status_code}: {error_detail}")
             
-        except requests.exceptions.RequestException as e:
-            st.error(f"❌ Network error: {str(e)}")
-            return None
+        elif isinstance(error, requests.exceptions.RequestException):
+            st.error(f"❌ Network error: {str(error)}")
             
-        except Exception as e:
-            st.error(f"💥 Unexpected error: {str(e)}")
+        else:
+            st.error(f"💥 Unexpected error: {str(error)}")
+    
+    def _auth_request(self, endpoint: str, data: dict) -> Tuple[Optional[dict], str]:
+        """POST to an auth endpoint; returns (body, message), body None on failure"""
+        try:
+            response = self.session.post(f"{self.base_url}{self.api_prefix}{endpoint}", json=data, timeout=15)
+            body = response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return None, "Cannot connect to backend server. Please try again."
+        if response.status_code == 429:
+            return None, f"Too many attempts. Please try again in {self._retry_after(response) or 60} seconds."
+        if not body.get("success"):
+            return None, body.get("error", "Request failed")
+        return body, body.get("message", "")
+    
+    def login(self, username: str, password: str) -> Tuple[Optional[str], str]:
+        """Exchange credentials for a session token; returns (token, message)"""
+        body, message = self._auth_request("/auth/login", {"username": username, "password": password})
+        return (body["token"], "") if body else (None, message)
+    
+    def signup(self, username: str, password: str, email: str) -> Tuple[bool, str]:
+        """Create an account; returns (success, message)"""
+        body, message = self._auth_request("/auth/signup", {"username": username, "password": password, "email": email})
+        return body is not None, message
+    
+    def get_history(self, cursor: Optional[str] = None, limit: int = 5) -> Optional[Tuple[list, Optional[str]]]:
+        """One page of the user's saved explorations, newest first; returns (items, next_cursor), or None on failure"""
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        try:
+            response = self.session.get(f"{self.base_url}{self.api_prefix}/history", params=params,
+                                        headers=self._user_headers(), timeout=5)
+            response.raise_for_status()
+            body = response.json()
+        except Exception:
             return None
+        return body.get("items", []), body.get("next_cursor")
+    
+    def clear_history(self) -> bool:
+        """Delete the user's saved explorations"""
+        try:
+            response = self.session.delete(f"{self.base_url}{self.api_prefix}/history",
+                                           headers=self._user_headers(), timeout=10)
+            return response.ok and response.json().get("success", False)
+        except Exception:
+            return False
     
     def analyze_image(self, image_bytes: bytes, user_id: Optional[str] = None) -> Optional[str]:
         """Analyze heritage image with progress tracking"""
@@ -82,6 +220,27 @@ class HeritageAPIClient:
         
         return response.get("result") if response and response.get("success") else None
     
+    def submit_image_job(self, image_bytes: bytes) -> Optional[dict]:
+        """Queue an image for analysis; returns the job (with its job_id) immediately"""
+        files = {"file": ("heritage_image.jpg", image_bytes, "image/jpeg")}
+        response = self._make_request("/heritage/jobs", "POST", files=files)
+        return response.get("job") if response and response.get("success") else None
+    
+    def stream_job(self, job_id: str) -> Iterator[dict]:
+        """Yield an analysis job's state each time its stage changes, ending when it finishes"""
+        url = f"{self.base_url}{self.api_prefix}/heritage/jobs/{job_id}/events"
+        
+        try:
+            # The backend sends a keep-alive comment every 15 s, so a 60 s read timeout means it is gone
+            with self.session.get(url, stream=True, timeout=(5, 60)) as response:
+                response.raise_for_status()
+                response.encoding = "utf-8"
+                for line in response.iter_lines(decode_unicode=True):
+                    if line and line.startswith("data:"):
+                        yield json.loads(line[5:])
+        except Exception as e:
+            self._report_error(e)
+    
     def analyze_text(self, query: str, user_id: Optional[str] = None) -> Optional[str]:
         """Analyze heritage text query with progress tracking"""
         endpoint = "/heritage/search"
@@ -93,25 +252,150 @@ class HeritageAPIClient:
         
         return response.get("result") if response and response.get("success") else None
     
+    def get_featured(self, name: str) -> Optional[str]:
+        """Prefetched search answer for a featured site (cached for the backend's max-age, then revalidated)"""
+        # Read here, not in the fetch: refreshes run off the script thread. The answer is the
+        # same for everyone, so the token only goes on the request, never in the cache key,
+        # and a miss is rate limited as this user rather than as the frontend's address
+        user_headers = self._user_headers()
+        return self._cached(f"featured:{name}", lambda previous: self._fetch_featured(name, previous, user_headers))
+    
+    def _fetch_featured(self, name: str, previous: Optional[str], user_headers: dict) -> Tuple[Optional[str], float]:
+        """Download a featured site's answer, or reuse the previous copy if its ETag still matches"""
+        url = f"{self.base_url}{self.api_prefix}/heritage/featured/{quote(name, safe='')}"
+        etag = self._featured_etags.get(name)
+        headers = dict(user_headers)
+        if previous and etag:
+            headers["If-None-Match"] = etag
+        
+        try:
+            response = self.session.get(url, headers=headers, timeout=30)
+            if response.status_code == 304:
+                return previous, self._max_age(response.headers.get("Cache-Control", ""), FAILURE_TTL)
+            response.raise_for_status()
+            body = response.json()
+            if not body.get("success"):
+                return previous, FAILURE_TTL
+            self._featured_etags[name] = response.headers.get("ETag")
+            return body.get("result"), self._max_age(response.headers.get("Cache-Control", ""), FAILURE_TTL)
+        except Exception:
+            return previous, FAILURE_TTL
+    
+    def record_featured_visit(self, name: str) -> bool:
+        """Add an opened featured site to the user's saved history (silent on failure)"""
+        try:
+            response = self.session.post(f"{self.base_url}{self.api_prefix}/heritage/featured/{quote(name, safe='')}/explore",
+                                         headers=self._user_headers(), timeout=5)
+            return response.ok
+        except Exception:
+            return False
+    
+    def stream_text(self, query: str) -> Iterator[str]:
+        """
+        Stream heritage text query results chunk by chunk as the AI generates them.
+        
+        Raises StreamFailed if the answer breaks off, so what was shown is not taken as complete.
+        """
+        url = f"{self.base_url}{self.api_prefix}/heritage/search/stream"
+        received = False
+        
+        try:
+            # Short connect timeout, generous read timeout between chunks
+            with self.session.post(url, json={"query": query}, headers=self._user_headers(),
+                                   stream=True, timeout=(5, 60)) as response:
+                response.raise_for_status()
+                response.encoding = "utf-8"
+                for line in response.iter_lines(decode_unicode=True):
+                    if not line or not line.startswith("data:"):
+                        continue
+                    event = json.loads(line[5:])
+                    if event["type"] == "delta":
+                        received = True
+                        yield event["content"]
+                    elif event["type"] == "error":
+                        raise StreamFailed(event["error"])
+                    else:
+                        return
+            # Closed without the final event
+            if received:
+                raise StreamFailed("The answer was cut off before it finished.")
+        except StreamFailed:
+            raise
+        except requests.exceptions.RequestException as e:
+            # Part of the answer is already on screen: report it as cut off, not as a failed request
+            if received:
+                raise StreamFailed("Lost the connection to the guide while the answer was streaming.") from e
+            self._report_error(e)
+        except Exception as e:
+            self._report_error(e)
+    
+    def suggest(self, query: str, limit: int = 5) -> list:
+        """Get canonical heritage site names matching a partial query (silent on failure)"""
+        try:
+            response = self.session.get(
+                f"{self.base_url}{self.api_prefix}/heritage/suggest",
+                params={"q": query, "limit": limit},
+                timeout=2
+            )
+            response.raise_for_status()
+            return response.json().get("suggestions", [])
+        except:
+            return []
+    
     def get_recommendations(self) -> Optional[list]:
-        """Get heritage recommendations"""
-        endpoint = "/heritage/recommendations"
-        response = self._make_request(endpoint, "GET")
-        return response.get("sites") if response else None
+        """Get heritage recommendations (cached for the backend's max-age, then revalidated)"""
+        return self._cached("recommendations", self._fetch_recommendations)
+    
+    def _fetch_recommendations(self, previous: Optional[list]) -> Tuple[Optional[list], float]:
+        """Download the recommendations, or reuse the previous copy if its ETag still matches"""
+        url = f"{self.base_url}{self.api_prefix}/heritage/recommendations"
+        headers = {"If-None-Match": self._recommendations_etag} if previous and self._recommendations_etag else {}
+        
+        try:
+            response = self.session.get(url, headers=headers, timeout=30)
+            ttl = self._max_age(response.headers.get("Cache-Control", ""), RECOMMENDATIONS_TTL)
+            if response.status_code == 304:
+                return previous, ttl
+            response.raise_for_status()
+            self._recommendations_etag = response.headers.get("ETag")
+            return response.json().get("sites"), ttl
+        except Exception:
+            # Keep serving the last known list while the backend is unreachable
+            return previous, FAILURE_TTL
+    
+    @staticmethod
+    def _max_age(cache_control: str, default: float) -> float:
+        """max-age directive of a Cache-Control header"""
+        for directive in cache_control.split(","):
+            name, _, value = directive.strip().partition("=")
+            if name == "max-age" and value.isdigit():
+                return int(value)
+        return default
     
     def test_connection(self) -> bool:
         """Test backend connection"""
-        endpoint = "/heritage/test"
-        response = self._make_request(endpoint, "GET")
-        return response is not None and response.get("status") == "success"
+        return self._cached("test", self._fetch_test)
+    
+    def _fetch_test(self, previous: Optional[bool]) -> Tuple[bool, float]:
+        """Round trip through the heritage router"""
+        try:
+            response = self.session.get(f"{self.base_url}{self.api_prefix}/heritage/test", timeout=5)
+            ok = response.status_code == 200 and response.json().get("status") == "success"
+        except Exception:
+            ok = False
+        return ok, TEST_TTL if ok else FAILURE_TTL
     
     def health_check(self) -> bool:
         """Check if backend is healthy"""
+        return self._cached("health", self._fetch_health)
+    
+    def _fetch_health(self, previous: Optional[bool]) -> Tuple[bool, float]:
+        """Liveness of the backend process"""
         try:
-            response = requests.get(f"{self.base_url}/health", timeout=5)
-            return response.status_code == 200
-        except:
-            return False
+            ok = self.session.get(f"{self.base_url}/health", timeout=5).status_code == 200
+        except Exception:
+            ok = False
+        return ok, HEALTH_TTL if ok else FAILURE_TTL
 
 # Global API client instance
 api_client = HeritageAPIClient()
\ No newline at end of file
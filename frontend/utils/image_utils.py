@@ -0,0 +1,46 @@
+import io
+import os
+from typing import NamedTuple
+from PIL import Image, ImageOps
+import streamlit as st
+
+# Matches the backend's IMAGE_MAX_EDGE: anything larger is thrown away there anyway
+MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1568"))
+JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "85"))
+
+class ShrunkImage(NamedTuple):
+    data: bytes
+    original_bytes: int
+    original_size: tuple
+    size: tuple
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def shrink_image(image_bytes: bytes, max_edge: int = MAX_EDGE, quality: int = JPEG_QUALITY) -> ShrunkImage:
+    """
+    Downscale an image to max_edge and recompress it as JPEG before upload.
+
+    Phone photos are decoded at reduced scale (JPEG draft mode), rotated upright per
+    EXIF and re-encoded without metadata. The original is kept when recompressing
+    would not make it smaller.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    original_size = image.size
+    if image.format == "JPEG":
+        image.draft("RGB", (max_edge, max_edge))
+    image = ImageOps.exif_transpose(image)
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    image.thumbnail((max_edge, max_edge), Image.BICUBIC)
+
+    buffered = io.BytesIO()
+    image.save(buffered, format="JPEG", quality=quality, optimize=True)
+    data = buffered.getvalue()
+    if len(data) >= len(image_bytes):
+        return ShrunkImage(image_bytes, len(image_bytes), original_size, original_size)
+    return ShrunkImage(data, len(image_bytes), original_size, image.size)
+
+def format_bytes(size: int) -> str:
+    """Human-readable file size"""
+    if size >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MB"
+    return f"{size / 1024:.0f} KB"
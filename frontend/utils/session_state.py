@@ -1,13 +1,27 @@
+from collections import deque
 import streamlit as st
 
+# Session-local record behind the home page counters; the full history lives in the backend
+MAX_CHAT_HISTORY = 20
+
 def init_session_state():
     """Initialize all session state variables"""
     if "authenticated" not in st.session_state:
         st.session_state.authenticated = False
     if "username" not in st.session_state:
         st.session_state.username = None
+    if "auth_token" not in st.session_state:
+        st.session_state.auth_token = None
     if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+        st.session_state.chat_history = deque(maxlen=MAX_CHAT_HISTORY)
+    if "history_cursor" not in st.session_state:
+        st.session_state.history_cursor = None
+    if "history_pages" not in st.session_state:
+        st.session_state.history_pages = []
+    if "history_page_cache" not in st.session_state:
+        st.session_state.history_page_cache = {}
+    if "explored_site" not in st.session_state:
+        st.session_state.explored_site = None
     if "uploaded_image" not in st.session_state:
         st.session_state.uploaded_image = None
     if "analysis_result" not in st.session_state:
@@ -20,7 +34,11 @@ def clear_analysis():
 
 def add_to_chat_history(role: str, message: str):
     """Add message to chat history"""
+    # A bounded deque drops the oldest message itself
     st.session_state.chat_history.append({"role": role, "message": message})
-    # Keep only last 20 messages
-    if len(st.session_state.chat_history) > 20:
-        st.session_state.chat_history = st.session_state.chat_history[-20:]
\ No newline at end of file
+
+def reset_history_pages():
+    """Go back to the newest page of Recent Explorations, fetching pages again (call after recording one)"""
+    st.session_state.history_cursor = None
+    st.session_state.history_pages = []
+    st.session_state.history_page_cache = {}
\ No newline at end of file